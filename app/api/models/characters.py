@@ -1,5 +1,5 @@
 from typing import List, Dict, Any
-from db import getDb
+from db import dbConnection
 from applogging import get_logger
 logger = get_logger(__name__)
 
@@ -242,7 +242,7 @@ def search_characters(query: str, limit: int = 20) -> List[Dict[str, Any]]:
     ORDER BY name ASC
     LIMIT %s
   """
-  with getDb().cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(sql, (f"%{query}%", limit))
     return cur.fetchall()
 
@@ -253,7 +253,7 @@ def get_character(char_id: int) -> Dict[str, Any] | None:
     WHERE id = %s
       AND deleted_at IS NULL
   """
-  with getDb().cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(sql, (char_id,))
     return cur.fetchone()
 
@@ -265,6 +265,6 @@ def list_characters(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
     ORDER BY name ASC
     LIMIT %s OFFSET %s
   """
-  with getDb().cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(sql, (limit, offset))
     return cur.fetchall()
@@ -1,17 +1,60 @@
-from db import getDb
+import os
+import time
+from threading import Lock
+from typing import Any, Dict, Optional
+from db import dbConnection
 from applogging import get_logger
 logger = get_logger(__name__)
 
-def get_current_expansion() -> int:
+# How long the process keeps rule_values before reloading (seconds)
+RULES_CACHE_TTL_SECS = float(os.environ.get("POK_RULES_CACHE_TTL", "300"))
+
+# (loaded_at_monotonic, {rule_name: rule_value}) for this process
+_rules_cache = None
+_rules_lock = Lock()
+
+def _load_server_rules() -> Dict[str, str]:
+  # Lowest ruleset wins when a rule exists in several rulesets
   sql = """
-    SELECT rule_value
+    SELECT rule_name, rule_value
     FROM rule_values
-    WHERE rule_name = 'Expansion:CurrentExpansion'
-    LIMIT 1
+    ORDER BY ruleset_id DESC
   """
-  with getDb().cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(sql)
-    row = cur.fetchone()
-    if row and "rule_value" in row:
-      return int(row["rule_value"])
+    return {row["rule_name"]: row["rule_value"] for row in cur.fetchall()}
+
+def get_server_rules() -> Dict[str, str]:
+  """
+  All rule_values as {rule_name: rule_value}, loaded with one query and
+  shared by every request in the process until the TTL expires or
+  invalidate_server_rules() is called.
+  """
+  global _rules_cache
+  cached = _rules_cache
+  if cached is not None and time.monotonic() - cached[0] < RULES_CACHE_TTL_SECS:
+    return cached[1]
+
+  with _rules_lock:
+    cached = _rules_cache
+    if cached is not None and time.monotonic() - cached[0] < RULES_CACHE_TTL_SECS:
+      return cached[1]
+    rules = _load_server_rules()
+    _rules_cache = (time.monotonic(), rules)
+    logger.info("Loaded %d server rules", len(rules))
+    return rules
+
+def invalidate_server_rules():
+  global _rules_cache
+  with _rules_lock:
+    _rules_cache = None
+
+def get_rule(name: str, default: Optional[Any] = None) -> Optional[str]:
+  return get_server_rules().get(name, default)
+
+def get_current_expansion() -> int:
+  value = get_rule("Expansion:CurrentExpansion")
+  try:
+    return int(value)
+  except (TypeError, ValueError):
     return -1
@@ -1,5 +1,8 @@
-from db import getDb
+from db import dbConnection, getDb
+import os
+import time
 import pymysql.cursors
+from pymysql.constants import FIELD_TYPE
 import re
 from applogging import get_logger
 logger = get_logger(__name__)
@@ -7,6 +10,15 @@ logger = get_logger(__name__)
 _PLACEHOLDER   = "~private~"
 _SENSITIVE_RGX = re.compile(r"(password|e-?mail)", re.IGNORECASE)
 
+# Full-table export: rows per fetchmany() from the server-side cursor
+EXPORT_BATCH_ROWS = int(os.environ.get("POK_EXPORT_BATCH_ROWS", "5000"))
+# A slow client stalls an unbuffered read; give the server time before it gives up
+EXPORT_NET_WRITE_TIMEOUT_SECS = 600
+EXPORT_PROGRESS_ROWS = 100000
+
+_INT_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24, FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE, FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+
 def _sanitize_row(row: dict) -> dict:
   return {
     col: (_PLACEHOLDER if _SENSITIVE_RGX.search(col) else val)
@@ -14,10 +26,92 @@ def _sanitize_row(row: dict) -> dict:
   }
 
 def get_sample(table: str, limit: int = 100):
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(f"SELECT * FROM `{table}` LIMIT %s", (limit,))
     return [_sanitize_row(r) for r in cur.fetchall()]
 
+def iter_sample(table: str, limit: int = 100):
+  """
+  get_sample() as a generator over an unbuffered (server-side) cursor:
+  rows are read from the socket as they are consumed, never all at once.
+  The pooled connection is held until the generator is exhausted/closed.
+  """
+  with dbConnection() as db, db.cursor(pymysql.cursors.SSDictCursor) as cur:
+    cur.execute(f"SELECT * FROM `{table}` LIMIT %s", (limit,))
+    for r in cur:
+      yield _sanitize_row(r)
+
+def _column_kind(name: str, typeCode: int) -> str:
+  """'int' | 'float' | 'str' -- enough for CSV/columnar writers to pick a type."""
+  if _SENSITIVE_RGX.search(name):
+    return "str"
+  if typeCode in _INT_TYPES:
+    return "int"
+  if typeCode in _FLOAT_TYPES:
+    return "float"
+  return "str"
+
+def _primary_key(cur, table: str):
+  cur.execute(f"SHOW KEYS FROM `{table}` WHERE Key_name = 'PRIMARY'")
+  keys = sorted(cur.fetchall(), key=lambda r: r["Seq_in_index"])
+  return [r["Column_name"] for r in keys]
+
+def iter_table_batches(table: str, offset: int = 0, batchSize: int = EXPORT_BATCH_ROWS):
+  """
+  Stream a whole table as (columns, rows) batches, where columns is
+  [(name, kind), ...] and rows is a list of sanitized tuples. Rows come
+  in primary-key order so `offset` (rows already received) resumes an
+  interrupted export. The first batch is always yielded, even if empty.
+
+  Uses its own unpooled connection with an unbuffered SSCursor: a full
+  export can take minutes and should not pin a request pool slot.
+  """
+  started = time.monotonic()
+  sent = 0
+  db = getDb()
+  try:
+    with db.cursor(pymysql.cursors.DictCursor) as cur:
+      cur.execute(f"SET SESSION net_write_timeout = {int(EXPORT_NET_WRITE_TIMEOUT_SECS)}")
+      orderBy = ", ".join(f"`{c}`" for c in _primary_key(cur, table))
+
+    sql = f"SELECT * FROM `{table}`"
+    if orderBy:
+      sql += f" ORDER BY {orderBy}"
+    if offset:
+      # MySQL has no OFFSET without LIMIT; this is its documented "all rows"
+      sql += f" LIMIT {int(offset)}, 18446744073709551615"
+
+    # Not a `with` block: closing an SSCursor drains the rest of the result,
+    # which is exactly what an aborted download should not do. Closing the
+    # connection in `finally` drops it instead.
+    cur = db.cursor(pymysql.cursors.SSCursor)
+    cur.execute(sql)
+    columns = [(d[0], _column_kind(d[0], d[1])) for d in cur.description]
+    private = [i for i, (name, _) in enumerate(columns) if _SENSITIVE_RGX.search(name)]
+    nextReport = EXPORT_PROGRESS_ROWS
+    first = True
+    while True:
+      rows = cur.fetchmany(batchSize)
+      if not rows and not first:
+        break
+      first = False
+      if private:
+        rows = [tuple(_PLACEHOLDER if i in private else v for i, v in enumerate(r)) for r in rows]
+      sent += len(rows)
+      yield columns, rows
+      if sent >= nextReport:
+        elapsed = time.monotonic() - started
+        logger.info("Export %s: %d rows in %.1fs (%.0f rows/s)", table, sent, elapsed, sent / elapsed if elapsed else 0)
+        nextReport += EXPORT_PROGRESS_ROWS
+      if not rows:
+        break
+  finally:
+    db.close()
+    elapsed = time.monotonic() - started
+    logger.info(
+      "Export %s finished: %d rows from offset %d in %.1fs (%.0f rows/s)",
+      table, sent, offset, elapsed, sent / elapsed if elapsed else 0
+    )
+
 def sample_tables(table_list, limit: int = 100):
   return {t: get_sample(t, limit) for t in table_list}
@@ -1,8 +1,17 @@
 from __future__ import annotations
 
 from typing import Any, Dict, List, Tuple
+import base64
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from threading import Lock
 import pymysql.cursors
-from db import getDb
+from db import dbConnection, getDataVersion
+from web.cache import cachedModel, cachedModelBatch
 from applogging import get_logger
 logger = get_logger(__name__)
 
@@ -120,6 +129,22 @@ SLOT_OPTIONS = [(str(idx), name) for idx, (_, name) in SLOT_BITMASKS.items()]
 SORTABLE_FIELDS = {"name": "i.Name", **NUMERIC_ATTR_MAP}
 CMP_OPS = {">=", "<=", "="}
 
+# Gear Scout totals: counted up to SEARCH_COUNT_CAP rows unless an exact count
+# is requested; results are cached per filter signature.
+SEARCH_COUNT_CAP = 1000
+SEARCH_COUNT_TTL_SECS = float(os.environ.get("POK_SEARCH_COUNT_TTL", "300"))
+SEARCH_COUNT_CACHE_SIZE = 512
+
+# pok_item_search_masks.kind values
+SEARCH_MASK_SLOTS = 1
+SEARCH_MASK_CLASSES = 2
+SEARCH_MASK_RACES = 3
+# Name queries shorter than this (or with LIKE wildcards) skip the trigram index
+SEARCH_TRIGRAM_MIN_LEN = 3
+# Same folding as the pok_fold_item_name() SQL function that builds
+# pok_item_search.name_norm: lowercase, Latin-1 accents to ASCII
+_NAME_FOLD = str.maketrans("àáâãäåçèéêëìíîïñòóôõöùúûüýÿ", "aaaaaaceeeeiiiinooooouuuuyy")
+
 ITEM_TABLE_SELECT_FIELDS = """
       i.id,
       i.Name,
@@ -263,29 +288,58 @@ class ItemNotFoundError(Exception):
 def decodeBitmask(value, mapping):
   return [name for name, mask in mapping.items() if value & mask] if value else []
 
-def get_spell_options_for(kind: str) -> List[Dict[str, Any]]:
-  col_map = {"focus": "focuseffect", "click": "clickeffect", "proc": "proceffect", "bard": "bardeffect"}
-  col = col_map.get(kind)
-  if not col:
-    return []
+SPELL_OPTION_COLUMNS: Dict[str, Tuple[str, str]] = {
+  "focus": ("focuseffect", "focusname"),
+  "click": ("clickeffect", "clickname"),
+  "proc":  ("proceffect",  "procname"),
+  "bard":  ("bardeffect",  "bardspellname"),
+}
 
-  sql = f"""
-    SELECT DISTINCT i.{col} AS id, s.name
-    FROM items i
-    JOIN pok_item_sources pis ON pis.item_id = i.id
-    JOIN spells_new s ON s.id = i.{col}
-    WHERE i.{col} IS NOT NULL
-      AND i.{col} > 0
-      AND (pis.lootdropEntries IS NOT NULL
-          OR pis.merchantListEntries IS NOT NULL
-          OR pis.tradeskillRecipeEntries IS NOT NULL
-          OR pis.questEntries IS NOT NULL)
-    ORDER BY s.name ASC
+# (dataVersion, {kind: options}); rebuilt when pok tables are reseeded
+_spell_options_cache: Tuple[str, Dict[str, List[Dict[str, Any]]]] | None = None
+_spell_options_lock = Lock()
+
+def get_spell_option_lists() -> Tuple[str, Dict[str, List[Dict[str, Any]]]]:
+  """
+  (dataVersion, {kind: [{id, name}, ...]}) for every SPELL_OPTION_COLUMNS
+  kind: spells attached to at least one obtainable item, sorted by name.
+  Loaded in one round trip and reused until the data version changes.
   """
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
-    cur.execute(sql)
-    return cur.fetchall()
+  global _spell_options_cache
+  version = getDataVersion()
+  cached = _spell_options_cache
+  if cached is not None and cached[0] == version:
+    return cached
+
+  with _spell_options_lock:
+    cached = _spell_options_cache
+    if cached is not None and cached[0] == version:
+      return cached
+
+    parts = []
+    for kind, (idCol, nameCol) in SPELL_OPTION_COLUMNS.items():
+      parts.append(f"""
+        SELECT DISTINCT '{kind}' AS kind, s.{idCol} AS id, s.{nameCol} AS name
+        FROM pok_item_search s
+        WHERE s.{idCol} > 0
+          AND s.{nameCol} IS NOT NULL
+          AND s.unobtainable = 0
+      """)
+    sql = " UNION ALL ".join(parts) + " ORDER BY kind, name ASC"
+
+    lists: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in SPELL_OPTION_COLUMNS}
+    with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+      cur.execute(sql)
+      for row in cur.fetchall():
+        lists[row["kind"]].append({"id": row["id"], "name": row["name"]})
+
+    _spell_options_cache = (version, lists)
+    return _spell_options_cache
+
+def get_spell_options_for(kind: str) -> List[Dict[str, Any]]:
+  if kind not in SPELL_OPTION_COLUMNS:
+    return []
+  return get_spell_option_lists()[1][kind]
 
 def search_items_filtered(
   *,
@@ -308,40 +362,69 @@ def search_items_filtered(
   procIds:  List[int] | None = None,
   limit: int = 25,
   offset: int = 0,
+  after: str | None = None,
+  before: str | None = None,
   sortField: str = "i.Name",
-  sortOrder: str = "asc"
+  sortOrder: str = "asc",
+  exactCount: bool = False
 ) -> Dict[str, Any]:
+  """
+  Filtered item search with keyset pagination.
+
+  Pages are addressed by the opaque `after` / `before` cursors returned as
+  nextCursor / prevCursor (keyed on (sort value, id)); `offset` is only used
+  when neither cursor is given. `total` is exact when `totalExact` is true,
+  otherwise it is capped at SEARCH_COUNT_CAP.
+  """
   where, params = [], []
+  needsItems = False   # only attribute/flag filters still read `items` directly
 
   if nameQuery:
-    where.append("i.Name LIKE %s")
-    params.append(f"%{nameQuery}%")
+    nameNorm = _fold_item_name(nameQuery)
+    grams = _name_trigrams(nameNorm)
+    if grams:
+      placeholders = ",".join(["%s"] * len(grams))
+      where.append(f"""s.item_id IN (
+        SELECT t.item_id FROM pok_item_search_trigrams t
+        WHERE t.gram IN ({placeholders})
+        GROUP BY t.item_id
+        HAVING COUNT(*) = %s
+      )""")
+      params.extend(grams)
+      params.append(len(grams))
+    # Trigrams narrow the candidates; LIKE confirms the grams are contiguous
+    where.append("s.name_norm LIKE %s")
+    params.append(f"%{nameNorm}%")
+
+  def add_mask(kind: int, mask: int | None):
+    if mask is None:
+      return
+    bits = [b for b in range(31) if (mask >> b) & 1]
+    if not bits:
+      where.append("1=0")
+      return
+    placeholders = ",".join(["%s"] * len(bits))
+    where.append(f"s.item_id IN (SELECT m.item_id FROM pok_item_search_masks m WHERE m.kind = %s AND m.bit IN ({placeholders}))")
+    params.append(kind)
+    params.extend(bits)
 
   if slots:
-    mask = sum(SLOT_BITMASKS[int(s)][0] for s in slots if s.isdigit() and int(s) in SLOT_BITMASKS)
-    where.append("(i.slots & %s) <> 0")
-    params.append(mask)
-
-  if classMask is not None:
-    where.append("(i.classes & %s) <> 0")
-    params.append(classMask)
-
-  if raceMask is not None:
-    where.append("(i.races & %s) <> 0")
-    params.append(raceMask)
+    add_mask(SEARCH_MASK_SLOTS, sum(SLOT_BITMASKS[int(s)][0] for s in slots if s.isdigit() and int(s) in SLOT_BITMASKS))
+  add_mask(SEARCH_MASK_CLASSES, classMask)
+  add_mask(SEARCH_MASK_RACES, raceMask)
 
   if minLevel is not None:
-    where.append("i.reqlevel >= %s")
+    where.append("s.reqlevel >= %s")
     params.append(minLevel)
   if maxLevel is not None:
-    where.append("i.reqlevel <= %s")
+    where.append("s.reqlevel <= %s")
     params.append(maxLevel)
 
   if minRecLevel is not None:
-    where.append("i.reclevel >= %s")
+    where.append("s.reclevel >= %s")
     params.append(minRecLevel)
   if maxRecLevel is not None:
-    where.append("i.reclevel <= %s")
+    where.append("s.reclevel <= %s")
     params.append(maxRecLevel)
 
   for attr, cmp_op, val in (attrFilters or []):
@@ -349,6 +432,7 @@ def search_items_filtered(
     if col and cmp_op in CMP_OPS:
       where.append(f"{col} {cmp_op} %s")
       params.append(val)
+      needsItems = True
 
   if boolFilters:
     for key, val in boolFilters.items():
@@ -356,30 +440,31 @@ def search_items_filtered(
       if col:
         clause = f"{col} {'!=' if val == 'true' else '='} 0"
         where.append(clause)
+        needsItems = True
 
   if augmentOption == "only":
-    where.append("i.itemtype = 54")
+    where.append("s.itemtype = 54")
   elif augmentOption == "exclude":
-    where.append("i.itemtype <> 54")
+    where.append("s.itemtype <> 54")
 
   if equippableOnly:
-    where.append("i.slots > 0")
+    where.append("s.slots > 0")
 
   if itemSourceFilters:
     sourceConditions = []
     if "drop" in itemSourceFilters:
-      sourceConditions.append("pis.lootdropEntries IS NOT NULL")
+      sourceConditions.append("s.has_drop = 1")
     if "merchant" in itemSourceFilters:
-      sourceConditions.append("pis.merchantListEntries IS NOT NULL")
+      sourceConditions.append("s.has_merchant = 1")
     if "tradeskill" in itemSourceFilters:
-      sourceConditions.append("pis.tradeskillRecipeEntries IS NOT NULL")
+      sourceConditions.append("s.has_tradeskill = 1")
     if sourceConditions:
       where.append("(" + " OR ".join(sourceConditions) + ")")
 
   def add_in_list(col: str, values: List[int] | None):
     if values:
       placeholders = ",".join(["%s"] * len(values))
-      where.append(f"i.{col} IN ({placeholders})")
+      where.append(f"s.{col} IN ({placeholders})")
       params.extend(values)
 
   add_in_list("focuseffect", focusIds)
@@ -389,51 +474,150 @@ def search_items_filtered(
 
   whereClause = " AND ".join(where) if where else "1=1"
 
+  sortOrder = "desc" if str(sortOrder).lower() == "desc" else "asc"
+  if sortField not in SORTABLE_FIELDS.values():
+    sortField = SORTABLE_FIELDS["name"]
+  # ratio is NULL for delay 0; keyset comparisons need a total order
+  sortExpr = f"COALESCE({sortField}, 0)" if "NULLIF" in sortField else sortField
+
+  cursor = _decode_search_cursor(before or after)
+  backwards = cursor is not None and bool(before)
+  # Scan direction: reversed when paging backwards, then flipped back below
+  scanDesc = (sortOrder == "desc") != backwards
+  scanDir = "DESC" if scanDesc else "ASC"
+
+  pageWhere, pageParams = list(where), list(params)
+  if cursor is not None:
+    op = "<" if scanDesc else ">"
+    pageWhere.append(f"({sortExpr} {op} %s OR ({sortExpr} = %s AND i.id {op} %s))")
+    pageParams.extend([cursor[0], cursor[0], cursor[1]])
+  pageWhereClause = " AND ".join(pageWhere) if pageWhere else "1=1"
+  pageOffset = 0 if cursor is not None else max(0, int(offset or 0))
+
   dataSql = f"""
     SELECT 
       {ITEM_TABLE_SELECT_FIELDS},
-      fs.name AS focusname,
-      cs.name AS clickname,
-      ps.name AS procname,
-      bs.name AS bardspellname,
+      s.focusname,
+      s.clickname,
+      s.procname,
+      s.bardspellname,
       pis.*,
-      CASE
-        WHEN pis.item_id IS NULL
-          OR (pis.lootdropEntries IS NULL AND pis.merchantListEntries IS NULL
-            AND pis.tradeskillRecipeEntries IS NULL AND pis.questEntries IS NULL)
-        THEN 1 ELSE 0
-      END AS unobtainable
-    FROM items i
+      s.unobtainable,
+      {sortExpr} AS _sort_key
+    FROM pok_item_search s
+    JOIN items i ON i.id = s.item_id
     LEFT JOIN pok_item_sources pis ON i.id = pis.item_id
-    LEFT JOIN spells_new fs ON i.focuseffect = fs.id
-    LEFT JOIN spells_new cs ON i.clickeffect = cs.id
-    LEFT JOIN spells_new ps ON i.proceffect  = ps.id
-    LEFT JOIN spells_new bs ON i.bardeffect  = bs.id
-    WHERE {whereClause}
-    ORDER BY {sortField} {sortOrder}
+    WHERE {pageWhereClause}
+    ORDER BY {sortExpr} {scanDir}, i.id {scanDir}
     LIMIT %s OFFSET %s
   """
 
-  countSql = f"""
-    SELECT COUNT(*)
-    FROM items i
-    LEFT JOIN pok_item_sources pis ON i.id = pis.item_id
-    WHERE {whereClause}
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(dataSql, pageParams + [limit + 1, pageOffset])
+    items = list(cur.fetchall())
+    total, totalExact = _count_items_filtered(cur, whereClause, params, needsItems, exactCount)
+
+  hasMore = len(items) > limit
+  items = items[:limit]
+  if backwards:
+    items.reverse()
+
+  keys = [_encode_search_cursor(it.pop("_sort_key"), it["id"]) for it in items]
+  if backwards:
+    prevCursor = keys[0] if keys and hasMore else None
+    nextCursor = keys[-1] if keys else None
+  else:
+    prevCursor = keys[0] if keys and (cursor is not None or pageOffset > 0) else None
+    nextCursor = keys[-1] if keys and hasMore else None
+
+  return {
+    "items": items,
+    "total": total,
+    "totalExact": totalExact,
+    "prevCursor": prevCursor,
+    "nextCursor": nextCursor,
+  }
+
+# signature -> (expires_monotonic, total, exact)
+_count_cache: "OrderedDict[str, Tuple[float, int, bool]]" = OrderedDict()
+_count_cache_lock = Lock()
+
+def _count_items_filtered(cur, whereClause: str, params: List[Any], needsItems: bool, exact: bool) -> Tuple[int, bool]:
   """
-
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
-    cur.execute(dataSql, params + [limit, offset])
-    items = cur.fetchall()
-    cur.execute(countSql, params)
-    total = cur.fetchone()["COUNT(*)"]
-
-  return {"items": items, "total": total}
-
-def get_item(itemId: int) -> Dict[str, Any]:
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
+  Count matches for a filter set. Without `exact`, stops after
+  SEARCH_COUNT_CAP + 1 rows and reports (SEARCH_COUNT_CAP, False) when the
+  cap is exceeded. Results are cached per data version and normalized
+  filter signature; an exact cached count also satisfies capped requests.
+  """
+  signature = hashlib.sha1(
+    json.dumps([getDataVersion(), whereClause, params, needsItems], default=str).encode("utf-8")
+  ).hexdigest()
+  now = time.monotonic()
+  with _count_cache_lock:
+    hit = _count_cache.get(signature)
+    if hit and hit[0] > now and (hit[2] or not exact):
+      _count_cache.move_to_end(signature)
+      return hit[1], hit[2]
+
+  join = "JOIN items i ON i.id = s.item_id" if needsItems else ""
+  if exact:
+    cur.execute(f"SELECT COUNT(*) AS n FROM pok_item_search s {join} WHERE {whereClause}", params)
+    total, totalExact = int(cur.fetchone()["n"]), True
+  else:
     cur.execute(f"""
+      SELECT COUNT(*) AS n FROM (
+        SELECT 1 FROM pok_item_search s {join} WHERE {whereClause} LIMIT %s
+      ) capped
+    """, params + [SEARCH_COUNT_CAP + 1])
+    n = int(cur.fetchone()["n"])
+    total, totalExact = min(n, SEARCH_COUNT_CAP), n <= SEARCH_COUNT_CAP
+
+  with _count_cache_lock:
+    _count_cache[signature] = (now + SEARCH_COUNT_TTL_SECS, total, totalExact)
+    _count_cache.move_to_end(signature)
+    while len(_count_cache) > SEARCH_COUNT_CACHE_SIZE:
+      _count_cache.popitem(last=False)
+  return total, totalExact
+
+def _fold_item_name(name: str) -> str:
+  """Search form of a name, as stored in pok_item_search.name_norm."""
+  return name.lower().translate(_NAME_FOLD)
+
+def _name_trigrams(nameNorm: str) -> List[str]:
+  """
+  Distinct trigrams of a normalized name query, matching how
+  pok_item_search_trigrams is seeded. Empty when the query is too short or
+  uses LIKE wildcards, in which case the caller falls back to LIKE alone.
+  """
+  if len(nameNorm) < SEARCH_TRIGRAM_MIN_LEN or "%" in nameNorm or "_" in nameNorm:
+    return []
+  return sorted({nameNorm[i:i + 3] for i in range(len(nameNorm) - 2)})
+
+def _encode_search_cursor(sortValue: Any, itemId: int) -> str:
+  if isinstance(sortValue, Decimal):
+    sortValue = str(sortValue)
+  raw = json.dumps([sortValue, int(itemId)], separators=(",", ":")).encode("utf-8")
+  return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_search_cursor(token: str | None) -> Tuple[Any, int] | None:
+  """(sort value, item id) from a cursor token; None for a missing or malformed one."""
+  if not token:
+    return None
+  try:
+    raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    value, itemId = json.loads(raw)
+    if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+      return None
+    return value, int(itemId)
+  except (ValueError, TypeError):
+    logger.warning("Ignoring malformed search cursor %r", token)
+    return None
+
+# Max ids accepted by one get_items() call (one IN list)
+ITEM_BATCH_MAX = 200
+
+def _item_detail_sql(where: str) -> str:
+  return f"""
       SELECT 
         {ITEM_TABLE_SELECT_FIELDS},
         fs.name as focusname,
@@ -454,9 +638,25 @@ def get_item(itemId: int) -> Dict[str, Any]:
       LEFT JOIN spells_new cs ON i.clickeffect = cs.id
       LEFT JOIN spells_new ps ON i.proceffect = ps.id
       LEFT JOIN spells_new bs ON i.bardeffect = bs.id
-      WHERE i.id = %s
-    """, (itemId,))
+      WHERE {where}
+    """
+
+@cachedModel("item")
+def get_item(itemId: int) -> Dict[str, Any]:
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(_item_detail_sql("i.id = %s"), (itemId,))
     item = cur.fetchone()
     if not item:
       raise ItemNotFoundError(f"Item with ID {itemId} not found.")
   return item
+
+@cachedModelBatch("item")
+def get_items(itemIds: List[int]) -> Dict[int, Dict[str, Any]]:
+  """Same rows as get_item() for many ids in one query: {id: item}; unknown ids are left out."""
+  itemIds = list(itemIds)[:ITEM_BATCH_MAX]
+  if not itemIds:
+    return {}
+  placeholders = ",".join(["%s"] * len(itemIds))
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(_item_detail_sql(f"i.id IN ({placeholders})"), itemIds)
+    return {row["id"]: row for row in cur.fetchall()}
@@ -1,7 +1,8 @@
 import re
 from typing import List, Dict, Any, Tuple, Optional
 import pymysql.cursors
-from db import getDb
+from db import dbConnection
+from web.cache import cachedModel, cachedModelBatch
 from api.models.eqemu import get_current_expansion
 from applogging import get_logger
 logger = get_logger(__name__)
@@ -52,13 +53,13 @@ def search_npcs(query: str, limit: int = 20) -> List[Dict[str, Any]]:
     ORDER BY name ASC
     LIMIT %s
   """
-  with getDb().cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(sql, (f"%{query}%", limit))
     return cur.fetchall()
 
+@cachedModel("npc")
 def get_npc(npcId: int) -> Dict[str, Any]:
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(f"""
       SELECT {NPC_TYPES_TABLE_SELECT_FIELDS}
       FROM npc_types nt
@@ -69,78 +70,148 @@ def get_npc(npcId: int) -> Dict[str, Any]:
       raise NpcNotFoundError(f"NPC with ID {npcId} not found.")
   return npc
 
-def get_npc_spawnpoints(npcId: int) -> Dict[str, Any]:
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
-    expansionRule = get_current_expansion()
+# Max ids accepted by one get_npcs() call (one IN list)
+NPC_BATCH_MAX = 200
 
-    sql = f"""
-      SELECT
-        {NPC_TYPES_TABLE_SELECT_FIELDS},
-        z.short_name AS zone_shortname,
-        z.long_name AS zone_longname,
-        ROUND(s2.y, 1) AS y,
-        ROUND(s2.x, 1) AS x,
-        ROUND(s2.z, 1) AS z,
-        s2.respawntime,
-        se.chance,
-        ph.placeholder_list AS placeholders 
+@cachedModelBatch("npc")
+def get_npcs(npcIds: List[int]) -> Dict[int, Dict[str, Any]]:
+  """Same rows as get_npc() for many ids in one query: {id: npc}; unknown ids are left out."""
+  npcIds = list(npcIds)[:NPC_BATCH_MAX]
+  if not npcIds:
+    return {}
+  placeholders = ",".join(["%s"] * len(npcIds))
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(f"""
+      SELECT {NPC_TYPES_TABLE_SELECT_FIELDS}
       FROM npc_types nt
-      JOIN spawnentry se ON nt.id = se.npcID
-      JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
-      JOIN zone z ON s2.zone = z.short_name
-      LEFT JOIN (
-        SELECT 
-          spg.spawngroupID,
-          GROUP_CONCAT(CONCAT(n2.name, ' (', spg.chance, '%%)') ORDER BY n2.name SEPARATOR ', ') AS placeholder_list
-        FROM spawnentry spg
-        JOIN npc_types n2 ON n2.id = spg.npcID
-        WHERE spg.chance > 0 AND spg.npcID <> %s
-        GROUP BY spg.spawngroupID
-      ) ph ON ph.spawngroupID = s2.spawngroupID
-      WHERE nt.id = %s
-        AND se.chance > 0
-        AND ((se.min_expansion = -1 OR se.min_expansion <= %s)
-         AND (se.max_expansion = -1 OR se.max_expansion >= %s))
-        AND ((z.min_expansion = -1 OR z.min_expansion <= %s)
-         AND (z.max_expansion = -1 OR z.max_expansion >= %s))
-        AND z.expansion <= %s
-      ORDER BY z.long_name, s2.id
-    """
+      WHERE id IN ({placeholders})
+    """, npcIds)
+    return {row["id"]: row for row in cur.fetchall()}
 
-    cur.execute(sql, (
-      npcId, npcId,
-      expansionRule, expansionRule,
-      expansionRule, expansionRule,
-      expansionRule
-    ))
-    rows = cur.fetchall()
+# Max ids per IN (...) list in the batched spawn lookups
+SPAWN_LOOKUP_CHUNK_SIZE = 500
 
-  if not rows:
-    return {}
+_NPC_FIELD_NAMES = [f.split('.')[-1] for f in NPC_TYPES_TABLE_SELECT_FIELDS.replace('\n', '').replace(' ', '').split(',')]
 
-  npcFieldNames = [f.split('.')[-1] for f in NPC_TYPES_TABLE_SELECT_FIELDS.replace('\n', '').replace(' ', '').split(',')]
-  npcInfo = {k: v for k, v in rows[0].items() if k in npcFieldNames}
+def _chunks(values: List[int], size: int):
+  for i in range(0, len(values), size):
+    yield values[i:i + size]
+
+def _fetch_spawn_placeholders(cur, spawngroupIds: List[int]) -> Dict[int, List[Tuple[int, str]]]:
+  """
+  spawngroupID -> [(npcID, "name (chance%)"), ...] ordered by NPC name.
+  Each caller excludes its own NPC, matching the old per-NPC GROUP_CONCAT.
+  """
+  members: Dict[int, List[Tuple[int, str]]] = {}
+  for chunk in _chunks(spawngroupIds, SPAWN_LOOKUP_CHUNK_SIZE):
+    placeholders = ",".join(["%s"] * len(chunk))
+    cur.execute(f"""
+      SELECT spg.spawngroupID, spg.npcID, n2.name, spg.chance
+      FROM spawnentry spg
+      JOIN npc_types n2 ON n2.id = spg.npcID
+      WHERE spg.chance > 0
+        AND spg.spawngroupID IN ({placeholders})
+      ORDER BY spg.spawngroupID, n2.name
+    """, chunk)
+    for row in cur.fetchall():
+      members.setdefault(row['spawngroupID'], []).append(
+        (row['npcID'], f"{row['name']} ({row['chance']}%)")
+      )
+  return members
 
-  zoneGrouped = {}
+def get_npcs_spawnpoints(npcIds: List[int]) -> Dict[int, Dict[str, Any]]:
+  """
+  Batched get_npc_spawnpoints: npc id -> same structure get_npc_spawnpoints()
+  returns. NPCs without a valid spawnpoint are absent from the result.
+  Costs one spawnpoint query and one placeholder query per chunk of ids.
+  """
+  ids = sorted({int(n) for n in npcIds if n is not None})
+  if not ids:
+    return {}
+
+  # Resolve before checking out a connection so we never hold two at once
+  expansionRule = get_current_expansion()
+
+  rows: List[Dict[str, Any]] = []
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    for chunk in _chunks(ids, SPAWN_LOOKUP_CHUNK_SIZE):
+      placeholders = ",".join(["%s"] * len(chunk))
+      cur.execute(f"""
+        SELECT
+          {NPC_TYPES_TABLE_SELECT_FIELDS},
+          s2.spawngroupID AS spawngroup_id,
+          z.short_name AS zone_shortname,
+          z.long_name AS zone_longname,
+          ROUND(s2.y, 1) AS y,
+          ROUND(s2.x, 1) AS x,
+          ROUND(s2.z, 1) AS z,
+          s2.respawntime,
+          se.chance
+        FROM npc_types nt
+        JOIN spawnentry se ON nt.id = se.npcID
+        JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
+        JOIN zone z ON s2.zone = z.short_name
+        WHERE nt.id IN ({placeholders})
+          AND se.chance > 0
+          AND ((se.min_expansion = -1 OR se.min_expansion <= %s)
+           AND (se.max_expansion = -1 OR se.max_expansion >= %s))
+          AND ((z.min_expansion = -1 OR z.min_expansion <= %s)
+           AND (z.max_expansion = -1 OR z.max_expansion >= %s))
+          AND z.expansion <= %s
+        ORDER BY nt.id, z.long_name, s2.id
+      """, (*chunk, expansionRule, expansionRule, expansionRule, expansionRule, expansionRule))
+      rows.extend(cur.fetchall())
+
+    if not rows:
+      return {}
+
+    groupMembers = _fetch_spawn_placeholders(cur, sorted({r['spawngroup_id'] for r in rows}))
+
+  out: Dict[int, Dict[str, Any]] = {}
   for row in rows:
+    npcId = row['id']
+    npcInfo = out.get(npcId)
+    if npcInfo is None:
+      npcInfo = {k: v for k, v in row.items() if k in _NPC_FIELD_NAMES}
+      npcInfo['zones'] = {}
+      out[npcId] = npcInfo
+
+    zoneGrouped = npcInfo['zones']
     zoneKey = row['zone_shortname']
     if zoneKey not in zoneGrouped:
       zoneGrouped[zoneKey] = {
         'zone_longname': row['zone_longname'],
         'spawnpoints': []
       }
+
+    phs = [label for memberId, label in groupMembers.get(row['spawngroup_id'], ()) if memberId != npcId]
     zoneGrouped[zoneKey]['spawnpoints'].append({
       'y': row['y'],
       'x': row['x'],
       'z': row['z'],
       'respawntime': row['respawntime'],
       'chance': row['chance'],
-      'placeholders': row.get('placeholders')
+      'placeholders': ", ".join(phs) if phs else None
     })
 
-  npcInfo['zones'] = zoneGrouped
-  return npcInfo
+  return out
+
+def get_npc_spawnpoints(npcId: int) -> Dict[str, Any]:
+  return get_npcs_spawnpoints([npcId]).get(int(npcId), {})
+
+# identity/position fields carried over from a variant's spawnpoint
+_SPAWNPOINT_FIELDS = ('spawn2_id', 'spawn_id', 'id', 'x', 'y', 'z', 'heading',
+                      'respawntime', 'grid', 'pathgrid', 'room')
+
+class _SpawnpointAccumulator:
+  """One merged spawnpoint inside a get_item_drops group, finalized once at the end."""
+  __slots__ = ('fields', 'chance', 'respawntime', 'ph_map')
+
+  def __init__(self, fields: Dict[str, Any]):
+    self.fields = fields
+    self.chance = 0.0
+    self.respawntime = 0
+    self.ph_map: Dict[str, int] = {}
 
 def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
   sql = f"""
@@ -161,8 +232,7 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
       lde.chance DESC
   """
 
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(sql, (itemId,))
     npcDrops = cur.fetchall()
 
@@ -267,59 +337,47 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
     else:
       _add(ph)
 
-  def _aggregate_spawnpoints(points: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    sp_map: Dict[Tuple, Dict[str, Any]] = {}
-
+  def _accumulate_spawnpoints(acc: Dict[Tuple, _SpawnpointAccumulator], points: List[Dict[str, Any]]) -> None:
     for sp in points or []:
       key = _spawnpoint_key(sp)
+      rec = acc.get(key)
 
-      if key not in sp_map:
-        base: Dict[str, Any] = {}
+      if rec is None:
         # keep identity/position fields; NOTE: use respawntime (not respawn)
-        for k in ('spawn2_id', 'spawn_id', 'id', 'x', 'y', 'z', 'heading',
-                  'respawntime', 'grid', 'pathgrid', 'room'):
-          if k in sp:
-            base[k] = sp[k]
-
-        # ensure fields exist
-        base['chance'] = 0.0
-        base['_ph_map'] = {}
-
-        # normalize respawntime to an int
-        base['respawntime'] = _safe_int(base.get('respawntime'), 0)
-
-        sp_map[key] = base
-
-      rec = sp_map[key]
+        rec = _SpawnpointAccumulator({k: sp[k] for k in _SPAWNPOINT_FIELDS if k in sp})
+        acc[key] = rec
 
       # accumulate chance from any of the source columns used earlier
-      rec['chance'] += _safe_float(sp.get('chance') or sp.get('spawn_chance') or sp.get('prob'))
+      rec.chance += _safe_float(sp.get('chance') or sp.get('spawn_chance') or sp.get('prob'))
 
       # merge PHs
-      _merge_ph(rec['_ph_map'], sp.get('ph') or sp.get('ph_list') or sp.get('placeholders'))
+      _merge_ph(rec.ph_map, sp.get('ph') or sp.get('ph_list') or sp.get('placeholders'))
 
       # merge respawntime: prefer smallest positive; replace 0/None
       secs = _safe_int(sp.get('respawntime'), 0)
-      cur  = _safe_int(rec.get('respawntime'), 0)
-      if secs > 0 and (cur == 0 or secs < cur):
-        rec['respawntime'] = secs
+      if secs > 0 and (rec.respawntime == 0 or secs < rec.respawntime):
+        rec.respawntime = secs
 
-    # finalize list
+  def _finalize_spawnpoints(acc: Dict[Tuple, _SpawnpointAccumulator]) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
-    for rec in sp_map.values():
-      ph_map = rec.pop('_ph_map', None)
-      if ph_map:
-        rec['ph'] = [
+    for rec in acc.values():
+      sp = dict(rec.fields)
+      sp['respawntime'] = rec.respawntime
+      sp['chance'] = rec.chance
+      if rec.ph_map:
+        sp['ph'] = [
           {'name': n, 'chance': c}
-          for n, c in sorted(ph_map.items(), key=lambda kv: kv[1], reverse=True)
+          for n, c in sorted(rec.ph_map.items(), key=lambda kv: kv[1], reverse=True)
         ]
-      out.append(rec)
+      out.append(sp)
 
     out.sort(key=lambda r: r.get('chance', 0.0), reverse=True)
     return out
 
+  spawnDataByNpc = get_npcs_spawnpoints([npc['id'] for npc in npcDrops])
+
   for npc in npcDrops:
-    npcSpawnData = get_npc_spawnpoints(npc['id'])
+    npcSpawnData = spawnDataByNpc.get(npc['id'])
     if not npcSpawnData or not npcSpawnData.get('zones'):
       continue
 
@@ -337,11 +395,11 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
 
     for zoneShort, zoneData in zones.items():
       zlong = zoneData.get('zone_longname')
-      new_points = list(zoneData.get('spawnpoints') or [])
       group_key = (npcInfo['name'], zoneShort, dtm, dch, dmp)
 
-      if group_key not in aggregated:
-        aggregated[group_key] = {
+      g = aggregated.get(group_key)
+      if g is None:
+        g = aggregated[group_key] = {
           'npc'                 : meta.copy(),   # replaced by best variant for this (name,zone,drop*) group
           '_best_meta'          : meta.copy(),
           '_best_score'         : score,
@@ -350,16 +408,9 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
           'drop_table_multiplier': dtm,
           'drop_chance'         : float(dch),
           'drop_multiplier'     : dmp,
-          'zones': {
-            zoneShort: {
-              'zone_longname': zlong,
-              'spawnpoints'  : _aggregate_spawnpoints(new_points)
-            }
-          }
+          'zones'               : {},
         }
       else:
-        g = aggregated[group_key]
-
         # expand level range inside this group
         if g['_min_level'] is None or (cur_level is not None and cur_level < g['_min_level']):
           g['_min_level'] = cur_level
@@ -371,12 +422,13 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
           g['_best_score'] = score
           g['_best_meta'] = meta.copy()
 
-        # re-aggregate this zone's spawnpoints (sum chances & PHs)
-        existing = g['zones'].get(zoneShort, {'zone_longname': zlong, 'spawnpoints': []})
-        g['zones'][zoneShort] = {
-          'zone_longname': zlong or existing.get('zone_longname'),
-          'spawnpoints'  : _aggregate_spawnpoints(list(existing.get('spawnpoints') or []) + new_points)
-        }
+      # fold this variant's spawnpoints into the zone accumulator (sum chances & PHs)
+      zone = g['zones'].get(zoneShort)
+      if zone is None:
+        zone = g['zones'][zoneShort] = {'zone_longname': zlong, '_acc': {}}
+      elif zlong:
+        zone['zone_longname'] = zlong
+      _accumulate_spawnpoints(zone['_acc'], zoneData.get('spawnpoints'))
 
   # finalize each group
   out: List[Dict[str, Any]] = []
@@ -386,14 +438,15 @@ def get_item_drops(itemId: int) -> List[Dict[str, Any]]:
     g['npc']['level'] = g.pop('_min_level')
     g['npc']['maxlevel'] = g.pop('_max_level')
     g.pop('_best_score', None)
+    for zone in g['zones'].values():
+      zone['spawnpoints'] = _finalize_spawnpoints(zone.pop('_acc'))
     out.append(g)
 
   return out
 
 def get_item_merchants(itemId: int) -> List[int]:
-  db = getDb()
-  with db.cursor() as cur:
-    expansionRule = get_current_expansion()
+  expansionRule = get_current_expansion()
+  with dbConnection("heavy") as db, db.cursor() as cur:
     cur.execute("""
       SELECT
         nt.id as npcId,
@@ -0,0 +1,121 @@
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from db import dbConnection
+from web.cache import MODEL_CACHE
+from applogging import get_logger
+logger = get_logger(__name__)
+
+HEAT_MODES = ("density", "rate")
+# Respawn timers below this are treated as this long when estimating spawns/hour
+RATE_MIN_RESPAWN_SECS = 30
+
+def _load_zone_spawns(zone_short_name: str) -> List[Dict[str, Any]]:
+  sql = """
+    SELECT
+      sv.npc_spawn_id,
+      sv.npc_spawngroup_id,
+      sv.npc_spawn_x          AS x,
+      sv.npc_spawn_y          AS y,
+      sv.npc_spawn_z          AS z,
+      sv.npc_spawn_time       AS respawn_secs,
+      sv.npc_spawn_variance   AS respawn_variance_secs,
+      sv.npc_id,
+      sv.npc_name,
+      sv.npc_level_min,
+      sv.npc_level_max,
+      sv.npc_rare,
+      sv.npc_raid,
+      sv.npc_spawn_chance     AS chance
+    FROM pok_spawn_variants sv
+    WHERE sv.zone_short_name = %s
+    ORDER BY sv.npc_spawn_id, sv.npc_id
+  """
+  with dbConnection() as db, db.cursor() as cur:
+    cur.execute(sql, (zone_short_name,))
+    rows = cur.fetchall()
+  for row in rows:
+    for key in ("x", "y", "z", "chance"):
+      row[key] = float(row[key])
+  return rows
+
+def get_zone_spawns(zone_short_name: str) -> List[Dict[str, Any]]:
+  """
+  Every (spawn point, NPC) variant in a zone, in game coordinates. Shared
+  per process until the data version changes; callers must not modify
+  the rows.
+  """
+  return MODEL_CACHE.getOrLoad(("zone_spawns", zone_short_name), lambda: _load_zone_spawns(zone_short_name))
+
+def get_zone_spawn_points(zone_short_name: str) -> List[Dict[str, Any]]:
+  """
+  One row per spawn point: location, the best chance among its variants
+  and the names that can appear there (most likely first).
+  """
+  points: Dict[int, Dict[str, Any]] = {}
+  for row in get_zone_spawns(zone_short_name):
+    point = points.get(row["npc_spawn_id"])
+    if point is None:
+      point = points[row["npc_spawn_id"]] = {
+        "npc_spawn_id": row["npc_spawn_id"],
+        "x": row["x"], "y": row["y"], "z": row["z"],
+        "chance": row["chance"],
+        "variants": [],
+      }
+    point["chance"] = max(point["chance"], row["chance"])
+    point["variants"].append((row["chance"], row["npc_name"]))
+  for point in points.values():
+    point["npc_names"] = [name for _, name in sorted(point.pop("variants"), key=lambda v: -v[0])]
+    point["npc_name"] = point["npc_names"][0]
+  return list(points.values())
+
+def filter_zone_spawns(
+  rows: List[Dict[str, Any]],
+  *,
+  npc_id: Optional[int] = None,
+  min_level: Optional[int] = None,
+  max_level: Optional[int] = None,
+  rare: Optional[bool] = None,
+  raid: Optional[bool] = None,
+) -> List[Dict[str, Any]]:
+  """Variants matching every given filter (levels overlap the NPC's range)."""
+  out = []
+  for row in rows:
+    if npc_id is not None and row["npc_id"] != npc_id:
+      continue
+    if min_level is not None and row["npc_level_max"] < min_level:
+      continue
+    if max_level is not None and row["npc_level_min"] > max_level:
+      continue
+    if rare is not None and bool(row["npc_rare"]) != rare:
+      continue
+    if raid is not None and bool(row["npc_raid"]) != raid:
+      continue
+    out.append(row)
+  return out
+
+def _load_zone_spawn_heat(zone_short_name: str, mode: str, filters: Tuple) -> Tuple[np.ndarray, np.ndarray]:
+  rows = filter_zone_spawns(get_zone_spawns(zone_short_name), **dict(filters))
+  xy = np.array([(row["x"], row["y"]) for row in rows], dtype=np.float64).reshape(-1, 2)
+  chance = np.array([row["chance"] for row in rows], dtype=np.float64) / 100.0
+  if mode == "rate":
+    respawn = np.array([row["respawn_secs"] for row in rows], dtype=np.float64)
+    weights = chance * 3600.0 / np.maximum(respawn, RATE_MIN_RESPAWN_SECS)
+  else:
+    weights = chance
+  return xy, weights
+
+def get_zone_spawn_heat(zone_short_name: str, mode: str = "density", **filters) -> Tuple[np.ndarray, np.ndarray]:
+  """
+  Heatmap input for a zone: ((N, 2) game x/y, (N,) weights), one entry per
+  matching variant. "density" weighs each variant by its chance, so a
+  spawn point whose variants all match counts once; "rate" is expected
+  spawns per hour (chance * 3600 / respawn time). Cached per
+  (zone, mode, filters) until the data version changes.
+  """
+  if mode not in HEAT_MODES:
+    raise ValueError(f"Unknown heatmap mode `{mode}`")
+  key = tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+  return MODEL_CACHE.getOrLoad(
+    ("zone_spawn_heat", zone_short_name, mode, key),
+    lambda: _load_zone_spawn_heat(zone_short_name, mode, key),
+  )
@@ -1,7 +1,8 @@
 from typing import List, Dict, Any
 import pymysql.cursors
-from db import getDb
-from api.models.npcs import get_npc_spawnpoints
+from db import dbConnection
+from web.cache import cachedModel, cachedModelBatch
+from api.models.npcs import get_npcs_spawnpoints
 from api.models.characters import get_character
 from applogging import get_logger
 logger = get_logger(__name__)
@@ -427,7 +428,7 @@ def search_spells(query: str, limit: int = 20) -> List[Dict[str, Any]]:
     ORDER BY name ASC
     LIMIT %s
   """
-  with getDb().cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(sql, (f"%{query}%", limit))
     return cur.fetchall()
 
@@ -461,26 +462,43 @@ def get_spells_for_character(charId: int) -> List[Dict[str, Any]]:
     GROUP BY s.id
     ORDER BY s.{classColumn}, s.name
   """
-  with getDb().cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(sql, (charId, charLevel))
     return cur.fetchall()
 
-def get_spell(spellId: int) -> Dict[str, Any]:
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
-    cur.execute(f"""
+# Max ids accepted by one get_spells() call (one IN list)
+SPELL_BATCH_MAX = 200
+
+def _spell_detail_sql(where: str) -> str:
+  return f"""
       SELECT {SPELL_TABLE_SELECT_FIELDS}
       FROM spells_new s
       LEFT JOIN items i ON s.id = i.scrolleffect
       LEFT JOIN pok_item_sources pis ON i.id = pis.item_id
-      WHERE s.id = %s
+      WHERE {where}
       GROUP BY s.id
-    """, (spellId,))
+    """
+
+@cachedModel("spell")
+def get_spell(spellId: int) -> Dict[str, Any]:
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(_spell_detail_sql("s.id = %s"), (spellId,))
     spell = cur.fetchone()
     if not spell:
       raise SpellNotFoundError(f"Spell with ID {spellId} not found.")
   return spell
 
+@cachedModelBatch("spell")
+def get_spells(spellIds: List[int]) -> Dict[int, Dict[str, Any]]:
+  """Same rows as get_spell() for many ids in one query: {id: spell}; unknown ids are left out."""
+  spellIds = list(spellIds)[:SPELL_BATCH_MAX]
+  if not spellIds:
+    return {}
+  placeholders = ",".join(["%s"] * len(spellIds))
+  with dbConnection() as db, db.cursor(pymysql.cursors.DictCursor) as cur:
+    cur.execute(_spell_detail_sql(f"s.id IN ({placeholders})"), spellIds)
+    return {row["id"]: row for row in cur.fetchall()}
+
 def get_spell_drops(spellId: int) -> List[Dict[str, Any]]:
   sql = """
     SELECT
@@ -501,15 +519,15 @@ def get_spell_drops(spellId: int) -> List[Dict[str, Any]]:
     ORDER BY effective_chance DESC
   """
 
-  db = getDb()
-  with db.cursor(pymysql.cursors.DictCursor) as cur:
+  with dbConnection("heavy") as db, db.cursor(pymysql.cursors.DictCursor) as cur:
     cur.execute(sql, (spellId,))
     npcDrops = cur.fetchall()
 
   aggregated = {}
+  spawnDataByNpc = get_npcs_spawnpoints([npc['npc_id'] for npc in npcDrops])
 
   for npc in npcDrops:
-    npcSpawnData = get_npc_spawnpoints(npc['npc_id'])
+    npcSpawnData = spawnDataByNpc.get(npc['npc_id'])
     if not npcSpawnData or not npcSpawnData.get('zones'):
       continue
 
@@ -555,8 +573,7 @@ def get_spell_drops(spellId: int) -> List[Dict[str, Any]]:
   return list(aggregated.values())
 
 def get_spell_merchants(spellId: int) -> List[int]:
-  db = getDb()
-  with db.cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(f"""
       SELECT pis.merchantListEntries
       FROM spells_new s
@@ -572,8 +589,7 @@ def get_spell_merchants(spellId: int) -> List[int]:
   return [int(mid) for mid in row[0].split(',')]
 
 def get_spell_recipes(spellId: int) -> List[int]:
-  db = getDb()
-  with db.cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     cur.execute(f"""
       SELECT pis.tradeskillRecipeEntries
       FROM spells_new s
@@ -1,5 +1,5 @@
 from typing import Dict, List
-from db import getDb
+from db import dbConnection
 from api.models.eqemu import get_current_expansion
 from applogging import get_logger
 logger = get_logger(__name__)
@@ -73,7 +73,7 @@ TRADESKILL_OBJECT_TABLE = """
     UNION ALL SELECT 53, 'Augment')"""
 
 def get_skills_by_character(characterID: int) -> dict:
-  with getDb().cursor() as cur:
+  with dbConnection() as db, db.cursor() as cur:
     # Step 1: Get character's class and race
     cur.execute("SELECT class, race FROM character_data WHERE id = %s AND deleted_at IS NULL", (characterID,))
     row = cur.fetchone()
@@ -193,9 +193,9 @@ def process_recipe_results(rows):
   return list(recipes.values())
 
 def get_skill_up_recipes(skillId, skillLevel):
-  with getDb().cursor() as cur:
-    expansionRule = get_current_expansion()
+  expansionRule = get_current_expansion()
 
+  with dbConnection("heavy") as db, db.cursor() as cur:
     cur.execute(f"""
       {TRADESKILL_OBJECT_TABLE}
 
@@ -237,10 +237,9 @@ def get_skill_up_recipes(skillId, skillLevel):
   return process_recipe_results(rows)
 
 def get_item_recipes(itemId: int) -> List[Dict]:
-  db = getDb()
   expansionRule = get_current_expansion()
 
-  with db.cursor() as cur:
+  with dbConnection("heavy") as db, db.cursor() as cur:
     cur.execute(f"""
       {TRADESKILL_OBJECT_TABLE}
 
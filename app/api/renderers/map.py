@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from typing import List, Tuple, Dict, Any, Optional, Callable
+from collections import OrderedDict
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
-import re, io, hashlib, threading
+import numpy as np
+import re, io, os, sys, time, glob, hashlib, tempfile, threading
 
 from applogging import get_logger
 logger = get_logger(__name__)
@@ -22,13 +25,36 @@ DEFAULT_FONT_SIZE_PT = 18
 DEFAULT_FLIP_X = False
 DEFAULT_FLIP_Y = True
 
+# Rendered PNG layers are cached on local disk (shared by all workers) and
+# evicted least-recently-used once the directory exceeds its byte budget.
+MAP_CACHE_DIR = os.environ.get("POK_MAP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "pok-map-cache"))
+MAP_CACHE_MAX_BYTES = int(os.environ.get("POK_MAP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Parsed geometry kept in memory per worker (segments, points and bounds)
+MAP_GEOMETRY_MAX_BYTES = int(os.environ.get("POK_MAP_GEOMETRY_MAX_BYTES", str(128 * 1024 * 1024)))
+# Zone map files (brewall format: <zone>.txt, <zone>_1.txt, ...)
+MAP_DIR = os.environ.get("POK_MAP_DIR", "/app/server/maps")
+
+# Bump when rendering output changes so old PNGs are never served
+MAP_RENDER_VERSION = 3
+
+# Encoders: PNG zlib level 0-9 (lower is faster, larger); WebP lossless or
+# lossy at a quality, with `method` 0-6 trading speed for size
+MAP_PNG_COMPRESS_LEVEL = int(os.environ.get("POK_MAP_PNG_COMPRESS_LEVEL", "6"))
+MAP_WEBP_LOSSLESS = os.environ.get("POK_MAP_WEBP_LOSSLESS", "1").lower() in ("1", "true", "yes")
+MAP_WEBP_QUALITY = int(os.environ.get("POK_MAP_WEBP_QUALITY", "80"))
+MAP_WEBP_METHOD = int(os.environ.get("POK_MAP_WEBP_METHOD", "4"))
+
 # -------------------- Internal state --------------------
 
 _num_re = re.compile(r"-?\d+\.?\d*")
 
-# Cache: ref_map_path -> (minX, maxX, minY, maxY)
-_bounds_cache: Dict[str, Tuple[float, float, float, float]] = {}
-_bounds_lock = threading.RLock()
+# Marker sprites: (marker, size, color) -> (opaque ink, alpha mask, offset_x, offset_y)
+_SPRITE_CACHE_MAX = 1024
+_sprite_cache: "OrderedDict[Tuple[str, int, Tuple[int,int,int,int]], Tuple[Image.Image, Image.Image, int, int]]" = OrderedDict()
+_sprite_lock = threading.Lock()
+
+# Label culling grid cell (px); about one label height
+LABEL_GRID_CELL_PX = 32
 
 # Lazy-loaded font
 _font: Optional[ImageFont.FreeTypeFont] = None
@@ -69,17 +95,160 @@ def color_from_value(value: float, vmin: float, vmax: float, *, alpha: int = 220
         b = int(0 + (30 - 0) * u)
     return (r, g, b, max(0, min(255, alpha)))
 
-def image_to_png_bytes(img: Image.Image) -> bytes:
+def image_to_png_bytes(img: Image.Image, compress_level: Optional[int] = None) -> bytes:
     bio = io.BytesIO()
-    img.save(bio, format="PNG")
+    level = MAP_PNG_COMPRESS_LEVEL if compress_level is None else compress_level
+    img.save(bio, format="PNG", compress_level=max(0, min(9, int(level))))
     return bio.getvalue()
 
+def image_to_webp_bytes(img: Image.Image) -> bytes:
+    bio = io.BytesIO()
+    img.save(bio, format="WEBP", lossless=MAP_WEBP_LOSSLESS, quality=MAP_WEBP_QUALITY, method=MAP_WEBP_METHOD)
+    return bio.getvalue()
+
+def encode_image(img: Image.Image, fmt: str) -> bytes:
+    """`fmt` is "png" or "webp", encoded with the configured settings."""
+    return image_to_webp_bytes(img) if fmt == "webp" else image_to_png_bytes(img)
+
+def encoder_settings(fmt: str) -> Tuple[Any, ...]:
+    """Everything that changes encode_image() output for `fmt` (part of cache keys)."""
+    if fmt == "webp":
+        return ("webp", MAP_WEBP_LOSSLESS, MAP_WEBP_QUALITY, MAP_WEBP_METHOD)
+    return ("png", MAP_PNG_COMPRESS_LEVEL)
+
 def make_cache_key(*parts: Any) -> str:
     h = hashlib.sha256()
     for p in parts:
         h.update(p if isinstance(p, (bytes, bytearray)) else str(p).encode("utf-8", "ignore"))
     return h.hexdigest()[:16]
 
+def file_stamp(path: str) -> Tuple[int, int]:
+    """(mtime_ns, size): changes whenever the file is rewritten."""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+class DiskLRUCache:
+    """
+    Files under `root`, bounded by `max_bytes`. Reads bump the file mtime so
+    eviction (oldest mtime first) is least-recently-used. Writes go through
+    a temp file + rename, so concurrent workers never see partial files.
+
+    Each process keeps a running byte total (seeded by one scan of the tree,
+    then updated on every put/evict). The tree is only walked again, in a
+    background thread, when that total goes over budget or every
+    `rescan_secs` to pick up other processes' writes, so request threads
+    never pay for a directory scan.
+    """
+    def __init__(self, root: str, max_bytes: int, *, rescan_secs: float = 600.0):
+        self.root = root
+        self.max_bytes = int(max_bytes)
+        self.rescan_secs = float(rescan_secs)
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None   # None until the first scan finishes
+        self._scanning = False
+        self._scanned_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], name)
+
+    def get(self, name: str) -> Optional[bytes]:
+        path = self._path(name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            logger.exception("Map cache write failed: %s", path)
+            return
+        with self._lock:
+            if self._total is not None:
+                self._total += len(data) - old_size
+            due = (
+                self._total is None
+                or self._total > self.max_bytes
+                or time.monotonic() - self._scanned_at >= self.rescan_secs
+            )
+            if not due or self._scanning:
+                return
+            self._scanning = True
+        threading.Thread(target=self._scan_and_evict, name="pok-map-cache-evict", daemon=True).start()
+
+    def _scan_and_evict(self) -> None:
+        try:
+            self.evict()
+        except Exception:
+            logger.exception("Map cache eviction failed: %s", self.root)
+        finally:
+            with self._lock:
+                self._scanning = False
+
+    def evict(self) -> None:
+        """
+        Walk the tree, re-seed the byte total and delete oldest files until
+        the cache is back under 90% of its budget. Runs off the request
+        path (see put()); callers like the seeding CLI may call it directly.
+        """
+        entries = []
+        total = 0
+        for dirpath, _, files in os.walk(self.root):
+            for fn in files:
+                p = os.path.join(dirpath, fn)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+        removed = 0
+        if total > self.max_bytes:
+            target = int(self.max_bytes * 0.9)
+            for _, size, p in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(p)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+        with self._lock:
+            self._total = total
+            self._scanned_at = time.monotonic()
+            self.evictions += removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"root": self.root, "maxBytes": self.max_bytes, "bytes": self._total,
+                    "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+_layer_cache = DiskLRUCache(MAP_CACHE_DIR, MAP_CACHE_MAX_BYTES)
+
 # -------------------- Parsing --------------------
 
 def clean_label(label: str) -> str:
@@ -95,72 +264,176 @@ def clean_label(label: str) -> str:
         s = re.sub(pat, "", s)
     return s.strip()
 
+_EMPTY_BOUNDS = (0.0, 1.0, 0.0, 1.0)
+
+def _parse_point(s: str) -> Optional[Dict[str, Any]]:
+    nums = [float(n) for n in _num_re.findall(s)]
+    if len(nums) < 7:   # correct spec: 7 numbers required
+        return None
+    x, y, z, r, g, b, size = nums[:7]
+    try:
+        label = s.split(",", 7)[-1].strip()
+    except Exception:
+        label = ""
+    return {
+        "xMap": x, "yMap": y, "z": z,
+        "rgb": (int(r), int(g), int(b)),
+        "size": int(size),
+        "label": clean_label(label.replace("_", " ")),
+    }
+
+def _line_fields(bodies: List[str]) -> np.ndarray:
+    """(N, 9) float64 [x1,y1,z1,x2,y2,z2,r,g,b] for the L-record bodies."""
+    rows = []
+    for body in bodies:
+        parts = body.replace(",", " ").split()
+        if len(parts) >= 9:
+            rows.append(parts[:9])
+    if not rows:
+        return np.empty((0, 9), dtype=np.float64)
+    try:
+        # NumPy converts the whole string table in one call
+        return np.array(rows, dtype=np.float64)
+    except ValueError:
+        # Odd tokens somewhere (e.g. "1.0.0"); fall back to the regex per line
+        nums = [[float(n) for n in _num_re.findall(b)] for b in bodies]
+        return np.array([n[:9] for n in nums if len(n) >= 9], dtype=np.float64).reshape(-1, 9)
+
 def parse_eq_file(path: str) -> Dict[str, Any]:
     """
     Parse a file that may contain BOTH:
       P x,y,z, r,g,b, size, Label_Text
       L x1,y1,z1, x2,y2,z2, r,g,b
-    Returns {"points": [...], "segments": [...]} with MAP-space coords.
+    Returns MAP-space geometry:
+      "segments":       (N, 4) float32 [x1, y1, x2, y2]
+      "segment_colors": (N, 3) uint8 RGB
+      "points":         [{xMap, yMap, z, rgb, size, label}, ...]
+      "bounds":         (minX, maxX, minY, maxY) of the segments
     """
     points: List[Dict[str, Any]] = []
-    segs: List[Tuple[float,float,float,float,Tuple[int,int,int]]] = []
+    lineBodies: List[str] = []
     with open(path, "r", encoding="utf-8", errors="ignore") as f:
         for raw in f:
             s = raw.strip()
             if not s or s[0] in ("#", ";"):
                 continue
             tag = s[0].upper()
-            if tag == "P":
-                nums = [float(n) for n in _num_re.findall(s)]
-                if len(nums) < 7:   # correct spec: 7 numbers required
-                    continue
-                x, y, z, r, g, b, size = nums[:7]
-                try:
-                    label = s.split(",", 7)[-1].strip()
-                except Exception:
-                    label = ""
-                points.append({
-                    "xMap": x, "yMap": y, "z": z,
-                    "rgb": (int(r), int(g), int(b)),
-                    "size": int(size),
-                    "label": clean_label(label.replace("_", " ")),
-                })
-            elif tag == "L":
-                nums = [float(n) for n in _num_re.findall(s)]
-                if len(nums) < 9:
-                    continue
-                x1, y1, _z1, x2, y2, _z2, r, g, b = nums[:9]
-                segs.append((x1, y1, x2, y2, (int(r), int(g), int(b))))
-    return {"points": points, "segments": segs}
+            if tag == "L":
+                lineBodies.append(s[1:])
+            elif tag == "P":
+                pt = _parse_point(s)
+                if pt is not None:
+                    points.append(pt)
+
+    fields = _line_fields(lineBodies)
+    segs = np.ascontiguousarray(fields[:, [0, 1, 3, 4]], dtype=np.float32)
+    colors = np.clip(fields[:, 6:9], 0, 255).astype(np.uint8)
+    if len(segs):
+        xs = fields[:, [0, 3]]; ys = fields[:, [1, 4]]
+        bounds = (float(xs.min()), float(xs.max()), float(ys.min()), float(ys.max()))
+    else:
+        bounds = _EMPTY_BOUNDS
+    return {"segments": segs, "segment_colors": colors, "points": points, "bounds": bounds}
+
+def _geometry_nbytes(geo: Dict[str, Any]) -> int:
+    n = geo["segments"].nbytes + geo["segment_colors"].nbytes
+    for p in geo["points"]:
+        n += sys.getsizeof(p) + sys.getsizeof(p["label"]) + 200   # dict + label + boxed scalars
+    return n
+
+class GeometryStore:
+    """
+    Parsed map files (segments, points and bounds together), keyed by path
+    and validated by (mtime_ns, size) on every lookup, so an edited file is
+    re-parsed. Least-recently-used files are dropped past `max_bytes`.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = int(max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Dict[str, Any], int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.parse_secs = 0.0
+
+    def get(self, path: str) -> Dict[str, Any]:
+        stamp = file_stamp(path)
+        with self._lock:
+            hit = self._entries.get(path)
+            if hit is not None and hit[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return hit[1]
+            self.misses += 1
+            if hit is not None:
+                self.reloads += 1
+
+        started = time.monotonic()
+        geo = parse_eq_file(path)
+        size = _geometry_nbytes(geo)
+
+        with self._lock:
+            self.parse_secs += time.monotonic() - started
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self._bytes -= old[2]
+            if size <= self.max_bytes:
+                self._entries[path] = (stamp, geo, size)
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, _, n) = self._entries.popitem(last=False)
+                self._bytes -= n
+                self.evictions += 1
+        return geo
+
+    def warm(self, directory: str = MAP_DIR, pattern: str = "*.txt") -> int:
+        """Parse every map file under `directory` (until the budget is full)."""
+        loaded = 0
+        started = time.monotonic()
+        for path in sorted(glob.glob(os.path.join(directory, "**", pattern), recursive=True)):
+            try:
+                self.get(path)
+                loaded += 1
+            except Exception:
+                logger.exception("Map warm-up failed for %s", path)
+            with self._lock:
+                if self._bytes >= self.max_bytes:
+                    break
+        logger.info("Map geometry warm-up: %d files from %s in %.1fs (%d bytes)",
+                    loaded, directory, time.monotonic() - started, self._bytes)
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "files": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else None,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "parseSecs": round(self.parse_secs, 3),
+            }
+
+GEOMETRY_STORE = GeometryStore(MAP_GEOMETRY_MAX_BYTES)
+
+def load_eq_file(path: str) -> Dict[str, Any]:
+    """parse_eq_file() through GEOMETRY_STORE; re-parsed only when the file changes."""
+    return GEOMETRY_STORE.get(path)
 
 # -------------------- Bounds / transforms --------------------
 
 def _compute_bounds_from_file(path: str) -> Tuple[float,float,float,float]:
-    """Bounds derived from L segments in the reference file."""
-    minX = float("inf"); maxX = float("-inf")
-    minY = float("inf"); maxY = float("-inf")
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            s = raw.strip()
-            if not s or not s.startswith("L"):
-                continue
-            nums = [float(n) for n in _num_re.findall(s)]
-            if len(nums) < 6:
-                continue
-            x1, y1, _z1, x2, y2, _z2 = nums[:6]
-            minX = min(minX, x1, x2); maxX = max(maxX, x1, x2)
-            minY = min(minY, y1, y2); maxY = max(maxY, y1, y2)
-    if minX == float("inf"):
-        return (0.0, 1.0, 0.0, 1.0)
-    return (minX, maxX, minY, maxY)
+    """Bounds derived from L segments in the reference file (computed while parsing)."""
+    return load_eq_file(path)["bounds"]
 
 def get_bounds(ref_map_path: str) -> Tuple[float,float,float,float]:
-    with _bounds_lock:
-        b = _bounds_cache.get(ref_map_path)
-        if b: return b
-        b = _compute_bounds_from_file(ref_map_path)
-        _bounds_cache[ref_map_path] = b
-        return b
+    return GEOMETRY_STORE.get(ref_map_path)["bounds"]
 
 def game_to_map_xy(x_game: float, y_game: float) -> Tuple[float, float]:
     # EverQuest convention: map coords are (-Y_game, -X_game)
@@ -188,38 +461,150 @@ def _scale_for_size(bounds: Tuple[float,float,float,float], width_px: int, heigh
     yPad = (height_px - usedH) / 2.0
     return scale, xPad, yPad
 
+def _to_px_array(
+    xy: np.ndarray, bounds: Tuple[float,float,float,float], *,
+    scale: float, x_pad: float, y_pad: float, flip_x: bool, flip_y: bool
+) -> np.ndarray:
+    """
+    Vectorized _apply_orientation + _to_px: `xy` is (..., 2k) with x,y
+    pairs interleaved; returns int32 pixel coordinates of the same shape.
+    """
+    minX, maxX, minY, maxY = bounds
+    out = np.empty(xy.shape, dtype=np.float64)
+    x = xy[..., 0::2].astype(np.float64)
+    y = xy[..., 1::2].astype(np.float64)
+    if flip_x:
+        x = maxX - (x - minX)
+    if flip_y:
+        y = maxY - (y - minY)
+    out[..., 0::2] = x_pad + (x - minX) * scale
+    out[..., 1::2] = y_pad + (maxY - y) * scale
+    return np.rint(out).astype(np.int32)
+
 def _to_px(x_map: float, y_map: float, bounds: Tuple[float,float,float,float], *, scale: float, x_pad: float, y_pad: float) -> Tuple[int, int]:
     minX, maxX, minY, maxY = bounds
     px = int(round(x_pad + (x_map - minX) * scale))
     py = int(round(y_pad + (maxY - y_map) * scale))  # image Y grows downward
     return px, py
 
+Viewport = Tuple[int, int, int, int]   # (left, top, width, height) in px
+
+def _viewport_box(width_px: int, height_px: int, viewport: Optional[Viewport]) -> Viewport:
+    """The part of a width_px x height_px render to produce (all of it by default)."""
+    if viewport is None:
+        return 0, 0, width_px, height_px
+    left, top, w, h = (int(v) for v in viewport)
+    return left, top, w, h
+
 # -------------------- Low-level renderers --------------------
 
 def _render_lines_layer(
     ref_map_path: str,
-    segments: List[Tuple[float,float,float,float,Tuple[int,int,int]]],
+    segments: np.ndarray,            # (N, 4) float32 MAP-space [x1, y1, x2, y2]
+    colors: np.ndarray,              # (N, 3) uint8
     width_px: int, height_px: int,
     *,
     line_width_px: int = DEFAULT_LINE_WIDTH_PX,
     line_alpha: int = 255,
     padding_px: int = DEFAULT_PADDING_PX,
     flip_x: bool = DEFAULT_FLIP_X,
-    flip_y: bool = DEFAULT_FLIP_Y
+    flip_y: bool = DEFAULT_FLIP_Y,
+    viewport: Optional[Viewport] = None  # render only this window of the full canvas
 ) -> Image.Image:
     bounds = get_bounds(ref_map_path)
     scale, xPad, yPad = _scale_for_size(bounds, width_px, height_px, padding_px)
-    img = Image.new("RGBA", (width_px, height_px), (0, 0, 0, 0))
+    left, top, vw, vh = _viewport_box(width_px, height_px, viewport)
+    img = Image.new("RGBA", (vw, vh), (0, 0, 0, 0))
     draw = ImageDraw.Draw(img, "RGBA")
     a = max(0, min(255, int(line_alpha)))
-    for (x1, y1, x2, y2, rgb) in segments:
-        X1, Y1 = _apply_orientation(x1, y1, bounds, flip_x=flip_x, flip_y=flip_y)
-        X2, Y2 = _apply_orientation(x2, y2, bounds, flip_x=flip_x, flip_y=flip_y)
-        p1 = _to_px(X1, Y1, bounds, scale=scale, x_pad=xPad, y_pad=yPad)
-        p2 = _to_px(X2, Y2, bounds, scale=scale, x_pad=xPad, y_pad=yPad)
-        draw.line([p1, p2], fill=rgb + (a,), width=line_width_px)
+    if not len(segments):
+        return img
+
+    px = _to_px_array(segments, bounds, scale=scale, x_pad=xPad - left, y_pad=yPad - top, flip_x=flip_x, flip_y=flip_y)
+
+    # Drop segments entirely off-canvas. With opaque lines, also drop repeats
+    # that land on the same pixels in the same color (common once a big zone
+    # is scaled down); translucent repeats would blend, so they stay.
+    # Draw order is kept so overlapping colors look as before.
+    m = line_width_px
+    xs = px[:, 0::2]; ys = px[:, 1::2]
+    visible = ((xs.max(axis=1) >= -m) & (xs.min(axis=1) <= vw + m) &
+               (ys.max(axis=1) >= -m) & (ys.min(axis=1) <= vh + m))
+    rows = np.concatenate([px[visible], colors[visible].astype(np.int32)], axis=1)
+    if a == 255 and len(rows):
+        _, first = np.unique(rows, axis=0, return_index=True)
+        rows = rows[np.sort(first)]
+
+    for x1, y1, x2, y2, r, g, b in rows.tolist():
+        draw.line((x1, y1, x2, y2), fill=(r, g, b, a), width=line_width_px)
     return img
 
+@lru_cache(maxsize=8192)
+def _text_bbox(font: ImageFont.ImageFont, text: str) -> Tuple[int, int, int, int]:
+    """Ink box of `text` drawn at (0, 0), memoized per (font, text)."""
+    try:
+        return tuple(int(v) for v in font.getbbox(text))
+    except Exception:
+        # Fallback if PIL variant differs
+        return 0, 0, int(font.getlength(text)), DEFAULT_FONT_SIZE_PT
+
+def _draw_marker_sprite(marker: str, size: int, color: Tuple[int,int,int,int]) -> Tuple[Image.Image, int, int]:
+    if marker == "circle":
+        r = size
+        c = r + 1
+        im = Image.new("RGBA", (2 * c + 1, 2 * c + 1), (0, 0, 0, 0))
+        d = ImageDraw.Draw(im, "RGBA")
+        d.ellipse((c - r - 1, c - r - 1, c + r + 1, c + r + 1), outline=(0, 0, 0, 230), width=2)
+        d.ellipse((c - r, c - r, c + r, c + r), fill=color, outline=(0, 0, 0, 180), width=1)
+        return im, -c, -c
+    # Down-facing triangle; the apex IS the point
+    im = Image.new("RGBA", (2 * size + 1, 2 * size + 1), (0, 0, 0, 0))
+    d = ImageDraw.Draw(im, "RGBA")
+    d.polygon([(size, 2 * size), (0, 0), (2 * size, 0)], fill=color, outline=(0, 0, 0, 200))
+    return im, -size, -2 * size
+
+def _marker_sprite(marker: str, size: int, color: Tuple[int,int,int,int]) -> Tuple[Image.Image, Image.Image, int, int]:
+    """Each distinct marker is drawn once and then stamped by coordinate."""
+    key = (marker, size, tuple(int(v) for v in color))
+    with _sprite_lock:
+        hit = _sprite_cache.get(key)
+        if hit is not None:
+            _sprite_cache.move_to_end(key)
+            return hit
+    im, ox, oy = _draw_marker_sprite(marker, size, key[2])
+    mask = im.getchannel("A")
+    im.putalpha(255)
+    sprite = (im.convert("RGBa"), mask, ox, oy)
+    with _sprite_lock:
+        _sprite_cache[key] = sprite
+        while len(_sprite_cache) > _SPRITE_CACHE_MAX:
+            _sprite_cache.popitem(last=False)
+    return sprite
+
+def _stamp(canvas: Image.Image, sprite: Tuple[Image.Image, Image.Image, int, int], px: int, py: int) -> None:
+    # Opaque ink through the sprite's alpha: on an RGBa (premultiplied)
+    # canvas this is ink*a + dst*(1-a), i.e. "over"; paste clips at the edges
+    ink, mask, ox, oy = sprite
+    canvas.paste(ink, (px + ox, py + oy), mask)
+
+class _LabelGrid:
+    """Uniform grid of placed label boxes; place() refuses boxes that overlap one."""
+    def __init__(self, cell: int):
+        self.cell = max(1, int(cell))
+        self.cells: Dict[Tuple[int, int], List[Tuple[int, int, int, int]]] = {}
+
+    def place(self, x0: int, y0: int, x1: int, y1: int) -> bool:
+        c = self.cell
+        keys = [(cx, cy) for cx in range(x0 // c, x1 // c + 1) for cy in range(y0 // c, y1 // c + 1)]
+        for k in keys:
+            for (a0, b0, a1, b1) in self.cells.get(k, ()):
+                if x0 < a1 and a0 < x1 and y0 < b1 and b0 < y1:
+                    return False
+        box = (x0, y0, x1, y1)
+        for k in keys:
+            self.cells.setdefault(k, []).append(box)
+        return True
+
 def _render_points_layer(
     ref_map_path: str,
     points: List[Dict[str, Any]],  # expects MAP-space: {xMap, yMap, z?, rgb?, label?, value?}
@@ -240,12 +625,16 @@ def _render_points_layer(
     value_palette: str = "gyr",
     padding_px: int = DEFAULT_PADDING_PX,
     flip_x: bool = DEFAULT_FLIP_X,
-    flip_y: bool = DEFAULT_FLIP_Y
+    flip_y: bool = DEFAULT_FLIP_Y,
+    cull_labels: bool = True,            # drop labels that would overlap an earlier one
+    viewport: Optional[Viewport] = None  # render only this window of the full canvas
 ) -> Image.Image:
     bounds = get_bounds(ref_map_path)
     scale, xPad, yPad = _scale_for_size(bounds, width_px, height_px, padding_px)
-    img = Image.new("RGBA", (width_px, height_px), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(img, "RGBA")
+    left, top, vw, vh = _viewport_box(width_px, height_px, viewport)
+    # Markers are stamped onto a premultiplied canvas, where a masked paste
+    # is exactly "over" compositing
+    canvas = Image.new("RGBa", (vw, vh), (0, 0, 0, 0))
     font = _get_font()
 
     # Defaults from style
@@ -275,51 +664,68 @@ def _render_points_layer(
         v = float(pt.get(value_field, 0.0))
         return color_fn(v, value_vmin, value_vmax) if color_fn else color_from_value(v, value_vmin, value_vmax, alpha=220, palette=value_palette)
 
-    def draw_arrow(px: int, py: int, size: int, fill: Tuple[int,int,int,int]) -> None:
-        # Down-facing triangle; the apex (px,py) IS the point
-        verts = [(px, py), (px - size, py - 2 * size), (px + size, py - 2 * size)]
-        draw.polygon(verts, fill=fill, outline=(0, 0, 0, 200))
+    # Pixel positions for every point at once
+    xy = np.array([(float(pt["xMap"]), float(pt["yMap"])) for pt in points], dtype=np.float64).reshape(-1, 2)
+    pxy = _to_px_array(xy, bounds, scale=scale, x_pad=xPad - left, y_pad=yPad - top, flip_x=flip_x, flip_y=flip_y)
 
-    for pt in points:
-        xm, ym = float(pt["xMap"]), float(pt["yMap"])
-        xm, ym = _apply_orientation(xm, ym, bounds, flip_x=flip_x, flip_y=flip_y)
-        px, py = _to_px(xm, ym, bounds, scale=scale, x_pad=xPad, y_pad=yPad)
-
-        c = color_for(pt)
-        lab = None
+    def label_for(pt: Dict[str, Any]) -> Optional[str]:
         if label_fn is not None:
-            lab = label_fn(pt)
-        elif label_field:
-            lab = str(pt.get(label_field, "")).strip()
-        has_label = bool(lab)
+            return label_fn(pt) or None
+        if label_field:
+            return str(pt.get(label_field, "")).strip() or None
+        return None
 
-        m = eff_marker
-        if m == "auto":
-            m = "arrow" if has_label and style in ("eq", "generic") else "circle"
-
-        if m == "circle":
-            r = int(dot_radius_px)
-            draw.ellipse((px - r - 1, py - r - 1, px + r + 1, py + r + 1),
-                         outline=(0, 0, 0, 230), width=2)
-            draw.ellipse((px - r, py - r, px + r, py + r),
-                         fill=c, outline=(0, 0, 0, 180), width=1)
-        else:
-            draw_arrow(px, py, int(arrow_size_px), c)
+    def near(x0: float, y0: float, x1: float, y1: float) -> List[Tuple[int, int, int]]:
+        # (index, px, py) of the points inside the box, in input order
+        idx = np.nonzero((pxy[:, 0] >= x0) & (pxy[:, 0] <= x1) & (pxy[:, 1] >= y0) & (pxy[:, 1] <= y1))[0]
+        return [(i, x, y) for i, (x, y) in zip(idx.tolist(), pxy[idx].tolist())]
+
+    reach = max(int(dot_radius_px) + 2, 2 * int(arrow_size_px) + 1)
+    labels: List[Tuple[int, int, str, Tuple[int,int,int,int]]] = []
 
-        if has_label:
+    if label_fn is not None or label_field:
+        # Labels sit above their point and may be wider than the canvas, so
+        # only the vertical band is pre-filtered. With culling, every label
+        # on the full canvas competes so the survivors do not depend on the
+        # viewport (adjacent tiles agree).
+        grid = _LabelGrid(LABEL_GRID_CELL_PX) if cull_labels else None
+        below = reach + 2 * int(arrow_size_px) + 2 + 2 * DEFAULT_FONT_SIZE_PT
+        if grid is not None:
+            candidates = near(-np.inf, -top - reach, np.inf, height_px - top + below)
+        else:
+            candidates = near(-np.inf, -reach, np.inf, vh + below)
+        for i, px, py in candidates:
+            lab = label_for(points[i])
+            if not lab:
+                continue
             # Center text ABOVE the arrow tip
-            try:
-                bbox = font.getbbox(lab)
-                tw = bbox[2] - bbox[0]
-                th = bbox[3] - bbox[1]
-            except Exception:
-                # Fallback if PIL variant differs
-                tw = draw.textlength(lab, font=font)
-                th = DEFAULT_FONT_SIZE_PT
-            tx = int(px - tw / 2)
-            ty = int(py - 2 * arrow_size_px - 2 - th)
+            bx0, by0, bx1, by1 = _text_bbox(font, lab)
+            tw, th = bx1 - bx0, by1 - by0
+            tx = px - (tw + 1) // 2          # floor, also left of a viewport
+            ty = py - 2 * int(arrow_size_px) - 2 - th
+            if grid is not None and not grid.place(tx, ty, tx + tw, ty + th):
+                continue
+            if tx + bx0 > vw or ty + by0 > vh or tx + bx1 < 0 or ty + by1 < 0:
+                continue
+            c = color_for(points[i])
             txt_color = (c[0], c[1], c[2], 255) if style == "eq" else (0, 0, 0, 255)
-            draw.text((tx, ty), lab, font=font, fill=txt_color)
+            labels.append((tx, ty, lab, txt_color))
+
+    # Markers: only points close enough to touch the canvas
+    for i, px, py in near(-reach, -reach, vw + reach, vh + reach):
+        pt = points[i]
+        m = eff_marker
+        if m == "auto":
+            m = "arrow" if label_for(pt) and style in ("eq", "generic") else "circle"
+        size = int(dot_radius_px) if m == "circle" else int(arrow_size_px)
+        _stamp(canvas, _marker_sprite(m, size, color_for(pt)), px, py)
+
+    img = canvas.convert("RGBA")
+    draw = ImageDraw.Draw(img, "RGBA")
+
+    # Labels go on top of every marker
+    for tx, ty, lab, txt_color in labels:
+        draw.text((tx, ty), lab, font=font, fill=txt_color)
 
     return img
 
@@ -350,26 +756,30 @@ def render_file_layers(
     padding_px: int = DEFAULT_PADDING_PX,
     flip_x: bool = DEFAULT_FLIP_X,
     flip_y: bool = DEFAULT_FLIP_Y,
-    include_empty_layers: bool = False
+    include_empty_layers: bool = False,
+    viewport: Optional[Viewport] = None
 ) -> Dict[str, Optional[Image.Image]]:
     """
     Render ONE file into TWO transparent layers:
       - "lines":  all L records
       - "points": all P records (omitting out-of-bounds if file != ref)
     Returns {"lines": PIL.Image|None, "points": PIL.Image|None}
+    With `viewport` (left, top, w, h) only that window of the
+    width_px x height_px render is produced (used for map tiles).
     """
-    parsed = parse_eq_file(file_path)
+    parsed = load_eq_file(file_path)
+    _, _, vw, vh = _viewport_box(width_px, height_px, viewport)
     out: Dict[str, Optional[Image.Image]] = {"lines": None, "points": None}
 
     # Lines layer
-    if parsed["segments"]:
+    if len(parsed["segments"]):
         out["lines"] = _render_lines_layer(
-            ref_map_path, parsed["segments"], width_px, height_px,
+            ref_map_path, parsed["segments"], parsed["segment_colors"], width_px, height_px,
             line_width_px=line_width_px, line_alpha=line_alpha,
-            padding_px=padding_px, flip_x=flip_x, flip_y=flip_y
+            padding_px=padding_px, flip_x=flip_x, flip_y=flip_y, viewport=viewport
         )
     elif include_empty_layers:
-        out["lines"] = Image.new("RGBA", (width_px, height_px), (0, 0, 0, 0))
+        out["lines"] = Image.new("RGBA", (vw, vh), (0, 0, 0, 0))
 
     # Points layer (with out-of-bounds filtering if not the ref file)
     if parsed["points"]:
@@ -403,13 +813,60 @@ def render_file_layers(
                 color_mode=color_mode, fixed_color=fixed_color,
                 value_field=value_field, value_vmin=value_vmin, value_vmax=value_vmax,
                 color_fn=lambda v, vmin, vmax: color_fn(v, vmin, vmax), value_palette=value_palette,
-                padding_px=padding_px, flip_x=flip_x, flip_y=flip_y
+                padding_px=padding_px, flip_x=flip_x, flip_y=flip_y, viewport=viewport
             )
     elif include_empty_layers:
-        out["points"] = Image.new("RGBA", (width_px, height_px), (0, 0, 0, 0))
+        out["points"] = Image.new("RGBA", (vw, vh), (0, 0, 0, 0))
 
     return out
 
+_LAYER_NAMES = ("lines", "points")
+
+def render_file_layers_png(
+    ref_map_path: str,
+    file_path: str,
+    width_px: int,
+    height_px: int,
+    **layer_kwargs
+) -> Dict[str, Optional[bytes]]:
+    """
+    render_file_layers() encoded as PNG bytes, served from the disk cache
+    when the same file/size/options were rendered before. The key covers
+    both files' (mtime, size), so editing a map file invalidates it.
+    A custom `color_fn` cannot be keyed and bypasses the cache.
+    """
+    def render() -> Dict[str, Optional[bytes]]:
+        layers = render_file_layers(ref_map_path, file_path, width_px, height_px, **layer_kwargs)
+        return {k: (image_to_png_bytes(img) if img is not None else None) for k, img in layers.items()}
+
+    if layer_kwargs.get("color_fn", color_from_value) is not color_from_value:
+        return render()
+
+    key = make_cache_key(
+        "layers", MAP_RENDER_VERSION, encoder_settings("png"),
+        ref_map_path, file_stamp(ref_map_path),
+        file_path, file_stamp(file_path),
+        width_px, height_px,
+        sorted(layer_kwargs.items()),
+    )
+    cached: Dict[str, Optional[bytes]] = {}
+    for name in _LAYER_NAMES:
+        data = _layer_cache.get(f"{key}-{name}.png")
+        if data is None:
+            break
+        # Zero-length file records "no layer"
+        cached[name] = data or None
+    else:
+        return cached
+
+    out = render()
+    for name in _LAYER_NAMES:
+        _layer_cache.put(f"{key}-{name}.png", out.get(name) or b"")
+    return out
+
+def get_layer_cache_stats() -> Dict[str, Any]:
+    return {"geometry": GEOMETRY_STORE.stats(), "pngCache": _layer_cache.stats()}
+
 def render_files_to_layers(
     ref_map_path: str,
     file_paths: List[str],
@@ -451,7 +908,8 @@ def render_spawn_points_overlay(
     label_field: str = "label",
     padding_px: int = DEFAULT_PADDING_PX,
     flip_x: bool = DEFAULT_FLIP_X,
-    flip_y: bool = DEFAULT_FLIP_Y
+    flip_y: bool = DEFAULT_FLIP_Y,
+    viewport: Optional[Viewport] = None
 ) -> Image.Image:
     # Adapt to MAP-space and render with style="spawn" (circles only)
     mapped: List[Dict[str, Any]] = []
@@ -480,5 +938,118 @@ def render_spawn_points_overlay(
         color_mode="value", fixed_color=(30, 144, 255, 220),
         value_field="value", value_vmin=value_vmin, value_vmax=value_vmax,
         color_fn=lambda v, vmin, vmax: color_from_value(v, vmin, vmax, alpha=220, palette=value_palette),
+        padding_px=padding_px, flip_x=flip_x, flip_y=flip_y, viewport=viewport
+    )
+
+# -------------------- Spawn heatmap (binned density → blurred RGBA) --------------------
+
+HEATMAP_GRID_CELLS = 256            # grid cells along the longer side of the full canvas
+HEATMAP_BLUR_CELLS = 3              # box blur radius in cells (three passes ≈ Gaussian)
+HEATMAP_ALPHA_MAX = 200
+
+# (position 0..1, RGB) stops; "gyr" matches color_from_value()
+HEATMAP_PALETTES: Dict[str, List[Tuple[float, Tuple[int, int, int]]]] = {
+    "heat": [(0.0, (40, 60, 255)), (0.35, (0, 200, 220)), (0.6, (80, 220, 60)), (0.8, (250, 220, 0)), (1.0, (230, 30, 20))],
+    "gyr": [(0.0, (0, 180, 0)), (0.5, (230, 200, 0)), (1.0, (230, 40, 30))],
+}
+
+@lru_cache(maxsize=16)
+def _heatmap_lut(palette: str, alpha_max: int) -> np.ndarray:
+    """(256, 4) uint8 RGBA lookup: colour along the palette, alpha rising with density."""
+    stops = HEATMAP_PALETTES.get(palette) or HEATMAP_PALETTES["heat"]
+    t = np.linspace(0.0, 1.0, 256)
+    pos = [p for p, _ in stops]
+    lut = np.empty((256, 4), dtype=np.uint8)
+    for ch in range(3):
+        lut[:, ch] = np.rint(np.interp(t, pos, [c[ch] for _, c in stops]))
+    # sqrt keeps sparse areas visible next to a hot spot
+    lut[:, 3] = np.rint(alpha_max * np.sqrt(t))
+    lut[0, 3] = 0
+    return lut
+
+def _box_blur(grid: np.ndarray, radius: int, passes: int = 3) -> np.ndarray:
+    """Separable box blur via cumulative sums; edges are zero-padded."""
+    if radius <= 0:
+        return grid
+    k = 2 * radius + 1
+    out = grid.astype(np.float64)
+    for _ in range(passes):
+        for axis in (0, 1):
+            pad = [(0, 0), (0, 0)]
+            pad[axis] = (radius + 1, radius)
+            c = np.cumsum(np.pad(out, pad), axis=axis)
+            hi = np.take(c, np.arange(k, c.shape[axis]), axis=axis)
+            lo = np.take(c, np.arange(0, c.shape[axis] - k), axis=axis)
+            out = (hi - lo) / k
+    return out
+
+def spawn_density_grid(
+    ref_map_path: str,
+    xy_map: np.ndarray,                # (N, 2) MAP-space x, y
+    weights: np.ndarray,               # (N,) per-point weight
+    width_px: int, height_px: int,
+    *,
+    grid_cells: int = HEATMAP_GRID_CELLS,
+    blur_cells: int = HEATMAP_BLUR_CELLS,
+    padding_px: int = DEFAULT_PADDING_PX,
+    flip_x: bool = DEFAULT_FLIP_X,
+    flip_y: bool = DEFAULT_FLIP_Y
+) -> Tuple[np.ndarray, float]:
+    """
+    Bin weighted points into a grid over the full width_px x height_px
+    canvas, blur it and scale to 0..1. Returns (grid (rows, cols) float32,
+    cell size in px). All points are binned in one bincount.
+    """
+    bounds = get_bounds(ref_map_path)
+    scale, xPad, yPad = _scale_for_size(bounds, width_px, height_px, padding_px)
+    cell = max(width_px, height_px) / float(max(1, grid_cells))
+    cols = max(1, int(np.ceil(width_px / cell)))
+    rows = max(1, int(np.ceil(height_px / cell)))
+    grid = np.zeros(rows * cols, dtype=np.float64)
+    if len(xy_map):
+        px = _to_px_array(np.asarray(xy_map, dtype=np.float64).reshape(-1, 2), bounds,
+                          scale=scale, x_pad=xPad, y_pad=yPad, flip_x=flip_x, flip_y=flip_y)
+        gx = np.floor(px[:, 0] / cell).astype(np.int64)
+        gy = np.floor(px[:, 1] / cell).astype(np.int64)
+        inside = (gx >= 0) & (gx < cols) & (gy >= 0) & (gy < rows)
+        grid = np.bincount(gy[inside] * cols + gx[inside],
+                           weights=np.asarray(weights, dtype=np.float64)[inside], minlength=rows * cols)
+    grid = _box_blur(grid.reshape(rows, cols), int(blur_cells))
+    peak = float(grid.max()) if grid.size else 0.0
+    if peak > 0:
+        grid = grid / peak
+    return grid.astype(np.float32), cell
+
+def render_spawn_heatmap(
+    ref_map_path: str,
+    xy_map: np.ndarray,                # (N, 2) MAP-space x, y (see game_to_map_xy)
+    weights: np.ndarray,               # (N,) e.g. 1 per spawn or expected spawns/hour
+    width_px: int, height_px: int,
+    *,
+    palette: str = "heat",
+    alpha_max: int = HEATMAP_ALPHA_MAX,
+    grid_cells: int = HEATMAP_GRID_CELLS,
+    blur_cells: int = HEATMAP_BLUR_CELLS,
+    padding_px: int = DEFAULT_PADDING_PX,
+    flip_x: bool = DEFAULT_FLIP_X,
+    flip_y: bool = DEFAULT_FLIP_Y,
+    viewport: Optional[Viewport] = None
+) -> Image.Image:
+    """
+    Transparent RGBA heat layer for the whole zone in one pass: weighted
+    density grid → bilinear upscale (only the viewport's window) → palette
+    lookup. Scaling is against the full canvas, so tiles of one zoom agree.
+    """
+    left, top, vw, vh = _viewport_box(width_px, height_px, viewport)
+    grid, cell = spawn_density_grid(
+        ref_map_path, xy_map, weights, width_px, height_px,
+        grid_cells=grid_cells, blur_cells=blur_cells,
         padding_px=padding_px, flip_x=flip_x, flip_y=flip_y
     )
+    # Grid values sit at cell centres; the box picks the viewport out of the grid
+    field = Image.fromarray(grid, mode="F").resize(
+        (vw, vh), Image.BILINEAR,
+        box=(left / cell, top / cell, (left + vw) / cell, (top + vh) / cell)
+    )
+    idx = np.clip(np.rint(np.asarray(field) * 255.0), 0, 255).astype(np.uint8)
+    return Image.fromarray(_heatmap_lut(palette, int(alpha_max))[idx], mode="RGBA")
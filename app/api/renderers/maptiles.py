@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import os
+import re
+import glob
+import tempfile
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from PIL import Image
+import numpy as np
+from api.renderers.map import (
+  MAP_DIR, MAP_RENDER_VERSION, DEFAULT_PADDING_PX, DiskLRUCache, Viewport,
+  file_stamp, make_cache_key, encode_image, encoder_settings,
+  render_file_layers, render_spawn_points_overlay, render_spawn_heatmap,
+)
+from api.renderers.renderpool import RENDER_POOL
+from applogging import get_logger
+logger = get_logger(__name__)
+
+# Slippy-map style pyramid: zoom z covers the zone with a square of
+# (TILE_SIZE_PX * 2**z) px, cut into 2**z x 2**z tiles addressed (z, x, y)
+TILE_SIZE_PX = 256
+TILE_MAX_ZOOM = int(os.environ.get("POK_MAP_TILE_MAX_ZOOM", "5"))
+
+# Rendered tiles live next to (not inside) the layer cache, with their own budget
+TILE_CACHE_DIR = os.environ.get("POK_MAP_TILE_DIR", os.path.join(tempfile.gettempdir(), "pok-map-tiles"))
+TILE_CACHE_MAX_BYTES = int(os.environ.get("POK_MAP_TILE_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+TILE_FORMATS = {"png": "image/png", "webp": "image/webp"}
+TILE_LAYERS = ("base", "spawns", "heat")
+
+# Full-zone heatmap images (not tiled): allowed edge lengths in px
+HEATMAP_MIN_PX = 256
+HEATMAP_MAX_PX = 4096
+HEAT_FILTERS = ("npc_id", "min_level", "max_level", "rare", "raid")
+
+# brewall map files: <zone>.txt plus optional <zone>_1.txt .. <zone>_3.txt layers
+MAP_FILE_SUFFIXES = ("", "_1", "_2", "_3")
+ZONE_RE = re.compile(r"^[a-z0-9_]{1,64}$")
+_LAYER_SUFFIX_RE = re.compile(r"_[1-3]$")
+
+_tile_cache = DiskLRUCache(TILE_CACHE_DIR, TILE_CACHE_MAX_BYTES)
+
+class MapNotFoundError(Exception):
+  pass
+
+class TileRequestError(Exception):
+  """Bad tile/heatmap arguments (layer, format, address, size, heat options)."""
+  pass
+
+def zone_map_files(zone: str) -> List[str]:
+  """Existing map files for `zone`, base file first; MapNotFoundError if there are none."""
+  if not ZONE_RE.match(zone or ""):
+    raise MapNotFoundError(f"Invalid zone name: {zone!r}")
+  files = [os.path.join(MAP_DIR, f"{zone}{suffix}.txt") for suffix in MAP_FILE_SUFFIXES]
+  files = [f for f in files if os.path.isfile(f)]
+  if not files:
+    raise MapNotFoundError(f"No map files for zone `{zone}`")
+  return files
+
+def list_zones(directory: str = MAP_DIR) -> List[str]:
+  zones = set()
+  for path in glob.glob(os.path.join(directory, "*.txt")):
+    name = _LAYER_SUFFIX_RE.sub("", os.path.basename(path)[:-4].lower())
+    if ZONE_RE.match(name):
+      zones.add(name)
+  return sorted(zones)
+
+def tile_viewport(z: int, x: int, y: int) -> Tuple[int, Viewport]:
+  """(world size px, viewport) of tile (z, x, y); TileRequestError when out of range."""
+  if not (0 <= z <= TILE_MAX_ZOOM):
+    raise TileRequestError(f"Zoom must be 0..{TILE_MAX_ZOOM}")
+  n = 1 << z
+  if not (0 <= x < n and 0 <= y < n):
+    raise TileRequestError(f"Tile {x},{y} is outside zoom {z}")
+  return TILE_SIZE_PX * n, (x * TILE_SIZE_PX, y * TILE_SIZE_PX, TILE_SIZE_PX, TILE_SIZE_PX)
+
+def _padding(world_px: int) -> int:
+  # Scales with the zoom so every level frames the zone identically
+  return world_px * DEFAULT_PADDING_PX // 1024
+
+def _render_base(files: List[str], world_px: int, viewport: Viewport) -> Image.Image:
+  ref = files[0]
+  tile = Image.new("RGBA", (viewport[2], viewport[3]), (0, 0, 0, 0))
+  layers = [
+    render_file_layers(ref, f, world_px, world_px, padding_px=_padding(world_px), viewport=viewport)
+    for f in files
+  ]
+  # All lines first, then every file's labels on top
+  for name in ("lines", "points"):
+    for rendered in layers:
+      if rendered.get(name) is not None:
+        tile.alpha_composite(rendered[name])
+  return tile
+
+def _render_spawns(files: List[str], spawns: List[Dict[str, Any]], world_px: int, viewport: Viewport) -> Image.Image:
+  return render_spawn_points_overlay(
+    files[0], spawns, world_px, world_px,
+    label_mode="none", padding_px=_padding(world_px), viewport=viewport,
+  )
+
+def _render_heat(files: List[str], heat: Tuple[np.ndarray, np.ndarray], world_px: int, viewport: Optional[Viewport]) -> Image.Image:
+  xy, weights = heat
+  # Game (x, y) -> map (-y, -x), as game_to_map_xy()
+  xy_map = np.column_stack([-xy[:, 1], -xy[:, 0]]) if len(xy) else xy
+  return render_spawn_heatmap(files[0], xy_map, weights, world_px, world_px, padding_px=_padding(world_px), viewport=viewport)
+
+def _render_tile_job(layer: str, files: List[str], data: Any, world_px: int, viewport: Viewport, fmt: str) -> bytes:
+  """
+  Runs in a render pool process: draw + encode one tile; b"" when it is
+  empty. `data` is the spawn point list ("spawns") or heat input ("heat").
+  """
+  if layer == "base":
+    img = _render_base(files, world_px, viewport)
+  elif layer == "heat":
+    img = _render_heat(files, data, world_px, viewport)
+  else:
+    img = _render_spawns(files, data or [], world_px, viewport)
+  return encode_image(img, fmt) if img.getbbox() is not None else b""
+
+def _render_heatmap_job(files: List[str], heat: Tuple[np.ndarray, np.ndarray], size_px: int, fmt: str, with_base: bool) -> bytes:
+  """Runs in a render pool process: one full-zone heatmap, optionally over the map."""
+  layer = _render_heat(files, heat, size_px, None)
+  if not with_base:
+    return encode_image(layer, fmt)
+  img = _render_base(files, size_px, (0, 0, size_px, size_px))
+  img.alpha_composite(layer)
+  return encode_image(img, fmt)
+
+def heat_options(mode: str = "density", **filters) -> Tuple[Tuple[str, Any], ...]:
+  """
+  Normalized heatmap (mode, filters) for cache keys and get_zone_spawn_heat();
+  filters left as None are dropped. TileRequestError for an unknown
+  mode/filter.
+  """
+  from api.models.spawns import HEAT_MODES
+  if mode not in HEAT_MODES:
+    raise TileRequestError(f"Unknown heatmap mode `{mode}`")
+  unknown = set(filters) - set(HEAT_FILTERS)
+  if unknown:
+    raise TileRequestError(f"Unknown heatmap filter(s): {', '.join(sorted(unknown))}")
+  return (("mode", mode),) + tuple(sorted((k, v) for k, v in filters.items() if v is not None))
+
+def _heat_input(zone: str, heat: Tuple[Tuple[str, Any], ...]) -> Tuple[np.ndarray, np.ndarray]:
+  # Loaded in the request process (pooled DB connection, per-process cache)
+  from api.models.spawns import get_zone_spawn_heat
+  options = dict(heat or heat_options())
+  return get_zone_spawn_heat(zone, options.pop("mode"), **options)
+
+@lru_cache(maxsize=None)
+def blank_tile(fmt: str) -> bytes:
+  return encode_image(Image.new("RGBA", (TILE_SIZE_PX, TILE_SIZE_PX), (0, 0, 0, 0)), fmt)
+
+def _tile_key(zone: str, layer: str, files: List[str], fmt: str, *parts: Any) -> str:
+  key: List[Any] = [
+    "tile", MAP_RENDER_VERSION, zone, layer, [(f, file_stamp(f)) for f in files], encoder_settings(fmt), *parts,
+  ]
+  if layer != "base":
+    from db import getDataVersion
+    key.append(getDataVersion())
+  return make_cache_key(*key)
+
+def get_tile(zone: str, layer: str, z: int, x: int, y: int, fmt: str = "png", heat: Tuple = ()) -> bytes:
+  """
+  Encoded tile, rendered on first request and served from the disk cache
+  afterwards. The key covers the map files' (mtime, size) and, for the
+  spawn and heat layers, the data version (and `heat`, the
+  heat_options() of a "heat" tile). Misses are drawn in the render pool;
+  identical concurrent misses share one job. Raises MapNotFoundError for
+  an unknown zone, TileRequestError for a bad layer/format/address and
+  RenderBusyError when the pool is saturated; render errors propagate.
+  """
+  if layer not in TILE_LAYERS:
+    raise TileRequestError(f"Unknown tile layer `{layer}`")
+  if fmt not in TILE_FORMATS:
+    raise TileRequestError(f"Unknown tile format `{fmt}`")
+  world_px, viewport = tile_viewport(z, x, y)
+  files = zone_map_files(zone)
+
+  heat = (heat or heat_options()) if layer == "heat" else ()
+  name = f"{_tile_key(zone, layer, files, fmt, z, x, y, heat)}.{fmt}"
+  data = _tile_cache.get(name)
+  if data is None:
+    payload = None
+    if layer == "spawns":
+      # Loaded here (pooled DB connection, per-process cache), not in the job
+      from api.models.spawns import get_zone_spawn_points
+      payload = get_zone_spawn_points(zone)
+    elif layer == "heat":
+      payload = _heat_input(zone, heat)
+    data = RENDER_POOL.run(name, _render_tile_job, layer, files, payload, world_px, viewport, fmt)
+    # Zero-length file records "nothing here"
+    _tile_cache.put(name, data)
+  return data or blank_tile(fmt)
+
+def get_heatmap(zone: str, size_px: int = 1024, fmt: str = "png", heat: Tuple = (), with_base: bool = True) -> bytes:
+  """
+  The whole zone's spawn heatmap as one image (size_px square), composited
+  over the zone map unless with_base=False. Cached on disk per
+  (zone, size, heat options, data version) like tiles. Errors as get_tile().
+  """
+  if fmt not in TILE_FORMATS:
+    raise TileRequestError(f"Unknown image format `{fmt}`")
+  if not (HEATMAP_MIN_PX <= size_px <= HEATMAP_MAX_PX):
+    raise TileRequestError(f"Heatmap size must be {HEATMAP_MIN_PX}..{HEATMAP_MAX_PX}")
+  files = zone_map_files(zone)
+  heat = heat or heat_options()
+  name = f"{_tile_key(zone, 'heatmap', files, fmt, size_px, heat, with_base)}.{fmt}"
+  data = _tile_cache.get(name)
+  if data is None:
+    data = RENDER_POOL.run(name, _render_heatmap_job, files, _heat_input(zone, heat), size_px, fmt, with_base)
+    _tile_cache.put(name, data)
+  return data
+
+def get_tile_cache_stats() -> Dict[str, Any]:
+  return {"tiles": _tile_cache.stats(), "renderPool": RENDER_POOL.stats()}
+
+def seed_zone(zone: str, *, max_zoom: int = TILE_MAX_ZOOM, layers=("base",), formats=("png",)) -> int:
+  """
+  Render every tile of `zone` up to `max_zoom` into the cache, keeping
+  each render pool process busy; returns the tile count.
+  """
+  from concurrent.futures import ThreadPoolExecutor
+  tiles = [
+    (layer, z, x, y, fmt)
+    for z in range(min(max_zoom, TILE_MAX_ZOOM) + 1)
+    for layer in layers
+    for fmt in formats
+    for y in range(1 << z)
+    for x in range(1 << z)
+  ]
+  with ThreadPoolExecutor(max_workers=max(1, RENDER_POOL.workers)) as pool:
+    for _ in pool.map(lambda t: get_tile(zone, t[0], t[1], t[2], t[3], t[4]), tiles):
+      pass
+  return len(tiles)
+
+def main(argv: Optional[List[str]] = None) -> int:
+  """
+  Pre-seed the tile cache, e.g. from the app directory:
+    python -m api.renderers.maptiles --max-zoom 3 --layer base --layer spawns [zone ...]
+  """
+  import argparse
+  import time
+  parser = argparse.ArgumentParser(description="Pre-render map tiles into the tile cache")
+  parser.add_argument("zones", nargs="*", help="zone short names (default: every zone in POK_MAP_DIR)")
+  parser.add_argument("--max-zoom", type=int, default=TILE_MAX_ZOOM)
+  parser.add_argument("--layer", action="append", choices=TILE_LAYERS, dest="layers")
+  parser.add_argument("--format", action="append", choices=sorted(TILE_FORMATS), dest="formats")
+  args = parser.parse_args(argv)
+
+  zones = args.zones or list_zones()
+  layers = tuple(args.layers or ("base",))
+  formats = tuple(args.formats or ("png",))
+  failed = 0
+  for zone in zones:
+    started = time.monotonic()
+    try:
+      count = seed_zone(zone, max_zoom=args.max_zoom, layers=layers, formats=formats)
+    except Exception:
+      logger.exception("Seeding tiles failed for zone `%s`", zone)
+      failed += 1
+      continue
+    logger.info("Seeded %d tiles for `%s` in %.1fs", count, zone, time.monotonic() - started)
+  # Background eviction dies with this process; enforce the budget before exiting
+  _tile_cache.evict()
+  return 1 if failed else 0
+
+if __name__ == "__main__":
+  raise SystemExit(main())
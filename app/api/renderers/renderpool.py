@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import os
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable
+from applogging import get_logger
+logger = get_logger(__name__)
+
+# CPU-bound map work (drawing + encoding) runs in worker processes so it
+# never holds the GIL in a gunicorn request thread. 0 renders inline.
+# Workers use the "spawn" start method and so re-import the parent's
+# __main__: fine under gunicorn, but a script entry point must keep its
+# setup under `if __name__ == "__main__"` or run with 0 (`python app.py`
+# defaults to 0 for this reason).
+MAP_RENDER_WORKERS = int(os.environ.get("POK_MAP_RENDER_WORKERS", "2"))
+# Distinct jobs queued or running per gunicorn worker before new ones are refused
+MAP_RENDER_QUEUE_MAX = int(os.environ.get("POK_MAP_RENDER_QUEUE_MAX", "16"))
+# How long a request waits for its render, and the Retry-After sent when refused
+MAP_RENDER_TIMEOUT_SECS = float(os.environ.get("POK_MAP_RENDER_TIMEOUT", "60"))
+MAP_RENDER_RETRY_AFTER_SECS = int(os.environ.get("POK_MAP_RENDER_RETRY_AFTER", "2"))
+
+def _init_worker():
+  # Render processes hold their own geometry store; warm it like gunicorn
+  # workers do (POK_MAP_WARMUP=1) so first renders skip file parsing
+  if os.environ.get("POK_MAP_WARMUP", "").lower() in ("1", "true", "yes"):
+    from api.renderers.map import GEOMETRY_STORE
+    GEOMETRY_STORE.warm()
+
+class RenderBusyError(Exception):
+  """The render queue is full (or the job timed out); retry after `retry_after` seconds."""
+  def __init__(self, message: str, retry_after: int = MAP_RENDER_RETRY_AFTER_SECS):
+    super().__init__(message)
+    self.retry_after = retry_after
+
+class RenderPool:
+  """
+  Bounded ProcessPoolExecutor (spawn context, created lazily per process)
+  with request coalescing: concurrent run() calls with the same key share
+  one job and its result.
+  """
+  def __init__(self, *, workers: int, max_queue: int, timeout: float):
+    self.workers = max(0, int(workers))
+    self.max_queue = max(1, int(max_queue))
+    self.timeout = float(timeout)
+    self._lock = Lock()
+    self._pool = None
+    self._pid = None
+    self._inflight: Dict[Hashable, Future] = {}
+
+    # counters
+    self._jobs = 0
+    self._coalesced = 0
+    self._rejected = 0
+    self._timeouts = 0
+    self._errors = 0
+
+  def _executor_locked(self) -> ProcessPoolExecutor:
+    # Never reuse a pool inherited across fork: its manager thread is gone
+    if self._pool is None or self._pid != os.getpid():
+      self._pool = ProcessPoolExecutor(
+        max_workers=self.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+      )
+      self._pid = os.getpid()
+      self._inflight.clear()
+      logger.info("Started map render pool (pid=%d, workers=%d)", self._pid, self.workers)
+    return self._pool
+
+  def _forget(self, key: Hashable, future: Future):
+    with self._lock:
+      if self._inflight.get(key) is future:
+        del self._inflight[key]
+
+  def _submit(self, key: Hashable, fn: Callable, args: tuple) -> Future:
+    with self._lock:
+      future = self._inflight.get(key)
+      if future is not None:
+        self._coalesced += 1
+        return future
+      if len(self._inflight) >= self.max_queue:
+        self._rejected += 1
+        raise RenderBusyError(f"Map render queue is full ({len(self._inflight)} jobs)")
+      try:
+        future = self._executor_locked().submit(fn, *args)
+      except BrokenProcessPool:
+        logger.warning("Map render pool broke; restarting it")
+        self._pool = None
+        future = self._executor_locked().submit(fn, *args)
+      self._inflight[key] = future
+      self._jobs += 1
+    future.add_done_callback(lambda f: self._forget(key, f))
+    return future
+
+  def run(self, key: Hashable, fn: Callable, *args: Any) -> Any:
+    """
+    fn(*args) in a worker process (inline when workers=0). `fn` and the
+    arguments must be picklable. Raises RenderBusyError when the queue is
+    full or the job outlasts the timeout; job exceptions propagate.
+    """
+    if self.workers == 0:
+      return fn(*args)
+    future = self._submit(key, fn, args)
+    try:
+      return future.result(timeout=self.timeout)
+    except FuturesTimeoutError:
+      with self._lock:
+        self._timeouts += 1
+      raise RenderBusyError(f"Map render did not finish within {self.timeout:.0f}s")
+    except BrokenProcessPool:
+      with self._lock:
+        self._errors += 1
+        self._pool = None
+      raise
+    except Exception:
+      with self._lock:
+        self._errors += 1
+      raise
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        "workers": self.workers,
+        "maxQueue": self.max_queue,
+        "inflight": len(self._inflight),
+        "jobs": self._jobs,
+        "coalesced": self._coalesced,
+        "rejected": self._rejected,
+        "timeouts": self._timeouts,
+        "errors": self._errors,
+      }
+
+RENDER_POOL = RenderPool(workers=MAP_RENDER_WORKERS, max_queue=MAP_RENDER_QUEUE_MAX, timeout=MAP_RENDER_TIMEOUT_SECS)
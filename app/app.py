@@ -2,16 +2,19 @@ APP_VERSION = "0.6.4239"
 
 import html
 import json
+import os
 from flask import Flask, request
 from web.utils import PoKJSONEncoder, renderPage
 from web.loaders import loadBlueprints, loadModels
 from applogging import get_logger
+from db import getPoolStats
 from werkzeug.exceptions import HTTPException
 from flask import request
 
 logger = get_logger(__name__)
 app = Flask(__name__, static_folder='static', template_folder='templates')
 app.json_encoder = PoKJSONEncoder
+app.config['APP_VERSION'] = APP_VERSION
 
 logger.info('Loading models...')
 loadModels()
@@ -40,6 +43,14 @@ def version():
 
 @app.route('/health')
 def health():
-    return app.response_class(response=json.dumps({'status': 'ok'}), mimetype='application/json')
+    # Public: status and pool counters only; cache stats (backend paths,
+    # servers) are served by the token-protected /api/admin/stats
+    return app.response_class(response=json.dumps({'status': 'ok', 'dbPool': getPoolStats()}), mimetype='application/json')
 if __name__ == '__main__':
+    # Render pool processes are spawned, and spawned children re-import
+    # __main__ (this file, with all of the setup above). Under the dev
+    # server render inline unless a pool size is set explicitly.
+    if 'POK_MAP_RENDER_WORKERS' not in os.environ:
+        from api.renderers.renderpool import RENDER_POOL
+        RENDER_POOL.workers = 0
     app.run(host='0.0.0.0', port=8202)
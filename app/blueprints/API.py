@@ -1,52 +1,333 @@
 NAME = "API"
 
-from flask import json, Response
+import hmac
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from threading import BoundedSemaphore, Lock
+from flask import json, Response, request, abort, stream_with_context
 from applogging import get_logger
+from web.utils import httpCached, HTTP_CACHE_MAX_AGE
+from db import getPoolStats, POOL_MAX_SIZE
+from web.cache import cachedJSON, cachedJSONMany, bumpGeneration, invalidateEntity, getCacheStats
 logger = get_logger(__name__)
 
 # --- Models (data) ---
-from api.models.items import get_item
-from api.models.npcs import get_npc, get_item_drops, get_item_merchants
-from api.models.spells import get_spell
+from api.models.items import get_item, get_items, ITEM_BATCH_MAX
+from api.models.npcs import get_npc, get_npcs, get_item_drops, get_item_merchants, NPC_BATCH_MAX
+from api.models.spells import get_spell, get_spells, SPELL_BATCH_MAX
 from api.models.tradeskill import get_item_recipes
+from api.models.eqemu import get_server_rules, invalidate_server_rules
 
 # --- Renderers (HTML) ---
 from api.renderers.items import render_item_header
 from api.renderers.npcs import render_item_drops, render_item_merchants
 from api.renderers.tradeskill import render_recipe_list
 
+# --- Renderers (images) ---
+from api.renderers.map import get_layer_cache_stats
+from api.renderers.maptiles import get_tile, get_heatmap, heat_options, get_tile_cache_stats, MapNotFoundError, TileRequestError, TILE_FORMATS
+from api.renderers.renderpool import RenderBusyError
+
 URL_PREFIX = "/api"
 
+# Item details panel: sections are fetched concurrently, each on its own
+# pooled connection; a section not ready by the deadline is left for the
+# client to load from its own endpoint.
+DETAILS_SECTION_TIMEOUT_SECS = float(os.environ.get("POK_DETAILS_SECTION_TIMEOUT", "5"))
+# Timed-out sections keep running (and holding their connection), so the
+# details threads are capped at half the DB pool; the rest stays free for
+# search, tooltips and the section endpoints themselves.
+DETAILS_WORKERS = max(1, min(int(os.environ.get("POK_DETAILS_WORKERS", "8")), POOL_MAX_SIZE // 2))
+
+# Shared secret for /api/admin/* (sent as X-PoK-Admin-Token); admin routes are disabled when unset
+ADMIN_TOKEN = os.environ.get("POK_ADMIN_TOKEN", "")
+
 def _html(s: str) -> Response:
   return Response(s or "", mimetype="text/html; charset=utf-8")
 
+def _html_error(s: str) -> Response:
+  # Never let a failed render be cached as if it were the real fragment
+  resp = _html(s)
+  resp.headers["Cache-Control"] = "no-store"
+  return resp
+
+def _json(obj) -> Response:
+  return Response(json.dumps(obj), mimetype="application/json")
+
+def _json_cached(key, producer) -> Response:
+  return Response(cachedJSON(key, producer), mimetype="application/json")
+
+def _batch_ids(limit: int):
+  """Ids from ?ids=1,2,3 (or repeated ?ids=), de-duplicated in order; None if malformed or over `limit`."""
+  ids = []
+  for raw in request.args.getlist("ids"):
+    for part in raw.split(","):
+      part = part.strip()
+      if not part:
+        continue
+      if not part.isdigit():
+        return None
+      ids.append(int(part))
+  ids = list(dict.fromkeys(ids))
+  return ids if len(ids) <= limit else None
+
+def _json_batch(namespace: str, limit: int, loader) -> Response:
+  """{"<id>": object-or-null, ...}, assembled from the per-id cached payloads."""
+  ids = _batch_ids(limit)
+  if ids is None:
+    resp = _json({"error": f"ids must be a comma-separated list of at most {limit} integers"})
+    resp.status_code = 400
+    return resp
+  payloads = cachedJSONMany(namespace, ids, loader)
+  body = b",".join(b'"%d":%s' % (i, payloads.get(i, b"null")) for i in ids)
+  return Response(b"{" + body + b"}", mimetype="application/json")
+
+def _flag_arg(name: str):
+  value = request.args.get(name)
+  return None if value is None else value.lower() in ("1", "true", "yes")
+
+def _heat_args():
+  """Heatmap mode + filters from ?mode=density|rate&npc=&minLevel=&maxLevel=&rare=&raid="""
+  return heat_options(
+    request.args.get("mode", "density"),
+    npc_id=request.args.get("npc", type=int),
+    min_level=request.args.get("minLevel", type=int),
+    max_level=request.args.get("maxLevel", type=int),
+    rare=_flag_arg("rare"),
+    raid=_flag_arg("raid"),
+  )
+
+def _map_image(fmt: str, produce) -> Response:
+  try:
+    data = produce()
+  except MapNotFoundError as e:
+    abort(404, description=str(e))
+  except TileRequestError as e:
+    abort(400, description=str(e))
+  except RenderBusyError as e:
+    # Backpressure: map renders must not pile up behind the API's threads
+    resp = Response(str(e), status=503, mimetype="text/plain")
+    resp.headers["Retry-After"] = str(e.retry_after)
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+  resp = Response(data, mimetype=TILE_FORMATS[fmt])
+  resp.headers["Cache-Control"] = f"public, max-age={HTTP_CACHE_MAX_AGE}"
+  resp.add_etag()
+  return resp.make_conditional(request)
+
+_details_pool = None
+_details_pool_lock = Lock()
+_details_slots = None
+
+def _detailsPool() -> ThreadPoolExecutor:
+  global _details_pool, _details_slots
+  # Per process: threads do not survive gunicorn's fork
+  with _details_pool_lock:
+    if _details_pool is None or _details_pool[0] != os.getpid():
+      _details_pool = (os.getpid(), ThreadPoolExecutor(max_workers=DETAILS_WORKERS, thread_name_prefix="pok-details"))
+      _details_slots = BoundedSemaphore(DETAILS_PANEL_SLOTS) if DETAILS_PANEL_SLOTS else None
+    return _details_pool[1]
+
+# (key, title, loader, renderer, empty message) in display order
+_DETAIL_SECTIONS = (
+  ("drops", "Drops", get_item_drops, render_item_drops, "No known drops."),
+  ("merchants", "Merchants", get_item_merchants, render_item_merchants, "No merchants found."),
+  ("recipes", "Recipes", get_item_recipes, render_recipe_list, "No recipes found."),
+)
+
+# One panel = header + sections. A panel is admitted to the executor only
+# when a whole panel's worth of threads is free (a slot is held until all
+# of its tasks finish, overrunning ones included), so its tasks start at
+# once and the deadline measures the queries, never time spent queued.
+DETAILS_PANEL_TASKS = 1 + len(_DETAIL_SECTIONS)
+DETAILS_PANEL_SLOTS = DETAILS_WORKERS // DETAILS_PANEL_TASKS
+
+def _done_future(fn, *args) -> Future:
+  future = Future()
+  try:
+    future.set_result(fn(*args))
+  except Exception as e:
+    future.set_exception(e)
+  return future
+
+def _submit_details(itemId: int):
+  """
+  ({key: future}, deadline). Without a free panel slot the sections run
+  inline, one after another on the request thread, and are all complete
+  on return.
+  """
+  loaders = [("header", get_item)] + [(key, loader) for key, _, loader, _, _ in _DETAIL_SECTIONS]
+  pool = _detailsPool()
+  slots = _details_slots
+  if slots is None or not slots.acquire(blocking=False):
+    return {key: _done_future(loader, itemId) for key, loader in loaders}, time.monotonic()
+
+  futures = {}
+  remaining = [len(loaders)]
+  remainingLock = Lock()
+  def release(_):
+    with remainingLock:
+      remaining[0] -= 1
+      last = remaining[0] == 0
+    if last:
+      slots.release()
+  try:
+    for key, loader in loaders:
+      futures[key] = pool.submit(loader, itemId)
+  except BaseException:
+    for future in futures.values():
+      future.cancel()
+    slots.release()
+    raise
+  for future in futures.values():
+    future.add_done_callback(release)
+  return futures, time.monotonic() + DETAILS_SECTION_TIMEOUT_SECS
+
+def _section_result(itemId: int, key: str, future, deadline: float):
+  """("ok", value) | ("timeout", None) | ("error", None)"""
+  try:
+    return "ok", future.result(timeout=max(0.0, deadline - time.monotonic()))
+  except FuturesTimeoutError:
+    logger.warning("Item %d details: `%s` not ready after %.1fs", itemId, key, DETAILS_SECTION_TIMEOUT_SECS)
+    return "timeout", None
+  except Exception:
+    logger.exception("Exception in API render(item/details) section `%s`", key)
+    return "error", None
+
+def _pending_html(itemId: int, key: str, label: str) -> str:
+  src = f"{URL_PREFIX}/render/item/{int(itemId)}/{key}"
+  return f"<div class='gs-section-pending' data-section-src='{src}'><p class=\"muted\">Still loading {label}…</p></div>"
+
+def _render_details_header(itemId: int, state: str, item) -> str:
+  if state == "ok":
+    return render_item_header(item or {})
+  if state == "timeout":
+    return _pending_html(itemId, "header", "item")
+  return "<div class='error'>Failed to render item header.</div>"
+
+def _render_details_section(itemId: int, section, state: str, value) -> str:
+  key, title, _, render, empty = section
+  if state == "ok":
+    body = render(value or []) or f"<p class=\"muted\">{empty}</p>"
+  elif state == "timeout":
+    body = _pending_html(itemId, key, title.lower())
+  else:
+    body = f"<div class='error'>Failed to load {title.lower()}.</div>"
+  return f"  <section class='gs-subsection'><h4>{title}</h4>{body}</section>"
+
+def _require_admin():
+  if not ADMIN_TOKEN:
+    abort(404)
+  supplied = request.headers.get("X-PoK-Admin-Token", "")
+  if not hmac.compare_digest(supplied.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+    abort(403)
+
 def register(app):
   # ------------------------------
   # JSON endpoints
   # ------------------------------
   @app.route(f"{URL_PREFIX}/item/<int:itemId>", methods=["GET"])
+  @httpCached()
   def api_item(itemId):
-    return json.dumps(get_item(itemId))
+    return _json_cached(("item", itemId), lambda: get_item(itemId))
 
   @app.route(f"{URL_PREFIX}/item/<int:itemId>/drops", methods=["GET"])
+  @httpCached()
   def api_item_drops(itemId):
-    return json.dumps(get_item_drops(itemId))
+    return _json_cached(("item", itemId, "drops"), lambda: get_item_drops(itemId))
 
   @app.route(f"{URL_PREFIX}/item/<int:itemId>/merchants", methods=["GET"])
+  @httpCached()
   def api_item_merchants(itemId):
-    return json.dumps(get_item_merchants(itemId))
+    return _json_cached(("item", itemId, "merchants"), lambda: get_item_merchants(itemId))
 
   @app.route(f"{URL_PREFIX}/item/<int:itemId>/recipes", methods=["GET"])
+  @httpCached()
   def api_item_recipes(itemId):
-    return json.dumps(get_item_recipes(itemId))
+    return _json_cached(("item", itemId, "recipes"), lambda: get_item_recipes(itemId))
 
   @app.route(f"{URL_PREFIX}/spell/<int:spellId>", methods=["GET"])
+  @httpCached()
   def api_spell(spellId):
-    return json.dumps(get_spell(spellId))
+    return _json_cached(("spell", spellId), lambda: get_spell(spellId))
 
   @app.route(f"{URL_PREFIX}/npc/<int:npcId>", methods=["GET"])
+  @httpCached()
   def api_npc(npcId):
-    return json.dumps(get_npc(npcId))
+    return _json_cached(("npc", npcId), lambda: get_npc(npcId))
+
+  # Batch lookups: ?ids=1,2,3 -> {"1": {...}, "2": null, ...}
+  @app.route(f"{URL_PREFIX}/items", methods=["GET"])
+  @httpCached()
+  def api_items():
+    return _json_batch("item", ITEM_BATCH_MAX, get_items)
+
+  @app.route(f"{URL_PREFIX}/spells", methods=["GET"])
+  @httpCached()
+  def api_spells():
+    return _json_batch("spell", SPELL_BATCH_MAX, get_spells)
+
+  @app.route(f"{URL_PREFIX}/npcs", methods=["GET"])
+  @httpCached()
+  def api_npcs():
+    return _json_batch("npc", NPC_BATCH_MAX, get_npcs)
+
+  # -----------------------------------
+  # Map tiles
+  # -----------------------------------
+
+  # 256px tiles of one zone: layer is "base" (map lines + labels), "spawns"
+  # (spawn point markers) or "heat" (spawn heatmap, takes the heatmap query
+  # args); z/x/y as in slippy maps
+  @app.route(f"{URL_PREFIX}/map/<zone>/tiles/<layer>/<int:z>/<int:x>/<int:y>.<fmt>", methods=["GET"])
+  def api_map_tile(zone, layer, z, x, y, fmt):
+    return _map_image(fmt, lambda: get_tile(zone, layer, z, x, y, fmt, heat=_heat_args() if layer == "heat" else ()))
+
+  # Whole-zone spawn heatmap over the map (?overlay=1: heat layer only), ?size= px square
+  @app.route(f"{URL_PREFIX}/map/<zone>/heatmap.<fmt>", methods=["GET"])
+  def api_map_heatmap(zone, fmt):
+    size = request.args.get("size", 1024, type=int)
+    withBase = not _flag_arg("overlay")
+    return _map_image(fmt, lambda: get_heatmap(zone, size, fmt, heat=_heat_args(), with_base=withBase))
+
+  # -----------------------------------
+  # Admin endpoints
+  # -----------------------------------
+  @app.route(f"{URL_PREFIX}/admin/rules/refresh", methods=["POST"])
+  def api_admin_rules_refresh():
+    _require_admin()
+    invalidate_server_rules()
+    rules = get_server_rules()
+    logger.info("Server rules cache refreshed via admin endpoint (%d rules)", len(rules))
+    return Response(json.dumps({"rules": len(rules)}), mimetype="application/json")
+
+  # Flush the model/payload caches: everything, or one entity with ?type=item|spell|npc&id=N
+  @app.route(f"{URL_PREFIX}/admin/cache/flush", methods=["POST"])
+  def api_admin_cache_flush():
+    _require_admin()
+    entityType = request.args.get("type")
+    entityId = request.args.get("id", type=int)
+    if entityType in ("item", "spell", "npc") and entityId is not None:
+      invalidateEntity(entityType, entityId)
+      logger.info("Cache entry flushed via admin endpoint (%s %d)", entityType, entityId)
+    else:
+      bumpGeneration()
+    return Response(json.dumps(getCacheStats()), mimetype="application/json")
+
+  # Budgets and backpressure of this worker process: DB pool, model/payload
+  # caches, map geometry store, map layer/tile disk caches and render pool
+  @app.route(f"{URL_PREFIX}/admin/stats", methods=["GET"])
+  def api_admin_stats():
+    _require_admin()
+    resp = Response(json.dumps({
+      "pid": os.getpid(),
+      "dbPool": getPoolStats(),
+      "cache": getCacheStats(),
+      "map": {**get_layer_cache_stats(), **get_tile_cache_stats()},
+    }), mimetype="application/json")
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
 
   # -----------------------------------
   # HTML endpoints
@@ -54,67 +335,85 @@ def register(app):
 
   # Header-only (useful for compact cards / tooltips)
   @app.route(f"{URL_PREFIX}/render/item/<int:itemId>/header", methods=["GET"])
+  @httpCached()
   def api_render_item_header(itemId):
     try:
       item = get_item(itemId) or {}
       return _html(render_item_header(item))
     except Exception:
       logger.exception("Exception in API render(item/header)")
-      return _html("<div class='error'>Failed to render item header.</div>")
+      return _html_error("<div class='error'>Failed to render item header.</div>")
 
   # Drops-only section (delegates to renderers.npcs)
   @app.route(f"{URL_PREFIX}/render/item/<int:itemId>/drops", methods=["GET"])
+  @httpCached()
   def api_render_item_drops(itemId):
     try:
       drops = get_item_drops(itemId) or []
       return _html(render_item_drops(drops))
     except Exception:
       logger.exception("Exception in API render(item/drops)")
-      return _html("<div class='error'>Failed to render drops.</div>")
+      return _html_error("<div class='error'>Failed to render drops.</div>")
 
   # Merchants-only section (delegates to renderers.npcs)
   @app.route(f"{URL_PREFIX}/render/item/<int:itemId>/merchants", methods=["GET"])
+  @httpCached()
   def api_render_item_merchants(itemId):
     try:
       merchants = get_item_merchants(itemId) or []
       return _html(render_item_merchants(merchants))
     except Exception:
       logger.exception("Exception in API render(item/merchants)")
-      return _html("<div class='error'>Failed to render merchants.</div>")
+      return _html_error("<div class='error'>Failed to render merchants.</div>")
 
   # Recipes-only section (delegates to renderers.tradeskill)
   @app.route(f"{URL_PREFIX}/render/item/<int:itemId>/recipes", methods=["GET"])
+  @httpCached()
   def api_render_item_recipes_html(itemId):
     try:
       recipes = get_item_recipes(itemId) or []
       return _html(render_recipe_list(recipes))
     except Exception:
       logger.exception("Exception in API render(item/recipes)")
-      return _html("<div class='error'>Failed to render recipes.</div>")
+      return _html_error("<div class='error'>Failed to render recipes.</div>")
 
-  # One-shot "details" panel (header + drops + merchants + recipes)
+  # One-shot "details" panel (header + drops + merchants + recipes). The four
+  # lookups run concurrently; ?stream=1 sends the header as soon as it is ready.
   @app.route(f"{URL_PREFIX}/render/item/<int:itemId>/details", methods=["GET"])
+  @httpCached()
   def api_render_item_details(itemId):
     try:
-      item = get_item(itemId) or {}
-      drops = get_item_drops(itemId) or []
-      merchants = get_item_merchants(itemId) or []
-      recipes = get_item_recipes(itemId) or []
-
-      head_html = render_item_header(item)
-      drops_html = render_item_drops(drops)
-      merch_html = render_item_merchants(merchants)
-      recs_html  = render_recipe_list(recipes)
-
-      # Simple section wrappers match your current styling approach
-      return _html(
-        "<div class='gs-item-details'>"
-        f"  {head_html}"
-        f"  <section class='gs-subsection'><h4>Drops</h4>{drops_html or '<p class=\"muted\">No known drops.</p>'}</section>"
-        f"  <section class='gs-subsection'><h4>Merchants</h4>{merch_html or '<p class=\"muted\">No merchants found.</p>'}</section>"
-        f"  <section class='gs-subsection'><h4>Recipes</h4>{recs_html or '<p class=\"muted\">No recipes found.</p>'}</section>"
-        "</div>"
-      )
+      futures, deadline = _submit_details(itemId)
     except Exception:
       logger.exception("Exception in API render(item/details)")
-      return _html("<div class='error'>Failed to render item details.</div>")
+      return _html_error("<div class='error'>Failed to render item details.</div>")
+
+    if request.args.get("stream") == "1":
+      def generate():
+        yield "<div class='gs-item-details'>"
+        state, item = _section_result(itemId, "header", futures["header"], deadline)
+        yield f"  {_render_details_header(itemId, state, item)}"
+        for section in _DETAIL_SECTIONS:
+          state, value = _section_result(itemId, section[0], futures[section[0]], deadline)
+          yield _render_details_section(itemId, section, state, value)
+        yield "</div>"
+      resp = Response(stream_with_context(generate()), mimetype="text/html; charset=utf-8")
+      # Sent before we know whether every section made the deadline
+      resp.headers["Cache-Control"] = "no-store"
+      return resp
+
+    state, item = _section_result(itemId, "header", futures["header"], deadline)
+    if state == "error":
+      return _html_error("<div class='error'>Failed to render item details.</div>")
+    complete = state == "ok"
+    parts = ["<div class='gs-item-details'>", f"  {_render_details_header(itemId, state, item)}"]
+    for section in _DETAIL_SECTIONS:
+      state, value = _section_result(itemId, section[0], futures[section[0]], deadline)
+      complete = complete and state == "ok"
+      parts.append(_render_details_section(itemId, section, state, value))
+    parts.append("</div>")
+    resp = _html("".join(parts))
+    if not complete:
+      # Partial panel: never let it stand in for the full one
+      resp.headers["Cache-Control"] = "no-store"
+    return resp
@@ -3,18 +3,53 @@ NAME = "Exports"
 from pathlib import Path
 URL_PREFIX = "/" + Path(__file__).stem
 
-from flask import Response, json
+from flask import Response, json, request, abort
 from web.utils import renderPage, PoKJSONEncoder
-from api.models.exports import get_sample
+from web.streaming import (
+  jsonArrayStream, jsonObjectStream, ndjsonStream, streamResponse,
+  ndjsonBatchStream, csvStream, arrowStream, columnarJsonStream, pa,
+)
+from api.models.exports import iter_sample, iter_table_batches
 from api.models.schema import list_tables, describe_table
 from applogging import get_logger
 logger = get_logger(__name__)
 
+def _exportOptions():
+  """
+  ?format=json|ndjson, ?indent=N (0 = compact; default 2), ?gzip=1
+  """
+  fmt = request.args.get("format", "json").lower()
+  if fmt not in ("json", "ndjson"):
+    fmt = "json"
+  indent = request.args.get("indent", default=2, type=int)
+  gzip = request.args.get("gzip") == "1"
+  return fmt, (indent if indent and indent > 0 else None), gzip
+
+def _checkTable(table: str):
+  # Names are interpolated into SQL; only accept tables that actually exist
+  if table not in set(list_tables()):
+    abort(404)
+
+def _streamTables(tables, rowsFor, key: str) -> Response:
+  """Stream {table: [rows...]} (or NDJSON {"table", key}) one table at a time."""
+  fmt, indent, gzip = _exportOptions()
+  if fmt == "ndjson":
+    records = ({"table": tbl, key: row} for tbl in tables for row in rowsFor(tbl))
+    return streamResponse(ndjsonStream(records), "application/x-ndjson", gzip=gzip)
+  pairs = ((tbl, rowsFor(tbl)) for tbl in tables)
+  return streamResponse(jsonObjectStream(pairs, indent), "application/json", gzip=gzip)
+
+def _streamTable(rows) -> Response:
+  fmt, indent, gzip = _exportOptions()
+  if fmt == "ndjson":
+    return streamResponse(ndjsonStream(rows), "application/x-ndjson", gzip=gzip)
+  return streamResponse(jsonArrayStream(rows, indent), "application/json", gzip=gzip)
+
 def register(app):
   @app.route(URL_PREFIX)
   def exportsHome():
     dataTables = list_tables()
-    schemaTables = list_tables()
+    schemaTables = dataTables
     htmlContent = f'''
 <div class="headerRow">
   <div class="headerLeft">
@@ -149,16 +184,13 @@ function toggleData(type, table, liEl, event) {{
 }}
 
 function downloadAll(type) {{
+  // Let the browser stream the (large, gzip-encoded) export straight to disk
   const path = type === 'data' ? '{URL_PREFIX}/data/raw' : '{URL_PREFIX}/schema/raw';
   const file = type === 'data' ? 'pok-data-all.json' : 'pok-schema-all.json';
-  fetch(path).then(r => r.text()).then(txt => {{
-    const blob = new Blob([txt], {{type:'application/json'}});
-    const url  = URL.createObjectURL(blob);
-    const a    = Object.assign(document.createElement('a'), {{
-      href:url, download:file
-    }});
-    document.body.appendChild(a); a.click(); a.remove();
+  const a = Object.assign(document.createElement('a'), {{
+    href: path + '?gzip=1', download: file
   }});
+  document.body.appendChild(a); a.click(); a.remove();
 }}
 
 function downloadSingle(event, type, table) {{
@@ -179,20 +211,44 @@ function downloadSingle(event, type, table) {{
 
   @app.route(f"{URL_PREFIX}/data/<table>/raw")
   def exportDataRaw(table):
-    return Response(json.dumps(get_sample(table), cls=PoKJSONEncoder, indent=2), mimetype="application/json")
+    _checkTable(table)
+    return _streamTable(iter_sample(table))
+
+  # Whole table, streamed in batches from a server-side cursor:
+  #   ?format=ndjson|csv|columnar  (columnar = Arrow IPC stream, or
+  #   column-major NDJSON when pyarrow is not installed)
+  #   ?offset=N  resume after the first N rows (primary-key order)
+  #   ?gzip=1
+  @app.route(f"{URL_PREFIX}/data/<table>/full")
+  def exportDataFull(table):
+    _checkTable(table)
+    fmt = request.args.get("format", "ndjson").lower()
+    offset = max(0, request.args.get("offset", default=0, type=int))
+    gzip = request.args.get("gzip") == "1"
+    batches = iter_table_batches(table, offset=offset)
+
+    if fmt == "csv":
+      chunks, mimetype, ext = csvStream(batches), "text/csv", "csv"
+    elif fmt == "columnar" and pa is not None:
+      chunks, mimetype, ext = arrowStream(batches), "application/vnd.apache.arrow.stream", "arrows"
+    elif fmt == "columnar":
+      chunks, mimetype, ext = columnarJsonStream(batches), "application/x-ndjson", "columns.ndjson"
+    else:
+      chunks, mimetype, ext = ndjsonBatchStream(batches), "application/x-ndjson", "ndjson"
+
+    resp = streamResponse(chunks, mimetype, gzip=gzip, filename=f"{table}.{ext}")
+    resp.headers["X-PoK-Export-Offset"] = str(offset)
+    return resp
 
   @app.route(f"{URL_PREFIX}/data/raw")
   def exportAllData():
-    tableList = list_tables()
-    allTables = {tbl: get_sample(tbl) for tbl in tableList}
-    return Response(json.dumps(allTables, cls=PoKJSONEncoder, indent=2), mimetype="application/json")
+    return _streamTables(list_tables(), iter_sample, "row")
 
   @app.route(f"{URL_PREFIX}/schema/<table>/raw")
   def exportSchemaRaw(table):
+    _checkTable(table)
     return Response(json.dumps(describe_table(table), cls=PoKJSONEncoder, indent=2), mimetype="application/json")
 
   @app.route(f"{URL_PREFIX}/schema/raw")
   def exportAllSchema():
-    tableList = list_tables()
-    allSchemas = {tbl: describe_table(tbl) for tbl in tableList}
-    return Response(json.dumps(allSchemas, cls=PoKJSONEncoder, indent=2), mimetype="application/json")
+    return _streamTables(list_tables(), describe_table, "column")
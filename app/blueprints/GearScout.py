@@ -2,7 +2,7 @@ NAME = "Gear Scout"
 
 from pathlib import Path
 import html
-from flask import request, url_for
+from flask import request, url_for, json, Response, redirect
 from web.utils import renderPage
 from api.models.characters import CLASS_BITMASK, RACE_BITMASK
 from applogging import get_logger
@@ -16,12 +16,15 @@ from api.models.items import (
   SLOT_OPTIONS,
   SORTABLE_FIELDS,
   ITEM_SOURCE_OPTIONS,
-  get_spell_options_for
+  get_spell_option_lists
 )
 
 URL_PREFIX = "/" + Path(__file__).stem
 CMP_OPTIONS = ["=", ">=", "<="]
 
+# Versioned option lists never change under the same URL
+SPELL_OPTIONS_MAX_AGE = 365 * 24 * 3600
+
 def _toI(val):
   return int(val) if val and val.isdigit() else None
 
@@ -29,19 +32,25 @@ def renderForm(nameRaw, slots, minLevel, maxLevel, minRecLevel, maxRecLevel, att
                sort, sortOrder, limit, selectedClasses, selectedRaces, augmentOption, selectedSources,
                equippableOnly, boolFilters,
                focusOptions, clickOptions, procOptions,
-               selectedFocusIds, selectedClickIds, selectedProcIds, bardOptions, selectedBardIds):
+               selectedFocusIds, selectedClickIds, selectedProcIds, bardOptions, selectedBardIds,
+               spellOptionsUrl=""):
   esc = lambda x: html.escape(str(x) if x is not None else "")
 
-  def select(name, label, options, selectedIds, size=5):
+  def select(name, label, options, selectedIds, size=5, spellKind=None):
+    # Spell selects only render the current selection; gearscout.js fills in
+    # the rest from the versioned spell-options endpoint on first use.
     selectedSet = {str(v) for v in (selectedIds or [])}
     html_opts = []
     for opt in options:
+      if spellKind and str(opt["id"]) not in selectedSet:
+        continue
       sel = " selected" if str(opt["id"]) in selectedSet else ""
       html_opts.append(f"<option value='{opt['id']}'{sel}>{html.escape(opt['name'])}</option>")
+    kindAttr = f" data-spell-kind='{spellKind}'" if spellKind else ""
     return (
       f"<div class='gs-selectblock'>"
       f"  <label class='gs-label'>{label}</label>"
-      f"  <select name='{name}' multiple size='{size}' class='gs-multi'>"
+      f"  <select name='{name}' multiple size='{size}' class='gs-multi'{kindAttr}>"
       + "".join(html_opts) +
       "  </select>"
       "</div>"
@@ -98,10 +107,10 @@ def renderForm(nameRaw, slots, minLevel, maxLevel, minRecLevel, maxRecLevel, att
     )
 
   # Spell selects (shorter)
-  focusSelect = select("focusId", "Focus", focusOptions, selectedFocusIds, size=5)
-  clickSelect = select("clickId", "Click", clickOptions, selectedClickIds, size=5)
-  procSelect  = select("procId",  "Proc",  procOptions,  selectedProcIds,  size=5)
-  bardSelect  = select("bardId",  "Bard",  bardOptions,  selectedBardIds, size=5)
+  focusSelect = select("focusId", "Focus", focusOptions, selectedFocusIds, size=5, spellKind="focus")
+  clickSelect = select("clickId", "Click", clickOptions, selectedClickIds, size=5, spellKind="click")
+  procSelect  = select("procId",  "Proc",  procOptions,  selectedProcIds,  size=5, spellKind="proc")
+  bardSelect  = select("bardId",  "Bard",  bardOptions,  selectedBardIds, size=5, spellKind="bard")
 
   # Slots / Class / Race (shorter)
   slotsSelectHtml = select_from_pairs("slots", "Slot(s)", SLOT_OPTIONS, slots, size=5)
@@ -111,7 +120,7 @@ def renderForm(nameRaw, slots, minLevel, maxLevel, minRecLevel, maxRecLevel, att
   raceSelectHtml  = select_from_pairs("race",  "Race",  racesPairs,  selectedRaces,  size=5)
 
   return """
-  <form method='get' action='#gearscout-results' class='gs-form'>
+  <form method='get' action='#gearscout-results' class='gs-form' data-spell-options='""" + esc(spellOptionsUrl) + """'>
     <div class='gs-row gs-topbar'>
       <div class='gs-col name'>
         <label class='gs-label'>Name</label>
@@ -201,6 +210,18 @@ def renderForm(nameRaw, slots, minLevel, maxLevel, minRecLevel, maxRecLevel, att
   """
 
 def register(app):
+  @app.route(f"{URL_PREFIX}/spell-options/<version>.json", methods=["GET"])
+  def gearscout_spell_options(version):
+    currentVersion, lists = get_spell_option_lists()
+    if version != currentVersion:
+      # Stale link from an old page; point at the current immutable URL
+      resp = redirect(url_for("gearscout_spell_options", version=currentVersion))
+      resp.headers["Cache-Control"] = "no-cache"
+      return resp
+    resp = Response(json.dumps(lists), mimetype="application/json")
+    resp.headers["Cache-Control"] = f"public, max-age={SPELL_OPTIONS_MAX_AGE}, immutable"
+    return resp
+
   @app.route(URL_PREFIX, methods=["GET"])
   def scout():
     args = request.args
@@ -262,15 +283,20 @@ def register(app):
     except ValueError:
       logger.exception("Exception in blueprints/GearScout.py")
       currentPage = 1
-    offset = (currentPage - 1) * limit
+    currentPage = max(1, currentPage)
+    afterCursor = args.get("after") or None
+    beforeCursor = args.get("before") or None
+    exactCount = args.get("count") == "exact"
+    offset = 0 if (afterCursor or beforeCursor) else (currentPage - 1) * limit
 
     classMask = sum(CLASS_BITMASK.get(c, 0) for c in selectedClasses) if selectedClasses else None
     raceMask  = sum(RACE_BITMASK.get(r, 0) for r in selectedRaces)   if selectedRaces   else None
 
-    focusOptions = get_spell_options_for("focus")
-    clickOptions = get_spell_options_for("click")
-    procOptions  = get_spell_options_for("proc")
-    bardOptions  = get_spell_options_for("bard")
+    spellVersion, spellLists = get_spell_option_lists()
+    focusOptions = spellLists["focus"]
+    clickOptions = spellLists["click"]
+    procOptions  = spellLists["proc"]
+    bardOptions  = spellLists["bard"]
 
     result = search_items_filtered(
       nameQuery=nameRaw, slots=slots,
@@ -284,8 +310,10 @@ def register(app):
       itemSourceFilters=selectedSources,
       focusIds=selectedFocusIds, clickIds=selectedClickIds, procIds=selectedProcIds, bardIds=selectedBardIds,
       limit=limit, offset=offset,
+      after=afterCursor, before=beforeCursor,
       sortField=SORTABLE_FIELDS.get(sort, "i.Name"),
-      sortOrder=sortOrder
+      sortOrder=sortOrder,
+      exactCount=exactCount
     )
 
     # light, useful log
@@ -297,10 +325,19 @@ def register(app):
       selectedClasses, selectedRaces, augmentOption, selectedSources,
       equippableOnly, boolFilters,
       focusOptions, clickOptions, procOptions,
-      selectedFocusIds, selectedClickIds, selectedProcIds, bardOptions, selectedBardIds
+      selectedFocusIds, selectedClickIds, selectedProcIds, bardOptions, selectedBardIds,
+      spellOptionsUrl=url_for("gearscout_spell_options", version=spellVersion)
     )
 
-    htmlContent += f"<h2>Results ({result['total']})</h2><ul id='gearscout-results'>"
+    if result['totalExact']:
+      totalLabel = str(result['total'])
+    else:
+      from urllib.parse import urlencode
+      exactParams = request.args.to_dict(flat=False)
+      exactParams['count'] = 'exact'
+      exactUrl = html.escape(f"{URL_PREFIX}?{urlencode(exactParams, doseq=True)}#results")
+      totalLabel = f"{result['total']}+ <small><a href='{exactUrl}'>exact count</a></small>"
+    htmlContent += f"<h2>Results ({totalLabel})</h2><ul id='gearscout-results'>"
     for item in result["items"]:
       icons = []
       if item.get('lootdropEntries'):
@@ -359,10 +396,13 @@ def register(app):
 
     totalResults = result['total']
     totalPages = (totalResults + limit - 1) // limit
-    if totalPages > 1:
+    if result['prevCursor'] or result['nextCursor']:
       from web.utils import renderPagination
       queryParams = request.args.to_dict(flat=False)
-      paginationHtml = renderPagination(currentPage, totalPages, URL_PREFIX, queryParams)
+      paginationHtml = renderPagination(
+        currentPage, totalPages if result['totalExact'] else 0, URL_PREFIX, queryParams,
+        prevCursor=result['prevCursor'], nextCursor=result['nextCursor']
+      )
       htmlContent += paginationHtml
 
     return renderPage(htmlContent)
@@ -1,9 +1,29 @@
 import json
+import os
+from threading import Lock
 from applogging import get_logger
 logger = get_logger(__name__)
 
 EQEMU_CONFIG_PATH = "/app/server/eqemu_config.json"
 
+# (mtime_ns, size, parsed) of the last load; reloaded only when the file changes
+_config_cache = None
+_config_lock = Lock()
+
 def getEQEMUConfig():
-  with open(EQEMU_CONFIG_PATH) as f:
-    return json.load(f)
\ No newline at end of file
+  global _config_cache
+  st = os.stat(EQEMU_CONFIG_PATH)
+  stamp = (st.st_mtime_ns, st.st_size)
+  cached = _config_cache
+  if cached is not None and cached[0] == stamp:
+    return cached[1]
+
+  with _config_lock:
+    if _config_cache is not None and _config_cache[0] == stamp:
+      return _config_cache[1]
+    with open(EQEMU_CONFIG_PATH) as f:
+      cfg = json.load(f)
+    if _config_cache is not None:
+      logger.info("Reloaded %s (file changed on disk)", EQEMU_CONFIG_PATH)
+    _config_cache = (stamp, cfg)
+    return cfg
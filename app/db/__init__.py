@@ -1,5 +1,3 @@
 # db/__init__.py
 # Re-export core DB helpers for convenience. No side effects here.
-from .db import getDb, initializeDbObjects, DB_PREFIX
-from applogging import get_logger
-logger = get_logger(__name__)
+from .db import getDb, dbConnection, getPoolStats, POOL_MAX_SIZE, getDataVersion, getDataLastModified, PoolTimeoutError, initializeDbObjects, DB_PREFIX
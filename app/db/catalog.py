@@ -0,0 +1,106 @@
+from threading import Lock
+from db.db import dbConnection, getDataVersion
+from applogging import get_logger
+logger = get_logger(__name__)
+
+def _toInt(value):
+  try:
+    return int(value) if value is not None else None
+  except (TypeError, ValueError):
+    return None
+
+class SchemaCatalog:
+  """
+  Every column of every table/view in the current schema, read from
+  information_schema.columns in one query. `tables` maps table name to its
+  columns in ordinal order; each column is a dict of information_schema
+  fields plus parsed lengths.
+  """
+  def __init__(self, rows, version=None):
+    self.version = version
+    self.tables = {}
+    for r in rows:
+      self.tables.setdefault(r["TABLE_NAME"], []).append({
+        "name": r["COLUMN_NAME"],
+        "column_type": r["COLUMN_TYPE"],
+        "data_type": (r["DATA_TYPE"] or "").lower(),
+        "nullable": r["IS_NULLABLE"],
+        "key": r["COLUMN_KEY"] or "",
+        "default": r["COLUMN_DEFAULT"],
+        "extra": r["EXTRA"] or "",
+        "char_len": _toInt(r["CHARACTER_MAXIMUM_LENGTH"]),
+        "octet_len": _toInt(r["CHARACTER_OCTET_LENGTH"]),
+      })
+
+  def tableNames(self):
+    return sorted(self.tables)
+
+  def hasTable(self, table: str) -> bool:
+    return table in self.tables
+
+  def describe(self, table: str):
+    """Rows shaped like `DESCRIBE table` (Field/Type/Null/Key/Default/Extra)."""
+    return [
+      {"Field": c["name"], "Type": c["column_type"], "Null": c["nullable"],
+       "Key": c["key"], "Default": c["default"], "Extra": c["extra"]}
+      for c in self.tables.get(table, [])
+    ]
+
+  def columnMeta(self, tables=None):
+    """{(table, column): {"char_len", "octet_len", "data_type"}} for db.indexes."""
+    return {
+      (table, c["name"]): {"char_len": c["char_len"], "octet_len": c["octet_len"], "data_type": c["data_type"]}
+      for table, cols in self.tables.items()
+      if tables is None or table in tables
+      for c in cols
+    }
+
+_CATALOG_SQL = """
+  SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_KEY,
+         COLUMN_DEFAULT, EXTRA, CHARACTER_MAXIMUM_LENGTH, CHARACTER_OCTET_LENGTH
+  FROM INFORMATION_SCHEMA.COLUMNS
+  WHERE TABLE_SCHEMA = DATABASE()
+  ORDER BY TABLE_NAME, ORDINAL_POSITION
+"""
+
+def _loadRows(cur):
+  cur.execute(_CATALOG_SQL)
+  rows = cur.fetchall() or []
+  if rows and not isinstance(rows[0], dict):
+    names = [d[0] for d in cur.description]
+    rows = [dict(zip(names, r)) for r in rows]
+  # Some servers report information_schema column names in lower case
+  return [{k.upper(): v for k, v in r.items()} for r in rows]
+
+_catalog = None
+_catalog_lock = Lock()
+
+def getCatalog(cur=None) -> SchemaCatalog:
+  """
+  The cached schema catalog. Request code calls it without a cursor and
+  gets a catalog rebuilt whenever the data version changes. DB init
+  passes its own cursor and reuses whatever is cached; it calls
+  invalidateCatalog() before and after rebuilding objects.
+  """
+  global _catalog
+  version = None if cur is not None else getDataVersion()
+  cached = _catalog
+  if cached is not None and (cur is not None or cached.version == version):
+    return cached
+  with _catalog_lock:
+    cached = _catalog
+    if cached is not None and (cur is not None or cached.version == version):
+      return cached
+    if cur is not None:
+      rows = _loadRows(cur)
+    else:
+      with dbConnection() as db, db.cursor() as c:
+        rows = _loadRows(c)
+    _catalog = SchemaCatalog(rows, version)
+    logger.info("Loaded schema catalog: %d tables, %d columns", len(_catalog.tables), len(rows))
+    return _catalog
+
+def invalidateCatalog():
+  global _catalog
+  with _catalog_lock:
+    _catalog = None
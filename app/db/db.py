@@ -1,93 +1,353 @@
-import json
+import os
+import time
+import datetime
+import hashlib
 import pymysql
 import pymysql.cursors
-from threading import Lock
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Lock
+from config import getEQEMUConfig
 from applogging import get_logger
 logger = get_logger(__name__)
 
-_db = None
-_db_lock = Lock()
 DB_PREFIX = "pok"
 
-SESSION_TUNING_SQL = [
-  "SET SESSION max_heap_table_size=1073741824",
-  "SET SESSION tmp_table_size=1073741824",
-  "SET SESSION sort_buffer_size=67108864",
-  "SET SESSION join_buffer_size=33554432",
-  "SET SESSION read_buffer_size=33554432",
-  "SET SESSION read_rnd_buffer_size=33554432",
-  "SET SESSION group_concat_max_len=131072",
-]
-
-def _apply_session_tuning(conn):
+# Pool sizing (per gunicorn worker process)
+POOL_MAX_SIZE = int(os.environ.get("POK_DB_POOL_SIZE", "8"))
+POOL_IDLE_TIMEOUT_SECS = float(os.environ.get("POK_DB_POOL_IDLE_TIMEOUT", "300"))
+POOL_CHECKOUT_TIMEOUT_SECS = float(os.environ.get("POK_DB_POOL_CHECKOUT_TIMEOUT", "30"))
+
+# How long a computed data version is trusted before re-reading the catalog
+DATA_VERSION_TTL_SECS = float(os.environ.get("POK_DATA_VERSION_TTL", "30"))
+
+# Session variable profiles. Every new connection starts on DEFAULT_SESSION_PROFILE
+# (sent once at connect time via init_command); callers running big sorts/joins
+# ask for "heavy" and the pooled connection is switched with a single SET.
+SESSION_PROFILES = {
+  "light": {
+    "max_heap_table_size": 16777216,
+    "tmp_table_size": 16777216,
+    "sort_buffer_size": 262144,
+    "join_buffer_size": 262144,
+    "read_buffer_size": 131072,
+    "read_rnd_buffer_size": 262144,
+    "group_concat_max_len": 131072,
+  },
+  "heavy": {
+    "max_heap_table_size": 1073741824,
+    "tmp_table_size": 1073741824,
+    "sort_buffer_size": 67108864,
+    "join_buffer_size": 33554432,
+    "read_buffer_size": 33554432,
+    "read_rnd_buffer_size": 33554432,
+    "group_concat_max_len": 131072,
+  },
+}
+DEFAULT_SESSION_PROFILE = "light"
+
+class PoolTimeoutError(Exception):
+  pass
+
+def _session_tuning_sql(profile: str) -> str:
+  settings = SESSION_PROFILES[profile]
+  return "SET SESSION " + ", ".join(f"{k}={int(v)}" for k, v in settings.items())
+
+def _apply_session_tuning(conn, profile: str):
+  if getattr(conn, "pok_session_profile", None) == profile:
+    return
   with conn.cursor() as cur:
-    for stmt in SESSION_TUNING_SQL:
-      cur.execute(stmt)
-  conn.commit()
+    cur.execute(_session_tuning_sql(profile))
+  conn.pok_session_profile = profile
 
 def getConfig():
-  with open("/app/server/eqemu_config.json") as f:
-    return json.load(f)
-
-def getDb():
-  global _db
-  with _db_lock:
-    cfg = getConfig()["server"]["database"]
-
-    def _connect():
-      conn = pymysql.connect(
-        host=cfg["host"],
-        port=int(cfg["port"]),
-        user=cfg["username"],
-        password=cfg["password"],
-        database=cfg["db"],
-        cursorclass=pymysql.cursors.DictCursor,
-        charset="utf8mb4",
-        autocommit=True,
-      )
-      _apply_session_tuning(conn)
-      return conn
+  return getEQEMUConfig()
 
-    # No connection yet or it's closed → open fresh
-    if _db is None or not getattr(_db, "open", False):
-      _db = _connect()
-      return _db
+def _connect(profile: str = DEFAULT_SESSION_PROFILE):
+  cfg = getConfig()["server"]["database"]
+  conn = pymysql.connect(
+    host=cfg["host"],
+    port=int(cfg["port"]),
+    user=cfg["username"],
+    password=cfg["password"],
+    database=cfg["db"],
+    cursorclass=pymysql.cursors.DictCursor,
+    charset="utf8mb4",
+    autocommit=True,
+    init_command=_session_tuning_sql(profile),
+  )
+  conn.pok_session_profile = profile
+  return conn
 
-    # Have a connection: ensure it’s alive; reconnect if needed
-    try:
-      _db.ping(reconnect=True)
-      if not _db.open:
-        logger.warning("DB connection not open after ping; reconnecting")
-        _db = _connect()
-      return _db
+def _close_quietly(conn):
+  try:
+    if conn and getattr(conn, "open", False):
+      conn.close()
+  except Exception:
+    pass
+
+class ConnectionPool:
+  """
+  Bounded pool of PyMySQL connections for one process.
+
+  Connections are handed out exclusively (checkout) and returned (checkin),
+  so concurrent request threads never share a socket. Idle connections older
+  than idle_timeout are closed; every checkout pings the connection and
+  replaces it if the server dropped it.
+  """
+  def __init__(self, connect, *, max_size: int, idle_timeout: float, checkout_timeout: float):
+    self._connect = connect
+    self.max_size = max(1, int(max_size))
+    self.idle_timeout = float(idle_timeout)
+    self.checkout_timeout = float(checkout_timeout)
+    self.pid = os.getpid()
 
+    self._cond = Condition(Lock())
+    self._idle = deque()          # (conn, last_used_monotonic); right = most recent
+    self._open = 0                # idle + in use
+    self._in_use = 0
+    self._waiters = 0
+
+    # counters
+    self._checkouts = 0
+    self._waits = 0
+    self._wait_secs_total = 0.0
+    self._wait_secs_max = 0.0
+    self._timeouts = 0
+    self._created = 0
+    self._discarded = 0
+
+  def _evict_idle_locked(self, now: float) -> list:
+    stale = []
+    while self._idle and now - self._idle[0][1] > self.idle_timeout:
+      conn, _ = self._idle.popleft()
+      self._open -= 1
+      stale.append(conn)
+    return stale
+
+  def checkout(self):
+    started = time.monotonic()
+    deadline = started + self.checkout_timeout
+    waited = False
+    conn = None
+    stale = []
+
+    with self._cond:
+      while True:
+        now = time.monotonic()
+        stale.extend(self._evict_idle_locked(now))
+        if self._idle:
+          conn, _ = self._idle.pop()
+          break
+        if self._open < self.max_size:
+          self._open += 1
+          break
+        remaining = deadline - now
+        if remaining <= 0:
+          self._timeouts += 1
+          raise PoolTimeoutError(
+            f"Timed out after {self.checkout_timeout:.1f}s waiting for a DB connection "
+            f"(max_size={self.max_size}, in_use={self._in_use}, waiters={self._waiters})"
+          )
+        waited = True
+        self._waiters += 1
+        try:
+          self._cond.wait(remaining)
+        finally:
+          self._waiters -= 1
+      self._in_use += 1
+
+    for s in stale:
+      _close_quietly(s)
+
+    try:
+      if conn is None:
+        conn = self._connect()
+        with self._cond:
+          self._created += 1
+      else:
+        # Health check; a dead socket is replaced rather than reconnected in
+        # place so a fresh connection always gets its session setup.
+        try:
+          conn.ping(reconnect=False)
+        except Exception:
+          logger.warning("Pooled DB connection failed health check; replacing")
+          _close_quietly(conn)
+          conn = self._connect()
+          with self._cond:
+            self._discarded += 1
+            self._created += 1
     except Exception:
-      # Cleanup quietly; let the exception bubble to the global handler
-      try:
-        if _db and getattr(_db, "open", False):
-          _db.close()
-      except Exception:
-        pass
-      _db = None
+      with self._cond:
+        self._open -= 1
+        self._in_use -= 1
+        self._cond.notify()
       raise
 
+    elapsed = time.monotonic() - started
+    with self._cond:
+      self._checkouts += 1
+      if waited:
+        self._waits += 1
+        self._wait_secs_total += elapsed
+        self._wait_secs_max = max(self._wait_secs_max, elapsed)
+    return conn
+
+  def checkin(self, conn, *, discard: bool = False):
+    if not discard and not getattr(conn, "open", False):
+      discard = True
+    with self._cond:
+      self._in_use -= 1
+      if discard:
+        self._open -= 1
+        self._discarded += 1
+      else:
+        self._idle.append((conn, time.monotonic()))
+      self._cond.notify()
+    if discard:
+      _close_quietly(conn)
+
+  def close(self):
+    with self._cond:
+      idle = [c for c, _ in self._idle]
+      self._idle.clear()
+      self._open -= len(idle)
+    for c in idle:
+      _close_quietly(c)
+
+  def stats(self) -> dict:
+    with self._cond:
+      return {
+        "maxSize": self.max_size,
+        "open": self._open,
+        "idle": len(self._idle),
+        "inUse": self._in_use,
+        "waiters": self._waiters,
+        "checkouts": self._checkouts,
+        "waits": self._waits,
+        "waitMsTotal": round(self._wait_secs_total * 1000.0, 1),
+        "waitMsMax": round(self._wait_secs_max * 1000.0, 1),
+        "timeouts": self._timeouts,
+        "created": self._created,
+        "discarded": self._discarded,
+      }
+
+_pool = None
+_pool_lock = Lock()
+
+def _getPool() -> ConnectionPool:
+  global _pool
+  pool = _pool
+  # Re-create after fork: gunicorn workers must never share the master's sockets
+  if pool is not None and pool.pid == os.getpid():
+    return pool
+  with _pool_lock:
+    if _pool is None or _pool.pid != os.getpid():
+      _pool = ConnectionPool(
+        _connect,
+        max_size=POOL_MAX_SIZE,
+        idle_timeout=POOL_IDLE_TIMEOUT_SECS,
+        checkout_timeout=POOL_CHECKOUT_TIMEOUT_SECS,
+      )
+      logger.info("Created DB connection pool (pid=%d, max_size=%d)", _pool.pid, _pool.max_size)
+    return _pool
+
+@contextmanager
+def dbConnection(profile: str = DEFAULT_SESSION_PROFILE):
+  """
+  Check a connection out of this process's pool for the duration of the block:
+
+    with dbConnection() as db, db.cursor() as cur:
+      cur.execute(...)
+
+  `profile` picks the SESSION_PROFILES entry the connection should run with;
+  it costs one round trip only when the pooled connection was left on a
+  different profile. Connections that hit a connection-level error are
+  discarded instead of being returned to the pool.
+  """
+  pool = _getPool()
+  conn = pool.checkout()
+  discard = False
+  try:
+    _apply_session_tuning(conn, profile)
+    yield conn
+  except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+    discard = True
+    raise
+  finally:
+    pool.checkin(conn, discard=discard)
+
+def getPoolStats() -> dict:
+  return _getPool().stats()
+
+_data_version = None   # (computed_at_monotonic, version, last_modified)
+_data_version_lock = Lock()
+
+def _dataVersionInfo():
+  global _data_version
+  cached = _data_version
+  now = time.monotonic()
+  if cached is not None and now - cached[0] < DATA_VERSION_TTL_SECS:
+    return cached
+
+  with _data_version_lock:
+    cached = _data_version
+    if cached is not None and now - cached[0] < DATA_VERSION_TTL_SECS:
+      return cached
+    with dbConnection() as db, db.cursor() as cur:
+      cur.execute(
+        """
+        SELECT table_name AS name, table_comment AS comment, create_time AS created,
+               UNIX_TIMESTAMP(create_time) AS created_ts
+        FROM information_schema.tables
+        WHERE table_schema = DATABASE()
+          AND table_name LIKE %s
+          AND table_type = 'BASE TABLE'
+        ORDER BY table_name
+        """,
+        (f"{DB_PREFIX}\\_%",),
+      )
+      h = hashlib.sha1()
+      lastModified = None
+      for row in cur.fetchall():
+        h.update(f"{row['name']}|{row['comment']}|{row['created']}\n".encode("utf-8"))
+        # create_time is naive in the session time zone; UNIX_TIMESTAMP()
+        # converts it with that same zone, so the result is true UTC
+        if row['created_ts'] is not None:
+          created = datetime.datetime.fromtimestamp(float(row['created_ts']), datetime.timezone.utc)
+          if lastModified is None or created > lastModified:
+            lastModified = created
+    version = h.hexdigest()[:16]
+    if cached is not None and cached[1] != version:
+      logger.info("Data version changed: %s -> %s", cached[1], version)
+    _data_version = (time.monotonic(), version, lastModified)
+    return _data_version
+
+def getDataVersion() -> str:
+  """
+  Short hash identifying the current seeded data: changes whenever a pok_
+  table is rebuilt (new fingerprint comment / create time). Cached for
+  DATA_VERSION_TTL_SECS so callers can use it freely as a cache key.
+  """
+  return _dataVersionInfo()[1]
+
+def getDataLastModified():
+  """Newest pok_ table create time (timezone-aware UTC datetime), or None."""
+  return _dataVersionInfo()[2]
+
+def getDb(profile: str = "heavy"):
+  """
+  Open a dedicated (unpooled) connection. The caller owns it and must close it.
+  Request code should use dbConnection() instead.
+  """
+  return _connect(profile)
+
 def initializeDbObjects():
   logger.info("Initializing database objects...")
-  db = getDb()
-
-  from db.indexes import initializeIndexes
-  from db.functions import initializeFunctions
-  from db.tables import initializeTables
-  from db.views import initializeViews
-  from db.procedures import initializeProcedures
-
-  # Build structure in dependency-safe order
-  initializeIndexes(db)
-  initializeFunctions(db)
-  initializeTables(db)
-  initializeViews(db)
-  initializeProcedures(db)
-
-  db.commit()
+
+  # Dependency graph over indexes, functions, tables, views and procedures;
+  # independent objects build concurrently on separate connections
+  from db.initializer import runInitialization
+  runInitialization()
+
   logger.info("DB initialization completed.")
-  db.close()
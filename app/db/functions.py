@@ -65,30 +65,60 @@ def _drop_all_prefixed_functions(cur) -> int:
   return dropped
 
 
+def _parse_function_file(path: str):
+  with open(path, "r", encoding="utf-8") as f:
+    sql = f.read()
+
+  m = _HDR_RE.search(sql)
+  if not m:
+    snippet = sql[:160].replace("\n", "\\n")
+    raise ValueError(f"CREATE FUNCTION header not found in {path}. First 160 chars: {snippet!r}")
+
+  func_name = m.group(1)
+  _require_prefixed(func_name, path, "Function")
+  return func_name, sql
+
+
+def _create_function_from_file(cur, path: str) -> str:
+  func_name, sql = _parse_function_file(path)
+  try:
+    cur.execute(sql)
+  except Exception as e:
+    raise e.__class__(f"{e} [function={func_name} file={path}]") from e
+
+  logger.info("  - Created function `%s`", func_name)
+  return func_name
+
+
 def _create_functions_from_files(cur) -> int:
-  files = _iter_sql_files()
   created = 0
-  for path in files:
-    with open(path, "r", encoding="utf-8") as f:
-      sql = f.read()
+  for path in _iter_sql_files():
+    _create_function_from_file(cur, path)
+    created += 1
+  return created
 
-    m = _HDR_RE.search(sql)
-    if not m:
-      snippet = sql[:160].replace("\n", "\\n")
-      raise ValueError(f"CREATE FUNCTION header not found in {path}. First 160 chars: {snippet!r}")
 
-    func_name = m.group(1)
-    _require_prefixed(func_name, path, "Function")
+def listFunctionFiles():
+  """[(function_name, path, sql)] for every functions/*.sql file."""
+  out = []
+  for path in _iter_sql_files():
+    name, sql = _parse_function_file(path)
+    out.append((name, path, sql))
+  return out
 
-    try:
-      cur.execute(sql)
-    except Exception as e:
-      raise e.__class__(f"{e} [function={func_name} file={path}]") from e
 
-    logger.info("  - Created function `%s`", func_name)
-    created += 1
+def dropFunctions(db) -> int:
+  with db.cursor() as cur:
+    dropped = _drop_all_prefixed_functions(cur)
+    db.commit()
+  return dropped
 
-  return created
+
+def createFunctionFromFile(db, path: str) -> str:
+  with db.cursor() as cur:
+    name = _create_function_from_file(cur, path)
+    db.commit()
+  return name
 
 
 def initializeFunctions(db):
@@ -0,0 +1,25 @@
+CREATE FUNCTION `pok_fold_item_name`(p_name VARCHAR(64))
+RETURNS VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin
+DETERMINISTIC
+NO SQL
+SQL SECURITY INVOKER
+BEGIN
+  -- Search form of an item name: lowercased, Latin-1 accented letters
+  -- folded to ASCII. Must match _NAME_FOLD in api/models/items.py, which
+  -- applies the same rules to search terms.
+  DECLARE v_from VARCHAR(32) CHARACTER SET utf8mb4 DEFAULT 'àáâãäåçèéêëìíîïñòóôõöùúûüýÿ';
+  DECLARE v_to   VARCHAR(32) CHARACTER SET utf8mb4 DEFAULT 'aaaaaaceeeeiiiinooooouuuuyy';
+  DECLARE v_out  VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin;
+  DECLARE i      INT DEFAULT 1;
+
+  IF p_name IS NULL THEN
+    RETURN '';
+  END IF;
+
+  SET v_out = LOWER(CONVERT(p_name USING utf8mb4)) COLLATE utf8mb4_bin;
+  WHILE i <= CHAR_LENGTH(v_from) DO
+    SET v_out = REPLACE(v_out, SUBSTRING(v_from, i, 1), SUBSTRING(v_to, i, 1));
+    SET i = i + 1;
+  END WHILE;
+  RETURN v_out;
+END
@@ -128,26 +128,19 @@ def _desiredMap():
 def _colListSQL(colPairs):
   return ", ".join(f"`{c}`({s})" if s is not None else f"`{c}`" for c, s in colPairs)
 
-def _getColMeta(cur):
-  cur.execute("""
-    SELECT TABLE_NAME, COLUMN_NAME, CHARACTER_MAXIMUM_LENGTH, CHARACTER_OCTET_LENGTH, DATA_TYPE
-    FROM INFORMATION_SCHEMA.COLUMNS
-    WHERE TABLE_SCHEMA = DATABASE()
-  """)
-  meta = {}
-  for r in (cur.fetchall() or []):
-    if isinstance(r, dict):
-      tbl, col = r["TABLE_NAME"], r["COLUMN_NAME"]
-      char_len = r["CHARACTER_MAXIMUM_LENGTH"]; octet_len = r["CHARACTER_OCTET_LENGTH"]
-      dtype = (r["DATA_TYPE"] or "").lower()
-    else:
-      tbl, col, char_len, octet_len, dtype = r; dtype = (dtype or "").lower()
-    try: char_len = int(char_len) if char_len is not None else None
-    except: char_len = None
-    try: octet_len = int(octet_len) if octet_len is not None else None
-    except: octet_len = None
-    meta[(tbl, col)] = {"char_len": char_len, "octet_len": octet_len, "data_type": dtype}
-  return meta
+def _tableFilterSQL(tables):
+  """AND-clause + params restricting an information_schema query to `tables` (None = all)."""
+  if tables is None:
+    return "", ()
+  tables = sorted(tables)
+  if not tables:
+    return "AND 1 = 0", ()
+  return f"AND TABLE_NAME IN ({', '.join(['%s'] * len(tables))})", tuple(tables)
+
+def _getColMeta(cur, tables=None):
+  # Shared with the Exports pages; one information_schema query per init
+  from db.catalog import getCatalog
+  return getCatalog(cur).columnMeta(tables)
 
 def _isTextLike(dtype: str) -> bool:
   return dtype in {"text","tinytext","mediumtext","longtext","blob","tinyblob","mediumblob","longblob"}
@@ -168,15 +161,17 @@ def _normalizeExisting(existing, colMeta):
         new_cols.append((col, sub))
       info["cols"] = new_cols
 
-def _fetchExistingOurPrefix(cur):
-  sql = """
+def _fetchExistingOurPrefix(cur, tables=None):
+  where, params = _tableFilterSQL(tables)
+  sql = f"""
     SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART
     FROM information_schema.statistics
     WHERE TABLE_SCHEMA = DATABASE()
       AND INDEX_NAME LIKE %s
+      {where}
     ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
   """
-  cur.execute(sql, (f"{INDEX_PREFIX}\\_%",))
+  cur.execute(sql, (f"{INDEX_PREFIX}\\_%",) + params)
   rows = cur.fetchall() or []
   existing = {}
   for r in rows:
@@ -193,14 +188,16 @@ def _fetchExistingOurPrefix(cur):
     imap["cols"].append((col, sub))
   return existing
 
-def _fetchAllIndexes(cur):
-  sql = """
+def _fetchAllIndexes(cur, tables=None):
+  where, params = _tableFilterSQL(tables)
+  sql = f"""
     SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, SEQ_IN_INDEX, COLUMN_NAME, SUB_PART
     FROM information_schema.statistics
     WHERE TABLE_SCHEMA = DATABASE()
+      {where}
     ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX
   """
-  cur.execute(sql)
+  cur.execute(sql, params)
   rows = cur.fetchall() or []
   allidx = {}
   for r in rows:
@@ -240,13 +237,28 @@ def _dropIndex(cur, table, idxName, why):
   cur.execute(f"DROP INDEX `{idxName}` ON `{table}`")
   logger.info(f"  - Dropped index `{idxName}` on `{table}` ({why})")
 
-def syncIndexes(db):
+def indexedTables(db):
+  """
+  Tables syncIndexes() would touch: every table with a definition plus any
+  table still carrying one of our prefixed indexes.
+  """
+  with db.cursor() as cur:
+    existing = _fetchExistingOurPrefix(cur)
+  return sorted(set(_desiredMap()) | set(existing))
+
+def syncIndexes(db, tables=None):
+  """
+  Bring our prefixed indexes in line with INDEX_DEFS. `tables` limits the
+  sync to those tables so independent tables can be synced concurrently.
+  """
   desired = _desiredMap()
+  if tables is not None:
+    desired = {t: v for t, v in desired.items() if t in tables}
   changed = False
   with db.cursor() as cur:
-    existingOur = _fetchExistingOurPrefix(cur)
-    allExisting = _fetchAllIndexes(cur)
-    colMeta = _getColMeta(cur)
+    existingOur = _fetchExistingOurPrefix(cur, tables)
+    allExisting = _fetchAllIndexes(cur, tables)
+    colMeta = _getColMeta(cur, tables)
     _normalizeExisting(existingOur, colMeta)
     _normalizeExisting(allExisting, colMeta)
 
@@ -0,0 +1,225 @@
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from db.db import getDb
+from applogging import get_logger
+
+logger = get_logger(__name__)
+
+# Concurrent connections used while building indexes / seeding tables
+INIT_WORKERS = max(1, int(os.environ.get("POK_DB_INIT_WORKERS", "4")))
+
+_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+
+class InitTask:
+  """
+  One DB object to build. `run(db)` gets its own connection; `deps` are
+  keys of tasks that must finish first.
+  """
+  __slots__ = ("key", "path", "deps", "run", "seconds")
+
+  def __init__(self, key: str, path, run, deps=()):
+    self.key = key
+    self.path = path
+    self.run = run
+    self.deps = set(deps)
+    self.seconds = None
+
+def _words(sql: str) -> set:
+  return {w.lower() for w in _WORD_RE.findall(sql)}
+
+def _bind(fn, *args):
+  return lambda db: fn(db, *args)
+
+def _plan(db) -> dict:
+  """
+  Build the task graph. Dependencies come from name references in each
+  SQL file: a table seed waits for the functions/pok tables it mentions
+  and for the index sync of every base table it reads; views and
+  procedures wait for whatever pok objects they mention.
+  """
+  from db.indexes import indexedTables, syncIndexes
+  from db.functions import listFunctionFiles, createFunctionFromFile
+  from db.tables import listTableFiles, syncTableFromFile, dropStaleTables, EXPANSION_FUNCTION
+  from db.views import listViewFiles, createViewFromFile
+  from db.procedures import listProcedureFiles, createProceduresFromFile
+
+  tasks = {}
+  byName = {}   # object name -> task key, for dependency lookup
+
+  def add(task, name=None):
+    if task.key in tasks:
+      raise ValueError(f"Duplicate DB object `{task.key}` ({task.path} vs {tasks[task.key].path})")
+    tasks[task.key] = task
+    if name:
+      byName[name.lower()] = task.key
+
+  indexTasks = {}
+  for table in indexedTables(db):
+    key = f"index:{table}"
+    indexTasks[table.lower()] = key
+    add(InitTask(key, None, lambda db, t=table: syncIndexes(db, tables={t})))
+
+  functions = listFunctionFiles()
+  for name, path, _ in functions:
+    add(InitTask(f"function:{name}", path, _bind(createFunctionFromFile, path)), name)
+
+  tables = listTableFiles()
+  for name, path, _ in tables:
+    add(InitTask(f"table:{name}", path, _bind(syncTableFromFile, path)), name)
+
+  views = listViewFiles()
+  for name, path, _ in views:
+    add(InitTask(f"view:{name}", path, _bind(createViewFromFile, path)), name)
+
+  procedures = listProcedureFiles()
+  for path, _ in procedures:
+    add(InitTask(f"procedure:{os.path.basename(path)}", path, _bind(createProceduresFromFile, path)))
+
+  def refs(sql: str, selfKey: str) -> set:
+    return {byName[w] for w in _words(sql) if w in byName and byName[w] != selfKey}
+
+  for name, path, sql in functions:
+    key = f"function:{name}"
+    tasks[key].deps |= {d for d in refs(sql, key) if d.startswith("function:")}
+
+  expansionKey = byName.get(EXPANSION_FUNCTION.lower())
+  for name, path, sql in tables:
+    key = f"table:{name}"
+    words = _words(sql)
+    deps = refs(sql, key)
+    deps |= {indexTasks[w] for w in words if w in indexTasks}
+    if expansionKey:
+      deps.add(expansionKey)
+    tasks[key].deps |= deps
+
+  for name, path, sql in views:
+    key = f"view:{name}"
+    tasks[key].deps |= refs(sql, key)
+
+  for path, sql in procedures:
+    key = f"procedure:{os.path.basename(path)}"
+    tasks[key].deps |= refs(sql, key)
+
+  declared = [name for name, _, _ in tables]
+  add(InitTask(
+    "tables:stale", None, lambda db: dropStaleTables(db, declared),
+    deps={f"table:{n}" for n in declared},
+  ))
+
+  _check_acyclic(tasks)
+  return tasks
+
+def _check_acyclic(tasks: dict):
+  remaining = {k: set(t.deps) for k, t in tasks.items()}
+  for k, deps in remaining.items():
+    missing = deps - tasks.keys()
+    if missing:
+      raise ValueError(f"`{k}` depends on unknown objects: {', '.join(sorted(missing))}")
+  ready = [k for k, deps in remaining.items() if not deps]
+  while ready:
+    done = ready.pop()
+    del remaining[done]
+    for k, deps in remaining.items():
+      if done in deps:
+        deps.discard(done)
+        if not deps:
+          ready.append(k)
+  if remaining:
+    raise ValueError("Dependency cycle between DB objects: " + ", ".join(sorted(remaining)))
+
+def _run_task(task: InitTask):
+  started = time.monotonic()
+  db = getDb()
+  try:
+    task.run(db)
+  finally:
+    db.close()
+  task.seconds = time.monotonic() - started
+
+def _run_graph(tasks: dict, workers: int):
+  pending = {k: set(t.deps) for k, t in tasks.items()}
+  running = {}
+
+  with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pok-dbinit") as pool:
+    while pending or running:
+      for key in [k for k, deps in pending.items() if not deps]:
+        del pending[key]
+        running[pool.submit(_run_task, tasks[key])] = key
+
+      if not running:
+        raise RuntimeError("DB initialization stalled: " + ", ".join(sorted(pending)))
+      finished, _ = wait(running, return_when=FIRST_COMPLETED)
+      for fut in finished:
+        key = running.pop(fut)
+        err = fut.exception()
+        if err is not None:
+          for other in running:
+            other.cancel()
+          where = tasks[key].path or key
+          raise RuntimeError(f"DB initialization failed at `{key}` ({where}): {err}") from err
+        for deps in pending.values():
+          deps.discard(key)
+
+def _critical_path(tasks: dict):
+  """Longest chain by measured duration: (seconds, [keys])."""
+  memo = {}
+  def longest(key):
+    if key not in memo:
+      best = (0.0, [])
+      for d in tasks[key].deps:
+        cand = longest(d)
+        if cand[0] > best[0]:
+          best = cand
+      memo[key] = (best[0] + (tasks[key].seconds or 0.0), best[1] + [key])
+    return memo[key]
+  return max((longest(k) for k in tasks), default=(0.0, []))
+
+def _log_report(tasks: dict, wall: float):
+  logger.info("DB object timings (slowest first):")
+  for t in sorted(tasks.values(), key=lambda t: t.seconds or 0.0, reverse=True):
+    logger.info("  %8.2fs  %s", t.seconds or 0.0, t.key)
+  total = sum(t.seconds or 0.0 for t in tasks.values())
+  chainSecs, chain = _critical_path(tasks)
+  logger.info(
+    "DB init: %d objects in %.2fs wall (%.2fs serial work, critical path %.2fs: %s)",
+    len(tasks), wall, total, chainSecs, " -> ".join(chain)
+  )
+
+def runInitialization(workers: int = INIT_WORKERS):
+  """
+  Drop dependent objects serially, then build indexes, functions, tables,
+  views and procedures as a dependency graph on `workers` connections.
+  """
+  from db.views import dropViews
+  from db.procedures import dropProcedures
+  from db.functions import dropFunctions
+  from db.catalog import invalidateCatalog
+
+  started = time.monotonic()
+  invalidateCatalog()
+  db = getDb()
+  try:
+    # Views/procedures reference functions and tables; clear them first
+    logger.info("Dropping views, procedures and functions...")
+    dropViews(db)
+    dropProcedures(db)
+    dropFunctions(db)
+    tasks = _plan(db)
+  finally:
+    db.close()
+
+  logger.info("Building %d DB objects with %d workers...", len(tasks), workers)
+  try:
+    _run_graph(tasks, workers)
+  finally:
+    # Tables/views were rebuilt; the next reader reloads the catalog
+    invalidateCatalog()
+  _log_report(tasks, time.monotonic() - started)
+
+  # Functions/views may have changed without a new data version; flush the
+  # payload store (and, through its shared generation, every worker's
+  # model cache)
+  from web.cache import bumpGeneration
+  bumpGeneration()
@@ -166,6 +166,24 @@ def _iter_procedure_files() -> List[str]:
   return files
 
 
+def _create_procedures_from_file(cur, path: str) -> int:
+  """Run one procedures file; returns the number of procedures it defines."""
+  logger.info("Processing procedures file: %s", os.path.basename(path))
+  with open(path, "r", encoding="utf-8") as f:
+    sql_text = f.read()
+
+  proc_names = _parse_procedures_from_sql(sql_text)
+  if not proc_names:
+    logger.warning("  - No CREATE PROCEDURE statements found in %s", path)
+  else:
+    _validate_procedure_prefix(proc_names)
+    for name in proc_names:
+      logger.info("  - Will ensure procedure `%s` is created from this file", name)
+
+  _execute_sql_script(cur, sql_text)
+  return len(proc_names)
+
+
 def _create_procedures_from_files(cur) -> int:
   """Create all procedures from .sql files in PROCEDURES_SQL_DIR.
 
@@ -184,22 +202,32 @@ def _create_procedures_from_files(cur) -> int:
   total_created = 0
 
   for path in files:
-    logger.info("Processing procedures file: %s", os.path.basename(path))
+    total_created += _create_procedures_from_file(cur, path)
+
+  return total_created
+
+
+def listProcedureFiles() -> List[Tuple[str, str]]:
+  """[(path, sql_text)] for every procedures/*.sql file."""
+  out: List[Tuple[str, str]] = []
+  for path in _iter_procedure_files():
     with open(path, "r", encoding="utf-8") as f:
-      sql_text = f.read()
+      out.append((path, f.read()))
+  return out
 
-    proc_names = _parse_procedures_from_sql(sql_text)
-    if not proc_names:
-      logger.warning("  - No CREATE PROCEDURE statements found in %s", path)
-    else:
-      _validate_procedure_prefix(proc_names)
-      for name in proc_names:
-        logger.info("  - Will ensure procedure `%s` is created from this file", name)
 
-    _execute_sql_script(cur, sql_text)
-    total_created += len(proc_names)
+def dropProcedures(db) -> int:
+  with db.cursor() as cur:
+    dropped = _drop_all_prefixed_procedures(cur)
+    db.commit()
+  return dropped
 
-  return total_created
+
+def createProceduresFromFile(db, path: str) -> int:
+  with db.cursor() as cur:
+    created = _create_procedures_from_file(cur, path)
+    db.commit()
+  return created
 
 
 def initializeProcedures(db):
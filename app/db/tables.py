@@ -2,16 +2,35 @@ from applogging import get_logger
 from db import DB_PREFIX
 import os
 import glob
+import hashlib
 import re
 
 logger = get_logger(__name__)
 
 HERE = os.path.dirname(os.path.abspath(__file__))
 TABLES_SQL_DIR = os.path.join(HERE, "tables")
+FUNCTIONS_SQL_DIR = os.path.join(HERE, "functions")
+
+# Every seed runs with @pok_current_expansion set from this function
+EXPANSION_FUNCTION = f"{DB_PREFIX}_get_eqemu_expansion"
+
+# Rebuild every table even when its fingerprint is unchanged
+FORCE_REBUILD = os.environ.get("POK_FORCE_REBUILD", "").strip().lower() in ("1", "true", "yes", "on")
+
+# Suffixes for the build/swap tables; never matched as real pok tables
+SHADOW_SUFFIX = "__shadow"
+RETIRED_SUFFIX = "__retired"
+
+# Stored in the table COMMENT: "pok:fp=<sha256>"
+_FINGERPRINT_TAG = "pok:fp="
 
 # ===== Regex (case-insensitive) =====
 # Capture the table name in a CREATE TABLE header
 _HDR_RE = re.compile(r"CREATE\s+TABLE\s+`?([A-Za-z0-9_]+)`?", flags=re.IGNORECASE)
+# Tables a seed reads from (FROM/JOIN targets); filtered against real base tables later
+_SOURCE_RE = re.compile(r"\b(?:FROM|JOIN)\s+`?([A-Za-z0-9_]+)`?", flags=re.IGNORECASE)
+# pok_ stored function calls inside a seed
+_FUNC_CALL_RE = re.compile(rf"\b({DB_PREFIX}_[A-Za-z0-9_]+)\s*\(", flags=re.IGNORECASE)
 
 def _expected_prefix() -> str:
   return f"{DB_PREFIX}_"
@@ -94,11 +113,17 @@ def _strip_leading_comments(sql: str) -> str:
   """
   return _LEADING_COMMENTS_RE.sub("", sql, count=1).lstrip()
 
-def _drop_all_prefixed_tables(cur) -> int:
+def _row_value(row, key: str):
+  return row.get(key, row.get(key.upper())) if isinstance(row, dict) else row[0]
+
+def _fetch_prefixed_tables(cur) -> dict:
+  """
+  {table_name: table_comment} for every pok_ base table in the schema.
+  """
   like = f"{DB_PREFIX}\\_%"
   cur.execute(
     """
-    SELECT table_name
+    SELECT table_name, table_comment
     FROM information_schema.tables
     WHERE table_schema = DATABASE()
       AND table_name LIKE %s
@@ -106,14 +131,108 @@ def _drop_all_prefixed_tables(cur) -> int:
     """,
     (like,),
   )
-  rows = cur.fetchall()
-  to_drop = [r[0] if isinstance(r, (list, tuple)) else r["table_name"] for r in rows]
+  out = {}
+  for r in cur.fetchall():
+    if isinstance(r, dict):
+      out[r.get("table_name") or r.get("TABLE_NAME")] = r.get("table_comment") or r.get("TABLE_COMMENT") or ""
+    else:
+      out[r[0]] = r[1] or ""
+  return out
+
+def _fetch_base_tables(cur, names) -> set:
+  names = sorted(set(names))
+  if not names:
+    return set()
+  placeholders = ",".join(["%s"] * len(names))
+  cur.execute(
+    f"""
+    SELECT table_name
+    FROM information_schema.tables
+    WHERE table_schema = DATABASE()
+      AND table_type = 'BASE TABLE'
+      AND table_name IN ({placeholders})
+    """,
+    tuple(names),
+  )
+  return {_row_value(r, "table_name") for r in cur.fetchall()}
+
+def _stored_fingerprint(comment: str):
+  if comment and comment.startswith(_FINGERPRINT_TAG):
+    return comment[len(_FINGERPRINT_TAG):]
+  return None
+
+def _source_tables(statements, table_name: str) -> list[str]:
+  names = set()
+  for stmt in statements:
+    names.update(n.lower() for n in _SOURCE_RE.findall(stmt))
+  names.discard(table_name.lower())
+  return sorted(names)
+
+def _function_hashes(statements) -> list[str]:
+  out = []
+  called = {n.lower() for stmt in statements for n in _FUNC_CALL_RE.findall(stmt)}
+  for name in sorted(called):
+    path = os.path.join(FUNCTIONS_SQL_DIR, f"{name}.sql")
+    if os.path.exists(path):
+      with open(path, "rb") as f:
+        out.append(f"{name}:{hashlib.sha256(f.read()).hexdigest()}")
+  return out
+
+def _compute_fingerprint(cur, sql: str, statements, table_name: str, expansion: int, existing: dict) -> str:
+  """
+  sha256 over the seed file, the pok_ functions it calls, the expansion
+  rule, and CHECKSUM TABLE of every source table it reads. Source pok_
+  tables contribute their own stored fingerprint instead of a checksum.
+  """
+  h = hashlib.sha256()
+  h.update(sql.encode("utf-8"))
+  for fh in _function_hashes(statements):
+    h.update(b"\0fn:" + fh.encode("utf-8"))
+  h.update(f"\0expansion:{expansion}".encode("utf-8"))
+
+  sources = _source_tables(statements, table_name)
+  pok_sources = [n for n in sources if n.startswith(_expected_prefix())]
+  for name in pok_sources:
+    h.update(f"\0pok:{name}:{_stored_fingerprint(existing.get(name, ''))}".encode("utf-8"))
+
+  base = sorted(_fetch_base_tables(cur, [n for n in sources if n not in pok_sources]))
+  if base:
+    cur.execute("CHECKSUM TABLE " + ", ".join(f"`{n}`" for n in base))
+    for r in cur.fetchall():
+      if isinstance(r, dict):
+        name, checksum = r.get("Table"), r.get("Checksum")
+      else:
+        name, checksum = r[0], r[1]
+      h.update(f"\0src:{name}:{checksum}".encode("utf-8"))
+  return h.hexdigest()
 
+def _shadow_statements(statements, table_name: str):
+  """
+  Point every reference to `table_name` at its shadow build table.
+  """
+  rx = re.compile(rf"(?<![A-Za-z0-9_]){re.escape(table_name)}(?![A-Za-z0-9_])")
+  shadow = f"{table_name}{SHADOW_SUFFIX}"
+  return [rx.sub(shadow, stmt) for stmt in statements]
+
+def _swap_in_shadow(cur, table_name: str, exists: bool):
+  shadow = f"{table_name}{SHADOW_SUFFIX}"
+  if exists:
+    retired = f"{table_name}{RETIRED_SUFFIX}"
+    cur.execute(f"DROP TABLE IF EXISTS `{retired}`")
+    # Single RENAME is atomic: readers see either the old or the new table
+    cur.execute(f"RENAME TABLE `{table_name}` TO `{retired}`, `{shadow}` TO `{table_name}`")
+    cur.execute(f"DROP TABLE `{retired}`")
+  else:
+    cur.execute(f"RENAME TABLE `{shadow}` TO `{table_name}`")
+
+def _drop_stale_tables(cur, existing: dict, keep: set) -> int:
   dropped = 0
-  for name in to_drop:
+  for name in sorted(existing):
+    if name in keep:
+      continue
     # No IF EXISTS on purpose (fail loud if enumeration and DB diverge)
     cur.execute(f"DROP TABLE `{name}`")
-    logger.info("  - Dropped table `%s`", name)
+    logger.info("  - Dropped stale table `%s`", name)
     dropped += 1
   return dropped
 
@@ -155,70 +274,172 @@ def _exec_insert_and_rowcount(cur, insert_sql: str) -> int:
   row = cur.fetchone()
   return int(row.get("rc") if isinstance(row, dict) else row[0])
 
-def _create_and_seed_tables_from_files(cur):
-  created = 0
-  total_seeded = 0
+def _build_table(cur, statements, table_name: str) -> int:
+  """
+  Run one table file against its shadow name. Returns rows seeded.
+  """
+  shadow = f"{table_name}{SHADOW_SUFFIX}"
+  cur.execute(f"DROP TABLE IF EXISTS `{shadow}`")
 
-  files = sorted(glob.glob(os.path.join(TABLES_SQL_DIR, "*.sql")))
-  if not files:
-    logger.info("No table SQL files found in %s", TABLES_SQL_DIR)
-    return 0, 0
+  seen_create = False
+  seeded = 0
+  for stmt in _shadow_statements(statements, table_name):
+    lead = _strip_leading_comments(stmt)
+    upper = lead.upper()
 
-  for path in files:
-    with open(path, "r", encoding="utf-8") as f:
-      sql = f.read()
+    if upper.startswith("CREATE TABLE"):
+      cur.execute(stmt)
+      seen_create = True
+      continue
 
-    m = _HDR_RE.search(sql)
-    if not m:
-      raise ValueError(f"No CREATE TABLE <name> found in {path}")
-    table_name = m.group(1)
-    _require_prefixed(table_name, path, "Table")
+    if upper.startswith("INSERT INTO"):
+      seeded += max(0, _exec_insert_and_rowcount(cur, stmt))
+      continue
 
-    statements = _split_sql_statements(sql)
-    if not statements:
+    if upper.startswith("SELECT") and seen_create:
+      insert_stmt = _wrap_select_as_insert(cur, lead, shadow)
+      seeded += max(0, _exec_insert_and_rowcount(cur, insert_stmt))
       continue
 
-    logger.info("  - Creating `%s` from %s", table_name, os.path.basename(path))
+    # Fallback: execute any other DDL/DML as-is
+    cur.execute(stmt)
+  return seeded
 
-    seen_create = False
-    seeded_this_table = 0
+def _parse_table_file(path: str):
+  with open(path, "r", encoding="utf-8") as f:
+    sql = f.read()
 
-    for stmt in statements:
-      lead = _strip_leading_comments(stmt)
-      upper = lead.upper()
+  m = _HDR_RE.search(sql)
+  if not m:
+    raise ValueError(f"No CREATE TABLE <name> found in {path}")
+  table_name = m.group(1)
+  _require_prefixed(table_name, path, "Table")
+  return table_name, sql
 
-      if upper.startswith("CREATE TABLE"):
-        cur.execute(stmt)
-        created += 1
-        seen_create = True
-        continue
-
-      if upper.startswith("INSERT INTO"):
-        seeded_this_table += max(0, _exec_insert_and_rowcount(cur, stmt))
-        continue
+def _sync_table_file(cur, path: str, expansion: int, existing: dict):
+  """
+  Rebuild one table file if its fingerprint changed. Updates `existing`
+  in place and returns (table_name, rebuilt, seeded_rows).
+  """
+  table_name, sql = _parse_table_file(path)
+  statements = _split_sql_statements(sql)
+  if not statements:
+    return table_name, False, 0
+
+  fingerprint = _compute_fingerprint(cur, sql, statements, table_name, expansion, existing)
+  exists = table_name in existing
+  if exists and not FORCE_REBUILD and _stored_fingerprint(existing[table_name]) == fingerprint:
+    logger.info("  - `%s` unchanged; skipping", table_name)
+    return table_name, False, 0
+
+  logger.info("  - Building `%s` from %s", table_name, os.path.basename(path))
+  seeded = _build_table(cur, statements, table_name)
+  comment = f"{_FINGERPRINT_TAG}{fingerprint}"
+  cur.execute(f"ALTER TABLE `{table_name}{SHADOW_SUFFIX}` COMMENT = %s", (comment,))
+  _swap_in_shadow(cur, table_name, exists)
+  existing[table_name] = comment
+  # Leftovers from an interrupted run were consumed by the build/swap
+  existing.pop(f"{table_name}{SHADOW_SUFFIX}", None)
+  existing.pop(f"{table_name}{RETIRED_SUFFIX}", None)
+
+  logger.info("    -> Seeded `%s` (%d rows)", table_name, seeded)
+  return table_name, True, seeded
+
+def _iter_sql_files():
+  return sorted(glob.glob(os.path.join(TABLES_SQL_DIR, "*.sql")))
+
+def _order_by_references(files):
+  """
+  Order table files so a table is seeded after any pok table it reads
+  (e.g. pok_item_search after pok_item_sources); otherwise by filename.
+  """
+  parsed = {}
+  for path in files:
+    name, sql = _parse_table_file(path)
+    parsed[name.lower()] = (path, set(n.lower() for n in _SOURCE_RE.findall(sql)))
+
+  ordered, placed = [], set()
+  def visit(name, stack):
+    if name in placed:
+      return
+    if name in stack:
+      raise ValueError(f"Circular table references involving `{name}`")
+    path, refs = parsed[name]
+    for ref in sorted(refs):
+      if ref != name and ref in parsed:
+        visit(ref, stack | {name})
+    placed.add(name)
+    ordered.append(path)
+
+  for name in sorted(parsed, key=lambda n: parsed[n][0]):
+    visit(name, set())
+  return ordered
+
+def _create_and_seed_tables_from_files(cur, expansion: int):
+  rebuilt = skipped = 0
+  total_seeded = 0
 
-      if upper.startswith("SELECT") and seen_create:
-        insert_stmt = _wrap_select_as_insert(cur, lead, table_name)
-        seeded_this_table += max(0, _exec_insert_and_rowcount(cur, insert_stmt))
-        continue
+  existing = _fetch_prefixed_tables(cur)
+  files = _order_by_references(_iter_sql_files())
+  if not files:
+    logger.info("No table SQL files found in %s", TABLES_SQL_DIR)
 
-      # Fallback: execute any other DDL/DML as-is
-      cur.execute(stmt)
+  declared = set()
+  for path in files:
+    table_name, did_rebuild, seeded = _sync_table_file(cur, path, expansion, existing)
+    declared.add(table_name)
+    if did_rebuild:
+      rebuilt += 1
+      total_seeded += seeded
+    else:
+      skipped += 1
+
+  dropped = _drop_stale_tables(cur, existing, declared)
+  return rebuilt, skipped, dropped, total_seeded
+
+def _set_current_expansion(cur) -> int:
+  """
+  Resolve the server's expansion rule once into @pok_current_expansion so the
+  table seeds compare against a constant instead of calling
+  pok_get_eqemu_expansion() for every row.
+  """
+  cur.execute(f"SET @pok_current_expansion = {EXPANSION_FUNCTION}()")
+  cur.execute("SELECT @pok_current_expansion AS expansion")
+  row = cur.fetchone()
+  return int(row.get("expansion") if isinstance(row, dict) else row[0])
 
-    total_seeded += seeded_this_table
-    logger.info("    -> Seeded `%s` (%d rows)", table_name, seeded_this_table)
+def listTableFiles():
+  """[(table_name, path, sql)] for every tables/*.sql file."""
+  out = []
+  for path in _iter_sql_files():
+    name, sql = _parse_table_file(path)
+    out.append((name, path, sql))
+  return out
 
-  return created, total_seeded
+def syncTableFromFile(db, path: str):
+  """
+  Rebuild a single table file on `db` if needed. Safe to run concurrently
+  for different tables on separate connections. Returns (rebuilt, seeded_rows).
+  """
+  with db.cursor() as cur:
+    expansion = _set_current_expansion(cur)
+    _, rebuilt, seeded = _sync_table_file(cur, path, expansion, _fetch_prefixed_tables(cur))
+    db.commit()
+  return rebuilt, seeded
 
+def dropStaleTables(db, keep) -> int:
+  with db.cursor() as cur:
+    dropped = _drop_stale_tables(cur, _fetch_prefixed_tables(cur), set(keep))
+    db.commit()
+  return dropped
 
 def initializeTables(db):
   with db.cursor() as cur:
-    logger.info("Dropping tables...")
-    dropped = _drop_all_prefixed_tables(cur)
-    logger.info("Creating tables...")
-    created, total_seeded = _create_and_seed_tables_from_files(cur)
+    expansion = _set_current_expansion(cur)
+    logger.info("Syncing tables for expansion %d%s...", expansion, " (forced rebuild)" if FORCE_REBUILD else "")
+    rebuilt, skipped, dropped, total_seeded = _create_and_seed_tables_from_files(cur, expansion)
     db.commit()
   logger.info(
-    "Tables sync complete: dropped=%d, created=%d, seeded_rows=%d.",
-    dropped, created, total_seeded
+    "Tables sync complete: rebuilt=%d, unchanged=%d, dropped=%d, seeded_rows=%d.",
+    rebuilt, skipped, dropped, total_seeded
   )
@@ -0,0 +1,70 @@
+-- One row per item with the Gear Scout filter columns, resolved spell names
+-- and obtainability flags, so searches do not scan items + spells_new.
+-- name_norm is pok_fold_item_name(Name) compared byte for byte; search
+-- terms are folded with the same rules (_fold_item_name in items.py).
+CREATE TABLE `pok_item_search`(
+  item_id         INT PRIMARY KEY,
+  name_norm       VARCHAR(64) CHARACTER SET utf8mb4 COLLATE utf8mb4_bin NOT NULL,
+  slots           INT NOT NULL,
+  classes         INT NOT NULL,
+  races           INT NOT NULL,
+  reqlevel        INT NOT NULL,
+  reclevel        INT NOT NULL,
+  itemtype        INT NOT NULL,
+  focuseffect     INT NOT NULL,
+  clickeffect     INT NOT NULL,
+  proceffect      INT NOT NULL,
+  bardeffect      INT NOT NULL,
+  focusname       VARCHAR(64) NULL,
+  clickname       VARCHAR(64) NULL,
+  procname        VARCHAR(64) NULL,
+  bardspellname   VARCHAR(64) NULL,
+  has_drop        TINYINT(1) NOT NULL,
+  has_merchant    TINYINT(1) NOT NULL,
+  has_tradeskill  TINYINT(1) NOT NULL,
+  has_quest       TINYINT(1) NOT NULL,
+  unobtainable    TINYINT(1) NOT NULL,
+  KEY `name_norm` (`name_norm`),
+  KEY `reqlevel` (`reqlevel`),
+  KEY `reclevel` (`reclevel`),
+  KEY `itemtype` (`itemtype`),
+  KEY `focuseffect` (`focuseffect`),
+  KEY `clickeffect` (`clickeffect`),
+  KEY `proceffect` (`proceffect`),
+  KEY `bardeffect` (`bardeffect`),
+  KEY `sources` (`has_drop`, `has_merchant`, `has_tradeskill`)
+);
+
+SELECT
+  i.id,
+  pok_fold_item_name(i.Name),
+  i.slots,
+  i.classes,
+  i.races,
+  i.reqlevel,
+  i.reclevel,
+  i.itemtype,
+  i.focuseffect,
+  i.clickeffect,
+  i.proceffect,
+  i.bardeffect,
+  fs.name,
+  cs.name,
+  ps.name,
+  bs.name,
+  pis.lootdropEntries IS NOT NULL,
+  pis.merchantListEntries IS NOT NULL,
+  pis.tradeskillRecipeEntries IS NOT NULL,
+  pis.questEntries IS NOT NULL,
+  CASE
+    WHEN pis.item_id IS NULL
+      OR (pis.lootdropEntries IS NULL AND pis.merchantListEntries IS NULL
+        AND pis.tradeskillRecipeEntries IS NULL AND pis.questEntries IS NULL)
+    THEN 1 ELSE 0
+  END
+FROM items i
+LEFT JOIN pok_item_sources pis ON i.id = pis.item_id
+LEFT JOIN spells_new fs ON i.focuseffect = fs.id
+LEFT JOIN spells_new cs ON i.clickeffect = cs.id
+LEFT JOIN spells_new ps ON i.proceffect  = ps.id
+LEFT JOIN spells_new bs ON i.bardeffect  = bs.id;
@@ -0,0 +1,20 @@
+-- Exploded slot/class/race bitmasks of pok_item_search: one row per set bit.
+-- kind: 1 = slots, 2 = classes, 3 = races
+CREATE TABLE `pok_item_search_masks`(
+  kind     TINYINT NOT NULL,
+  bit      TINYINT NOT NULL,
+  item_id  INT NOT NULL,
+  PRIMARY KEY (`kind`, `bit`, `item_id`),
+  KEY `item_id` (`item_id`)
+);
+
+SELECT k.kind, b.bit, s.item_id
+FROM pok_item_search s
+CROSS JOIN (SELECT 1 AS kind UNION ALL SELECT 2 UNION ALL SELECT 3) k
+JOIN (
+  SELECT tens.d * 10 + ones.d AS bit
+  FROM (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+        UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) ones
+  CROSS JOIN (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3) tens
+  WHERE tens.d * 10 + ones.d < 31
+) b ON ((CASE k.kind WHEN 1 THEN s.slots WHEN 2 THEN s.classes ELSE s.races END) >> b.bit) & 1 = 1;
@@ -0,0 +1,23 @@
+-- Character trigrams of pok_item_search.name_norm for substring name search.
+-- Positions come from a 0..99 numbers table built from two digit sets.
+-- Grams are stored as raw UTF-8 bytes (up to 3 x 4), so there is no PAD
+-- SPACE comparison: "ab " and "ab" are different grams.
+CREATE TABLE `pok_item_search_trigrams`(
+  gram     VARBINARY(12) NOT NULL,
+  item_id  INT NOT NULL,
+  PRIMARY KEY (`gram`, `item_id`),
+  KEY `item_id` (`item_id`)
+);
+
+SELECT DISTINCT
+  CAST(SUBSTRING(s.name_norm, n.pos, 3) AS BINARY),
+  s.item_id
+FROM pok_item_search s
+JOIN (
+  SELECT tens.d * 10 + ones.d + 1 AS pos
+  FROM (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+        UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) ones
+  CROSS JOIN
+       (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2 UNION ALL SELECT 3 UNION ALL SELECT 4
+        UNION ALL SELECT 5 UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8 UNION ALL SELECT 9) tens
+) n ON n.pos <= CHAR_LENGTH(s.name_norm) - 2;
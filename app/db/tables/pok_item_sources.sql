@@ -28,13 +28,13 @@ FROM (
   JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
   JOIN zone z ON s2.zone = z.short_name
   WHERE (se.chance > 0)
-    AND (se.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (se.max_expansion = -1 OR se.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.max_expansion = -1 OR s2.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.min_expansion  <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.max_expansion  = -1 OR z.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND z.expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion')
+    AND (se.min_expansion <= @pok_current_expansion)
+    AND (se.max_expansion = -1 OR se.max_expansion >= @pok_current_expansion)
+    AND (s2.min_expansion <= @pok_current_expansion)
+    AND (s2.max_expansion = -1 OR s2.max_expansion >= @pok_current_expansion)
+    AND (z.min_expansion  <= @pok_current_expansion)
+    AND (z.max_expansion  = -1 OR z.max_expansion >= @pok_current_expansion)
+    AND z.expansion <= @pok_current_expansion
   UNION
   SELECT ml.item AS item_id
   FROM merchantlist ml
@@ -42,24 +42,24 @@ FROM (
   JOIN spawnentry se ON nt.id = se.npcID
   JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
   JOIN zone z ON s2.zone = z.short_name
-  WHERE (ml.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (ml.max_expansion = -1 OR ml.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
+  WHERE (ml.min_expansion <= @pok_current_expansion)
+    AND (ml.max_expansion = -1 OR ml.max_expansion >= @pok_current_expansion)
     AND (se.chance > 0)
-    AND (se.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (se.max_expansion = -1 OR se.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.max_expansion = -1 OR s2.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.min_expansion  <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.max_expansion  = -1 OR z.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND z.expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion')
+    AND (se.min_expansion <= @pok_current_expansion)
+    AND (se.max_expansion = -1 OR se.max_expansion >= @pok_current_expansion)
+    AND (s2.min_expansion <= @pok_current_expansion)
+    AND (s2.max_expansion = -1 OR s2.max_expansion >= @pok_current_expansion)
+    AND (z.min_expansion  <= @pok_current_expansion)
+    AND (z.max_expansion  = -1 OR z.max_expansion >= @pok_current_expansion)
+    AND z.expansion <= @pok_current_expansion
   UNION
   SELECT tre.item_id
   FROM tradeskill_recipe_entries tre
   JOIN tradeskill_recipe tr ON tre.recipe_id = tr.id
   WHERE tre.successcount > 0
     AND tr.enabled = 1
-    AND (tr.min_expansion = -1 OR tr.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (tr.max_expansion = -1 OR tr.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
+    AND (tr.min_expansion = -1 OR tr.min_expansion <= @pok_current_expansion)
+    AND (tr.max_expansion = -1 OR tr.max_expansion >= @pok_current_expansion)
 ) AS ids
 LEFT JOIN (
   SELECT
@@ -74,13 +74,13 @@ LEFT JOIN (
   JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
   JOIN zone z ON s2.zone = z.short_name
   WHERE (se.chance > 0)
-    AND (se.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (se.max_expansion = -1 OR se.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.max_expansion = -1 OR s2.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.min_expansion  <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.max_expansion  = -1 OR z.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND z.expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion')
+    AND (se.min_expansion <= @pok_current_expansion)
+    AND (se.max_expansion = -1 OR se.max_expansion >= @pok_current_expansion)
+    AND (s2.min_expansion <= @pok_current_expansion)
+    AND (s2.max_expansion = -1 OR s2.max_expansion >= @pok_current_expansion)
+    AND (z.min_expansion  <= @pok_current_expansion)
+    AND (z.max_expansion  = -1 OR z.max_expansion >= @pok_current_expansion)
+    AND z.expansion <= @pok_current_expansion
   GROUP BY i.id
 ) AS loot USING (item_id)
 LEFT JOIN (
@@ -92,16 +92,16 @@ LEFT JOIN (
   JOIN spawnentry se ON nt.id = se.npcID
   JOIN spawn2 s2 ON se.spawngroupID = s2.spawngroupID
   JOIN zone z ON s2.zone = z.short_name
-  WHERE (ml.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (ml.max_expansion = -1 OR ml.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
+  WHERE (ml.min_expansion <= @pok_current_expansion)
+    AND (ml.max_expansion = -1 OR ml.max_expansion >= @pok_current_expansion)
     AND (se.chance > 0)
-    AND (se.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (se.max_expansion = -1 OR se.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (s2.max_expansion = -1 OR s2.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.min_expansion  <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (z.max_expansion  = -1 OR z.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND z.expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion')
+    AND (se.min_expansion <= @pok_current_expansion)
+    AND (se.max_expansion = -1 OR se.max_expansion >= @pok_current_expansion)
+    AND (s2.min_expansion <= @pok_current_expansion)
+    AND (s2.max_expansion = -1 OR s2.max_expansion >= @pok_current_expansion)
+    AND (z.min_expansion  <= @pok_current_expansion)
+    AND (z.max_expansion  = -1 OR z.max_expansion >= @pok_current_expansion)
+    AND z.expansion <= @pok_current_expansion
   GROUP BY ml.item
 ) AS merch USING (item_id)
 LEFT JOIN (
@@ -112,7 +112,7 @@ LEFT JOIN (
   JOIN tradeskill_recipe tr ON tre.recipe_id = tr.id
   WHERE tre.successcount > 0
     AND tr.enabled = 1
-    AND (tr.min_expansion = -1 OR tr.min_expansion <= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
-    AND (tr.max_expansion = -1 OR tr.max_expansion >= (SELECT rule_value FROM rule_values WHERE rule_name = 'Expansion:CurrentExpansion'))
+    AND (tr.min_expansion = -1 OR tr.min_expansion <= @pok_current_expansion)
+    AND (tr.max_expansion = -1 OR tr.max_expansion >= @pok_current_expansion)
   GROUP BY tre.item_id
 ) AS trade USING (item_id);
@@ -73,20 +73,20 @@ JOIN (
   FROM zone z1
   WHERE z1.min_status = 0
     AND z1.cancombat  = 1
-    AND (z1.min_expansion <= pok_get_eqemu_expansion())
-    AND (z1.max_expansion = -1 OR z1.max_expansion >= pok_get_eqemu_expansion())
+    AND (z1.min_expansion <= @pok_current_expansion)
+    AND (z1.max_expansion = -1 OR z1.max_expansion >= @pok_current_expansion)
     AND NOT EXISTS (
       SELECT 1 FROM zone z2
       WHERE z2.short_name = z1.short_name
         AND z2.min_status = 0
         AND z2.cancombat  = 1
-        AND (z2.min_expansion <= pok_get_eqemu_expansion())
-        AND (z2.max_expansion = -1 OR z2.max_expansion >= pok_get_eqemu_expansion())
+        AND (z2.min_expansion <= @pok_current_expansion)
+        AND (z2.max_expansion = -1 OR z2.max_expansion >= @pok_current_expansion)
         AND z2.version > z1.version
     )
 ) z ON z.short_name = s2.zone
 WHERE se.chance > 0
-  AND (s2.min_expansion <= pok_get_eqemu_expansion())
-  AND (s2.max_expansion = -1 OR s2.max_expansion >= pok_get_eqemu_expansion())
-  AND (se.min_expansion <= pok_get_eqemu_expansion())
-  AND (se.max_expansion = -1 OR se.max_expansion >= pok_get_eqemu_expansion());
\ No newline at end of file
+  AND (s2.min_expansion <= @pok_current_expansion)
+  AND (s2.max_expansion = -1 OR s2.max_expansion >= @pok_current_expansion)
+  AND (se.min_expansion <= @pok_current_expansion)
+  AND (se.max_expansion = -1 OR se.max_expansion >= @pok_current_expansion);
\ No newline at end of file
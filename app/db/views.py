@@ -80,43 +80,67 @@ def _drop_all_prefixed_views(cur) -> int:
 
   return dropped
 
-def _create_views_from_files(cur) -> int:
-  files = _iter_sql_files()
-  created = 0
+def _parse_view_file(path: str):
+  """Return (view_name, create_sql) for one view file."""
+  with open(path, "r", encoding="utf-8") as f:
+    raw_sql = f.read()
 
-  for path in files:
-    with open(path, "r", encoding="utf-8") as f:
-      raw_sql = f.read()
+  body = _strip_leading_comments(raw_sql)
 
-    body = _strip_leading_comments(raw_sql)
+  if not body:
+    raise ValueError(f"Empty view file: {path}")
 
-    if not body:
-      raise ValueError(f"Empty view file: {path}")
+  # Must start with SELECT (after stripping comments)
+  if not body.upper().startswith("SELECT"):
+    snippet = body[:160].replace("\n", "\\n")
+    raise ValueError(
+      f"View files must contain a single SELECT. Offending file: {path}. First 160 chars: {snippet!r}"
+    )
 
-    # Must start with SELECT (after stripping comments)
-    if not body.upper().startswith("SELECT"):
-      snippet = body[:160].replace("\n", "\\n")
-      raise ValueError(
-        f"View files must contain a single SELECT. Offending file: {path}. First 160 chars: {snippet!r}"
-      )
+  # Normalize end: ensure exactly one semicolon
+  body = body.rstrip()
+  if body.endswith(";"):
+    body = body[:-1].rstrip()
 
-    # Normalize end: ensure exactly one semicolon
-    body = body.rstrip()
-    if body.endswith(";"):
-      body = body[:-1].rstrip()
+  base = _sanitize_basename(os.path.basename(path))
+  _require_prefixed(base, path, "View filename")
+  final_name = base
 
-    base = _sanitize_basename(os.path.basename(path))
-    _require_prefixed(base, path, "View filename")
-    final_name = base
+  return final_name, f"CREATE VIEW `{final_name}` AS\n{body};"
 
-    create_sql = f"CREATE VIEW `{final_name}` AS\n{body};"
+def _create_view_from_file(cur, path: str) -> str:
+  final_name, create_sql = _parse_view_file(path)
+  cur.execute(create_sql)
+  logger.info("  - Created view `%s`", final_name)
+  return final_name
 
-    cur.execute(create_sql)
-    logger.info("  - Created view `%s`", final_name)
+def _create_views_from_files(cur) -> int:
+  created = 0
+  for path in _iter_sql_files():
+    _create_view_from_file(cur, path)
     created += 1
-
   return created
 
+def listViewFiles():
+  """[(view_name, path, create_sql)] for every views/*.sql file."""
+  out = []
+  for path in _iter_sql_files():
+    name, create_sql = _parse_view_file(path)
+    out.append((name, path, create_sql))
+  return out
+
+def dropViews(db) -> int:
+  with db.cursor() as cur:
+    dropped = _drop_all_prefixed_views(cur)
+    db.commit()
+  return dropped
+
+def createViewFromFile(db, path: str) -> str:
+  with db.cursor() as cur:
+    name = _create_view_from_file(cur, path)
+    db.commit()
+  return name
+
 def initializeViews(db):
   with db.cursor() as cur:
     logger.info("Dropping views...")
@@ -124,4 +148,4 @@ def initializeViews(db):
     logger.info("Creating views...")
     created = _create_views_from_files(cur)
     db.commit()
-  logger.info("Views sync complete: dropped=%d, created=%d.", dropped, created)
\ No newline at end of file
+  logger.info("Views sync complete: dropped=%d, created=%d.", dropped, created)
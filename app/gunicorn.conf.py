@@ -1,4 +1,5 @@
 import logging
+import os
 from applogging import get_logger
 
 # Initialize your app's logging ea`rly in the master
@@ -24,5 +25,26 @@ class AppLogger(Logger):
 
 logger_class = AppLogger
 
+# Threaded workers; each worker's DB pool (POK_DB_POOL_SIZE) serves these threads concurrently
+worker_class = "gthread"
+threads = int(os.environ.get("POK_GUNICORN_THREADS", "4"))
+
 # Ensure print()/stdout/stderr from workers get your formatter too
 capture_output = True
+
+# Optional: parse every zone map in each new worker (POK_MAP_WARMUP=1) so the
+# first map renders skip file parsing. Runs in the background; boot is not delayed.
+# With a render pool (POK_MAP_RENDER_WORKERS > 0) its processes warm up instead.
+def post_fork(server, worker):
+  if os.environ.get("POK_MAP_WARMUP", "").lower() not in ("1", "true", "yes"):
+    return
+  if int(os.environ.get("POK_MAP_RENDER_WORKERS", "2")) > 0:
+    return
+  import threading
+  def warm():
+    try:
+      from api.renderers.map import GEOMETRY_STORE
+      GEOMETRY_STORE.warm()
+    except Exception:
+      logging.getLogger("gunicorn.error").exception("Map geometry warm-up failed")
+  threading.Thread(target=warm, name="pok-map-warmup", daemon=True).start()
@@ -103,6 +103,7 @@ function spellRef(id,name){ if(!id) return ""; const label=(name&&String(name).t
 /* ------------------------------ State ------------------------------ */
 
 const cache = new Map();
+const inflight = new Map();   // cacheKey -> Promise while a fetch is pending
 let tooltipEl = null;   // level 1 (item/npc)
 let tooltipEl2 = null;  // level 2 (spell inside tooltip)
 
@@ -112,6 +113,81 @@ let config = { selector: '.eqtooltip', delay: 150 };
 let anchor1 = null, anchor2 = null;
 let hideTimer1 = null, hideTimer2 = null;
 
+/* ------------------------------ Fetching ------------------------------ */
+
+// Lookups are coalesced: ids requested within BATCH_DELAY_MS of each other
+// go out as one /api/<type>s?ids=... request (one IN query server-side).
+const BATCH_ENDPOINTS = { item: 'items', spell: 'spells', npc: 'npcs' };
+const BATCH_MAX = 100;
+const BATCH_DELAY_MS = 25;
+const batchQueues = new Map();   // type -> Map(id -> {resolve, reject})
+const batchTimers = new Map();   // type -> timeout handle
+
+function fetchSingle(type, id){
+  return fetch(`/api/${type}/${id}`).then(res => {
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return res.json();
+  });
+}
+
+function flushBatch(type){
+  batchTimers.delete(type);
+  const queue = batchQueues.get(type);
+  if (!queue || !queue.size) return;
+  batchQueues.delete(type);
+
+  const entries = [...queue.entries()];
+  for (let i = 0; i < entries.length; i += BATCH_MAX) {
+    const chunk = entries.slice(i, i + BATCH_MAX);
+    const ids = chunk.map(([id]) => id).join(',');
+    fetch(`/api/${BATCH_ENDPOINTS[type]}?ids=${ids}`)
+      .then(res => {
+        if (!res.ok) throw new Error(`HTTP ${res.status}`);
+        return res.json();
+      })
+      .then(map => {
+        for (const [id, { resolve, reject }] of chunk) {
+          const data = map[id];
+          if (data == null) reject(new Error(`${type} ${id} not found`));
+          else resolve(data);
+        }
+      })
+      .catch(err => chunk.forEach(([, { reject }]) => reject(err)));
+  }
+}
+
+function queueBatch(type, id){
+  return new Promise((resolve, reject) => {
+    if (!batchQueues.has(type)) batchQueues.set(type, new Map());
+    const queue = batchQueues.get(type);
+    queue.set(String(id), { resolve, reject });
+    if (queue.size >= BATCH_MAX) {
+      clearTimeout(batchTimers.get(type));
+      flushBatch(type);
+    } else if (!batchTimers.has(type)) {
+      batchTimers.set(type, setTimeout(() => flushBatch(type), BATCH_DELAY_MS));
+    }
+  });
+}
+
+function fetchEntity(type, id){
+  const cacheKey = `${type}_${id}`;
+  if (cache.has(cacheKey)) return Promise.resolve(cache.get(cacheKey));
+  if (inflight.has(cacheKey)) return inflight.get(cacheKey);
+
+  const p = (BATCH_ENDPOINTS[type] ? queueBatch(type, id) : fetchSingle(type, id))
+    .then(data => { cache.set(cacheKey, data); return data; });
+  const done = () => inflight.delete(cacheKey);
+  p.then(done, done);
+  inflight.set(cacheKey, p);
+  return p;
+}
+
+// Warm the cache for a link without showing anything
+function prefetch(type, id){
+  fetchEntity(type, id).catch(() => {});
+}
+
 /* ------------------------------ Core DOM ------------------------------ */
 
 function ensureTooltipEls(){
@@ -429,15 +505,8 @@ function _show(level, type, id, event) {
     return;
   }
 
-  fetch(`/api/${type}/${id}`)
-    .then(res => {
-      if (!res.ok) throw new Error(`HTTP ${res.status}`);
-      return res.json();
-    })
-    .then(data => {
-      cache.set(cacheKey, data);
-      show(data);
-    })
+  fetchEntity(type, id)
+    .then(show)
     .catch(err => console.error('[EQTooltip] fetch failed:', err, { type, id }));
 }
 
@@ -529,6 +598,19 @@ function bindContainerHoverGuards() {
 
 const BOUND = new WeakSet();
 
+// Links prefetch once they come near the viewport; every link that shows
+// up in the same frame lands in the same batch request.
+const prefetchObserver = (typeof IntersectionObserver !== 'undefined')
+  ? new IntersectionObserver((entries) => {
+      for (const entry of entries) {
+        if (!entry.isIntersecting) continue;
+        prefetchObserver.unobserve(entry.target);
+        const { type, id } = entry.target.dataset;
+        if (type && id) prefetch(type, id);
+      }
+    }, { rootMargin: '200px' })
+  : null;
+
 function onEqKeydown(e){
   // open on Enter/Space; close on Escape
   const el = e.currentTarget;
@@ -550,6 +632,7 @@ function bindEqEl(el){
   if (!el.hasAttribute('role')) el.setAttribute('role', 'button');
   el.classList.add('eqtooltip--bound');
   el.addEventListener('keydown', onEqKeydown);
+  if (prefetchObserver) prefetchObserver.observe(el);
 }
 
 function scanAndBind(root = document){
@@ -597,7 +680,7 @@ if (document.readyState === 'loading') {
 
 // optional global for convenience
 if (typeof window !== 'undefined') {
-  window.EQTooltip = { init, showTooltip, hideTooltip };
+  window.EQTooltip = { init, showTooltip, hideTooltip, prefetch };
 }
 
 export default { init, showTooltip, hideTooltip };
\ No newline at end of file
@@ -30,6 +30,40 @@ function hideDetails(li) {
   details.hidden = true;
 }
 
+// Sections the details panel could not render in time carry their own
+// endpoint in data-section-src; fetch and swap them in.
+const PENDING_SELECTOR = ".gs-section-pending[data-section-src]";
+
+function fillPendingSections(root) {
+  const pending = Array.from(root.querySelectorAll(PENDING_SELECTOR));
+  if (root.matches?.(PENDING_SELECTOR)) pending.push(root);
+  return Promise.all(pending.map(async (el) => {
+    if (el.dataset.sectionLoading) return;
+    el.dataset.sectionLoading = "1";
+    try {
+      el.outerHTML = await fetchHTML(el.dataset.sectionSrc);
+    } catch (e) {
+      console.error(e);
+      el.outerHTML = `<div class="error">Failed to load section.</div>`;
+    }
+  }));
+}
+
+// Details panels are inserted by whoever embeds /render/item/<id>/details;
+// fill their pending sections as soon as they land in the page.
+function watchPendingSections(root = document.body) {
+  fillPendingSections(root);
+  const observer = new MutationObserver((mutations) => {
+    for (const m of mutations) {
+      m.addedNodes.forEach((node) => {
+        if (node.nodeType === Node.ELEMENT_NODE) fillPendingSections(node);
+      });
+    }
+  });
+  observer.observe(root, { childList: true, subtree: true });
+  return observer;
+}
+
 // ---------- cache: per itemId -> { sourceKey: html } ----------
 const ROW_CACHE = new Map();
 const VALID_SOURCES = new Set(["drops", "merchants", "recipes"]);
@@ -124,8 +158,61 @@ function initGearScout() {
   });
 }
 
+// ---------- spell option lists (lazy; one versioned JSON for all four selects) ----------
+let SPELL_OPTIONS_PROMISE = null;
+
+function loadSpellOptions(url) {
+  if (!SPELL_OPTIONS_PROMISE) {
+    SPELL_OPTIONS_PROMISE = fetch(url, { credentials: "same-origin" }).then((res) => {
+      if (!res.ok) throw new Error(`HTTP ${res.status} for ${url}`);
+      return res.json();
+    });
+  }
+  return SPELL_OPTIONS_PROMISE;
+}
+
+function fillSpellSelect(select, options) {
+  if (select.dataset.loaded === "1") return;
+  const selected = new Set(Array.from(select.selectedOptions, (o) => o.value));
+  const frag = document.createDocumentFragment();
+  for (const opt of options || []) {
+    const el = document.createElement("option");
+    el.value = String(opt.id);
+    el.textContent = opt.name;
+    el.selected = selected.has(el.value);
+    frag.appendChild(el);
+  }
+  select.replaceChildren(frag);
+  select.dataset.loaded = "1";
+}
+
+function initSpellOptions() {
+  const form = document.querySelector("form.gs-form[data-spell-options]");
+  const url = form?.dataset?.spellOptions;
+  if (!url) return;
+  const selects = form.querySelectorAll("select[data-spell-kind]");
+  if (!selects.length) return;
+
+  const populate = () =>
+    loadSpellOptions(url)
+      .then((lists) => selects.forEach((sel) => fillSpellSelect(sel, lists[sel.dataset.spellKind])))
+      .catch((e) => {
+        console.error(e);
+        SPELL_OPTIONS_PROMISE = null; // allow a retry on next interaction
+      });
+
+  // Load on first interaction, or when the browser is idle
+  selects.forEach((sel) => {
+    sel.addEventListener("focus", populate, { once: true });
+    sel.addEventListener("pointerenter", populate, { once: true });
+  });
+  if ("requestIdleCallback" in window) window.requestIdleCallback(populate, { timeout: 5000 });
+}
+
 onReady(initGearScout);
+onReady(initSpellOptions);
+onReady(() => watchPendingSections());
 
 // ---------- exports ----------
-export { initGearScout };
-export default { initGearScout };
+export { initGearScout, initSpellOptions, fillPendingSections, watchPendingSections };
+export default { initGearScout, initSpellOptions, fillPendingSections, watchPendingSections };
@@ -0,0 +1,660 @@
+import hashlib
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import wraps
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+from urllib.parse import urlparse
+from flask import current_app, has_app_context, json
+from applogging import get_logger
+logger = get_logger(__name__)
+
+CACHE_MAX_ENTRIES = int(os.environ.get("POK_CACHE_MAX_ENTRIES", "5000"))
+CACHE_MAX_BYTES = int(os.environ.get("POK_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECS = float(os.environ.get("POK_CACHE_TTL", "3600"))
+
+# Where serialized payloads live: "memory" (per worker), "sqlite" (shared file
+# on local disk) or "memcached" (any memcached text-protocol server)
+CACHE_BACKEND = os.environ.get("POK_CACHE_BACKEND", "memory").strip().lower()
+# sqlite: file path; memcached: memcached://host:port
+CACHE_URL = os.environ.get("POK_CACHE_URL", "")
+# memcached: payloads above this are not stored (the server's item limit,
+# -I, defaults to 1 MiB including key and header overhead)
+CACHE_MEMCACHED_MAX_ITEM_BYTES = int(os.environ.get("POK_CACHE_MEMCACHED_MAX_ITEM", str(1000 * 1000)))
+
+_MISSING = object()
+
+def _approxSize(value: Any) -> int:
+  """Rough in-memory size of a cached value (bytes, or a flat dict/list of scalars)."""
+  if isinstance(value, (bytes, bytearray, str)):
+    return sys.getsizeof(value)
+  if isinstance(value, dict):
+    return sys.getsizeof(value) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+  if isinstance(value, (list, tuple)):
+    return sys.getsizeof(value) + sum(_approxSize(v) for v in value)
+  return sys.getsizeof(value)
+
+class LRUCache:
+  """
+  Thread-safe LRU bounded by entry count and approximate bytes, with a TTL.
+
+  Every entry is tagged with the generation it was stored under (see
+  currentGeneration()); the first access after the generation changes
+  drops the whole cache, so a reseed never serves stale rows. With a
+  shared payload backend the generation includes that backend's flush
+  counter, so a flush in one worker (or in the DB initializer) reaches
+  every worker within a few seconds.
+  """
+  def __init__(self, name: str, *, maxEntries: int, maxBytes: int, ttl: float):
+    self.name = name
+    self.maxEntries = max(1, int(maxEntries))
+    self.maxBytes = max(1, int(maxBytes))
+    self.ttl = float(ttl)
+
+    self._lock = Lock()
+    self._data: "OrderedDict[Hashable, Tuple[Any, int, float]]" = OrderedDict()   # key -> (value, size, expires)
+    self._bytes = 0
+    self._generation = None
+
+    self._hits = 0
+    self._misses = 0
+    self._evictions = 0
+    self._expirations = 0
+    self._flushes = 0
+
+  def _syncGenerationLocked(self, generation):
+    if generation != self._generation:
+      if self._data:
+        self._flushes += 1
+      self._data.clear()
+      self._bytes = 0
+      self._generation = generation
+
+  def _removeLocked(self, key):
+    _, size, _ = self._data.pop(key)
+    self._bytes -= size
+
+  def get(self, key: Hashable, default: Any = None) -> Any:
+    generation = currentGeneration()
+    with self._lock:
+      self._syncGenerationLocked(generation)
+      entry = self._data.get(key)
+      if entry is None:
+        self._misses += 1
+        return default
+      if entry[2] <= time.monotonic():
+        self._removeLocked(key)
+        self._expirations += 1
+        self._misses += 1
+        return default
+      self._data.move_to_end(key)
+      self._hits += 1
+      return entry[0]
+
+  def set(self, key: Hashable, value: Any, size: int | None = None):
+    generation = currentGeneration()
+    size = _approxSize(value) if size is None else int(size)
+    if size > self.maxBytes:
+      return
+    with self._lock:
+      self._syncGenerationLocked(generation)
+      if key in self._data:
+        self._removeLocked(key)
+      self._data[key] = (value, size, time.monotonic() + self.ttl)
+      self._bytes += size
+      while len(self._data) > self.maxEntries or self._bytes > self.maxBytes:
+        oldest = next(iter(self._data))
+        self._removeLocked(oldest)
+        self._evictions += 1
+
+  def getOrLoad(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+    value = self.get(key, _MISSING)
+    if value is _MISSING:
+      value = loader()
+      self.set(key, value)
+    return value
+
+  def invalidate(self, key: Hashable | None = None):
+    """Drop one key, or everything when key is None."""
+    with self._lock:
+      if key is None:
+        self._data.clear()
+        self._bytes = 0
+      elif key in self._data:
+        self._removeLocked(key)
+
+  def invalidatePrefix(self, prefix: Tuple):
+    """Drop every tuple key starting with `prefix` (e.g. ("item", 1001))."""
+    n = len(prefix)
+    with self._lock:
+      for key in [k for k in self._data if isinstance(k, tuple) and k[:n] == prefix]:
+        self._removeLocked(key)
+
+  def stats(self) -> dict:
+    with self._lock:
+      lookups = self._hits + self._misses
+      return {
+        "entries": len(self._data),
+        "bytes": self._bytes,
+        "maxEntries": self.maxEntries,
+        "maxBytes": self.maxBytes,
+        "ttl": self.ttl,
+        "hits": self._hits,
+        "misses": self._misses,
+        "hitRate": round(self._hits / lookups, 4) if lookups else None,
+        "evictions": self._evictions,
+        "expirations": self._expirations,
+        "flushes": self._flushes,
+      }
+
+# Bumped by bumpGeneration(); combined with the DB data version and the
+# payload backend's shared flush counter, so a reseed (new pok_ table
+# fingerprints) or an explicit bump flushes every in-process cache. The
+# counter only reaches other workers through a shared backend (sqlite,
+# memcached); with "memory" a bump is local to the worker that handled it.
+_generation = 0
+_generation_lock = Lock()
+
+def currentGeneration() -> Tuple[str, int, Any]:
+  from db import getDataVersion
+  return getDataVersion(), _generation, PAYLOAD_CACHE.generation()
+
+def bumpGeneration() -> int:
+  global _generation
+  with _generation_lock:
+    _generation += 1
+    logger.info("Cache generation bumped to %d", _generation)
+  PAYLOAD_CACHE.clear()
+  return _generation
+
+class CacheBackend(ABC):
+  """
+  Byte-payload store shared by cachedJSON(). Keys are short ASCII strings
+  that already include the data and app versions, so backends never need
+  to know about reseeds or deploys. clear() drops only this app's entries.
+  Implementations fail open: errors read as misses.
+  """
+  name = "base"
+
+  @abstractmethod
+  def get(self, key: str) -> bytes | None: ...
+
+  @abstractmethod
+  def set(self, key: str, value: bytes, ttl: float): ...
+
+  @abstractmethod
+  def delete(self, key: str): ...
+
+  @abstractmethod
+  def clear(self): ...
+
+  def generation(self) -> Any:
+    """
+    Flush counter shared by every process using this store, changed by
+    clear(); None for per-process stores. Must be cheap (cached locally):
+    it is read on every model cache access.
+    """
+    return None
+
+  def stats(self) -> dict:
+    return {"backend": self.name}
+
+class MemoryBackend(CacheBackend):
+  """Per-process LRU; every gunicorn worker keeps its own copy."""
+  name = "memory"
+
+  def __init__(self, *, maxEntries: int, maxBytes: int, ttl: float):
+    self._lru = LRUCache("payloads", maxEntries=maxEntries, maxBytes=maxBytes, ttl=ttl)
+
+  def get(self, key: str) -> bytes | None:
+    return self._lru.get(key)
+
+  def set(self, key: str, value: bytes, ttl: float):
+    self._lru.set(key, value, len(value))
+
+  def delete(self, key: str):
+    self._lru.invalidate(key)
+
+  def clear(self):
+    self._lru.invalidate()
+
+  def stats(self) -> dict:
+    return {"backend": self.name, **self._lru.stats()}
+
+class _Counters:
+  def __init__(self):
+    self._lock = Lock()
+    self.hits = self.misses = self.sets = self.errors = self.skipped = 0
+
+  def add(self, field: str):
+    with self._lock:
+      setattr(self, field, getattr(self, field) + 1)
+
+  def snapshot(self) -> dict:
+    with self._lock:
+      lookups = self.hits + self.misses
+      return {
+        "hits": self.hits,
+        "misses": self.misses,
+        "hitRate": round(self.hits / lookups, 4) if lookups else None,
+        "sets": self.sets,
+        "errors": self.errors,
+        "skipped": self.skipped,
+      }
+
+class SQLiteBackend(CacheBackend):
+  """
+  Shared on-disk store for all workers on a host: one SQLite file in WAL
+  mode (concurrent readers, one writer). Size is kept under maxBytes by
+  dropping expired rows first, then the oldest rows.
+  """
+  name = "sqlite"
+  PRUNE_EVERY = 200   # sets between size checks
+  GENERATION_REFRESH_SECS = 2.0
+
+  def __init__(self, path: str, *, maxBytes: int):
+    self.path = path or "/tmp/pok-cache.sqlite"
+    self.maxBytes = int(maxBytes)
+    self._local = threading.local()
+    self._counters = _Counters()
+    self._setsSincePrune = 0
+    self._generation = 0
+    self._generationCheckedAt = 0.0
+    with self._conn() as conn:
+      conn.execute("""
+        CREATE TABLE IF NOT EXISTS payloads (
+          key     TEXT PRIMARY KEY,
+          value   BLOB NOT NULL,
+          size    INTEGER NOT NULL,
+          expires REAL NOT NULL
+        )
+      """)
+      conn.execute("CREATE INDEX IF NOT EXISTS payloads_expires ON payloads (expires)")
+      conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+      conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+
+  def _conn(self) -> sqlite3.Connection:
+    # Connections are per thread and per process (never shared across fork)
+    conn = getattr(self._local, "conn", None)
+    if conn is None or getattr(self._local, "pid", None) != os.getpid():
+      conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+      conn.execute("PRAGMA journal_mode=WAL")
+      conn.execute("PRAGMA synchronous=NORMAL")
+      self._local.conn = conn
+      self._local.pid = os.getpid()
+    return conn
+
+  def get(self, key: str) -> bytes | None:
+    try:
+      row = self._conn().execute(
+        "SELECT value FROM payloads WHERE key = ? AND expires > ?", (key, time.time())
+      ).fetchone()
+    except sqlite3.Error:
+      logger.exception("SQLite cache read failed (%s)", self.path)
+      self._counters.add("errors")
+      return None
+    self._counters.add("hits" if row else "misses")
+    return bytes(row[0]) if row else None
+
+  def set(self, key: str, value: bytes, ttl: float):
+    try:
+      conn = self._conn()
+      conn.execute(
+        "INSERT OR REPLACE INTO payloads (key, value, size, expires) VALUES (?, ?, ?, ?)",
+        (key, sqlite3.Binary(value), len(value), time.time() + ttl),
+      )
+      self._counters.add("sets")
+      self._setsSincePrune += 1
+      if self._setsSincePrune >= self.PRUNE_EVERY:
+        self._setsSincePrune = 0
+        self._prune(conn)
+    except sqlite3.Error:
+      logger.exception("SQLite cache write failed (%s)", self.path)
+      self._counters.add("errors")
+
+  def _prune(self, conn: sqlite3.Connection):
+    conn.execute("DELETE FROM payloads WHERE expires <= ?", (time.time(),))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM payloads").fetchone()[0]
+    if total <= self.maxBytes:
+      return
+    # Every row gets the same TTL, so earliest expiry == oldest write
+    excess = total - self.maxBytes
+    freed = 0
+    doomed = []
+    for key, size in conn.execute("SELECT key, size FROM payloads ORDER BY expires"):
+      doomed.append((key,))
+      freed += size
+      if freed >= excess:
+        break
+    conn.executemany("DELETE FROM payloads WHERE key = ?", doomed)
+
+  def delete(self, key: str):
+    try:
+      self._conn().execute("DELETE FROM payloads WHERE key = ?", (key,))
+    except sqlite3.Error:
+      logger.exception("SQLite cache delete failed (%s)", self.path)
+      self._counters.add("errors")
+
+  def clear(self):
+    try:
+      conn = self._conn()
+      conn.execute("BEGIN IMMEDIATE")
+      try:
+        conn.execute("DELETE FROM payloads")
+        conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+        conn.execute("COMMIT")
+      except sqlite3.Error:
+        conn.execute("ROLLBACK")
+        raise
+      self._generationCheckedAt = 0.0
+    except sqlite3.Error:
+      logger.exception("SQLite cache clear failed (%s)", self.path)
+      self._counters.add("errors")
+
+  def generation(self) -> Any:
+    if time.monotonic() - self._generationCheckedAt >= self.GENERATION_REFRESH_SECS:
+      try:
+        row = self._conn().execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()
+        self._generation = row[0] if row else 0
+      except sqlite3.Error:
+        logger.exception("SQLite cache generation read failed (%s)", self.path)
+        self._counters.add("errors")
+      self._generationCheckedAt = time.monotonic()
+    return self._generation
+
+  def stats(self) -> dict:
+    out = {
+      "backend": self.name, "path": self.path, "maxBytes": self.maxBytes,
+      "generation": self._generation, **self._counters.snapshot(),
+    }
+    try:
+      entries, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM payloads").fetchone()
+      out.update(entries=entries, bytes=size)
+    except sqlite3.Error:
+      pass
+    return out
+
+class MemcachedBackend(CacheBackend):
+  """
+  Minimal memcached text-protocol client (get/set/delete/incr), so any
+  memcached-compatible server on the host can hold the payloads. One
+  socket per thread; after an error the server is skipped (every call is
+  a miss) for RETRY_SECS before reconnecting.
+
+  The server may be shared with other apps, so clear() never flushes it:
+  every key is prefixed with a namespace counter stored on the server
+  (NAMESPACE_KEY), and clear() increments it. Other workers pick up the
+  new namespace within NAMESPACE_REFRESH_SECS; orphaned entries age out.
+  """
+  name = "memcached"
+  MAX_KEY_LEN = 250
+  RETRY_SECS = 5.0
+  NAMESPACE_KEY = b"pok:ns"
+  NAMESPACE_REFRESH_SECS = 2.0
+
+  def __init__(self, host: str, port: int, *, timeout: float = 0.5, maxItemBytes: int = CACHE_MEMCACHED_MAX_ITEM_BYTES):
+    self.host = host
+    self.port = int(port)
+    self.timeout = float(timeout)
+    self.maxItemBytes = int(maxItemBytes)
+    self._local = threading.local()
+    self._counters = _Counters()
+    self._downUntil = 0.0
+    self._ns = None
+    self._nsCheckedAt = 0.0
+
+  def _sock(self):
+    sock = getattr(self._local, "sock", None)
+    if sock is None or getattr(self._local, "pid", None) != os.getpid():
+      sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+      sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+      self._local.sock = sock
+      self._local.file = sock.makefile("rb")
+      self._local.pid = os.getpid()
+    return sock
+
+  def _drop(self):
+    sock = getattr(self._local, "sock", None)
+    self._local.sock = None
+    if sock is not None:
+      try:
+        sock.close()
+      except OSError:
+        pass
+
+  def _namespace(self, sock, f) -> bytes:
+    if self._ns is not None and time.monotonic() - self._nsCheckedAt < self.NAMESPACE_REFRESH_SECS:
+      return self._ns
+    sock.sendall(b"get " + self.NAMESPACE_KEY + b"\r\n")
+    line = f.readline()
+    if line == b"END\r\n":
+      # First use (or evicted): seed from the clock so an evicted counter
+      # never restarts at a namespace that still has entries; "add" loses
+      # to a concurrent creator
+      seed = b"%d" % int(time.time() * 1000)
+      sock.sendall(b"add %s 0 0 %d\r\n%s\r\n" % (self.NAMESPACE_KEY, len(seed), seed))
+      f.readline()   # STORED / NOT_STORED
+      sock.sendall(b"get " + self.NAMESPACE_KEY + b"\r\n")
+      line = f.readline()
+    parts = line.split()
+    if len(parts) != 4 or parts[0] != b"VALUE":
+      raise ValueError(f"unexpected reply {line[:60]!r}")
+    ns = f.read(int(parts[3]) + 2)[:-2]
+    if f.readline() != b"END\r\n" or not ns.isdigit():
+      raise ValueError("bad namespace value")
+    self._ns, self._nsCheckedAt = ns, time.monotonic()
+    return ns
+
+  def _key(self, sock, f, key: str) -> bytes:
+    raw = b"pok:n" + self._namespace(sock, f) + b":" + key.encode("utf-8")
+    if len(raw) > self.MAX_KEY_LEN or any(c <= 32 or c == 127 for c in raw):
+      raw = b"pok:h:" + hashlib.sha1(raw).hexdigest().encode("ascii")
+    return raw
+
+  def _call(self, what: str, fn: Callable, default: Any = None) -> Any:
+    # Socket errors and protocol desync (ValueError) mark the server down;
+    # per-key refusals are handled by the caller and never get here
+    if time.monotonic() < self._downUntil:
+      return default
+    try:
+      return fn(self._sock(), self._local.file)
+    except (OSError, ValueError) as e:
+      logger.warning("memcached %s failed (%s:%d): %s", what, self.host, self.port, e)
+      self._counters.add("errors")
+      self._downUntil = time.monotonic() + self.RETRY_SECS
+      self._drop()
+      return default
+
+  def get(self, key: str) -> bytes | None:
+    def run(sock, f):
+      sock.sendall(b"get " + self._key(sock, f, key) + b"\r\n")
+      line = f.readline()
+      if line == b"END\r\n":
+        return None
+      parts = line.split()
+      if len(parts) != 4 or parts[0] != b"VALUE":
+        raise ValueError(f"unexpected reply {line[:60]!r}")
+      data = f.read(int(parts[3]) + 2)[:-2]
+      if f.readline() != b"END\r\n":
+        raise ValueError("missing END")
+      return data
+    value = self._call("get", run)
+    self._counters.add("hits" if value is not None else "misses")
+    return value
+
+  def set(self, key: str, value: bytes, ttl: float):
+    if len(value) > self.maxItemBytes:
+      self._counters.add("skipped")
+      return
+    def run(sock, f):
+      # Relative exptime is only valid up to 30 days
+      exptime = min(int(ttl), 30 * 86400)
+      sock.sendall(b"set %s 0 %d %d\r\n" % (self._key(sock, f, key), exptime, len(value)) + value + b"\r\n")
+      reply = f.readline()
+      if reply == b"STORED\r\n":
+        self._counters.add("sets")
+      elif reply == b"NOT_STORED\r\n" or reply.startswith(b"SERVER_ERROR"):
+        # The server consumed the value and refused this key only (e.g.
+        # "object too large", out of memory): the connection is still in
+        # sync, so count it and keep the server up
+        logger.warning("memcached refused `%s` (%d bytes): %s", key, len(value), reply.strip()[:80].decode("latin-1"))
+        self._counters.add("errors")
+      else:
+        raise ValueError(f"unexpected reply {reply[:60]!r}")
+    self._call("set", run)
+
+  def delete(self, key: str):
+    def run(sock, f):
+      sock.sendall(b"delete " + self._key(sock, f, key) + b"\r\n")
+      f.readline()   # DELETED / NOT_FOUND
+    self._call("delete", run)
+
+  def clear(self):
+    def run(sock, f):
+      sock.sendall(b"incr " + self.NAMESPACE_KEY + b" 1\r\n")
+      reply = f.readline().strip()
+      if not reply.isdigit():
+        # NOT_FOUND: the counter was evicted, so old keys are unreachable anyway
+        self._ns = None
+        return
+      self._ns, self._nsCheckedAt = reply, time.monotonic()
+    self._call("clear", run)
+
+  def generation(self) -> Any:
+    # The key namespace doubles as the shared flush counter; while the
+    # server is down keep the last one seen rather than flapping
+    ns = self._call("namespace", self._namespace, self._ns)
+    return ns.decode("ascii") if ns else None
+
+  def stats(self) -> dict:
+    return {
+      "backend": self.name,
+      "server": f"{self.host}:{self.port}",
+      "namespace": self._ns.decode("ascii") if self._ns else None,
+      **self._counters.snapshot(),
+    }
+
+def _createBackend(kind: str, url: str) -> CacheBackend:
+  budget = CACHE_MAX_BYTES // 2
+  if kind == "sqlite":
+    return SQLiteBackend(url, maxBytes=budget)
+  if kind == "memcached":
+    parsed = urlparse(url if "://" in url else f"memcached://{url or '127.0.0.1:11211'}")
+    return MemcachedBackend(parsed.hostname or "127.0.0.1", parsed.port or 11211)
+  if kind != "memory":
+    logger.warning("Unknown POK_CACHE_BACKEND %r; using in-process memory", kind)
+  return MemoryBackend(maxEntries=CACHE_MAX_ENTRIES, maxBytes=budget, ttl=CACHE_TTL_SECS)
+
+# Model rows (dicts) stay in-process; serialized JSON payloads go to the
+# configured backend, which may be shared by every worker on the host.
+MODEL_CACHE = LRUCache("models", maxEntries=CACHE_MAX_ENTRIES, maxBytes=CACHE_MAX_BYTES // 2, ttl=CACHE_TTL_SECS)
+PAYLOAD_CACHE = _createBackend(CACHE_BACKEND, CACHE_URL)
+
+# Every payload kind stored per entity, so one entity can be invalidated
+# without a prefix scan (which memcached cannot do)
+PAYLOAD_PARTS = ("", "drops", "merchants", "recipes")
+
+def cachedModel(namespace: str) -> Callable:
+  """
+  Cache a single-row model lookup (e.g. get_item(itemId)) in MODEL_CACHE.
+  Hits return a shallow copy so callers may modify the row. Exceptions
+  (not-found errors) are never cached.
+  """
+  def decorator(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(entityId: int):
+      row = MODEL_CACHE.getOrLoad((namespace, int(entityId)), lambda: fn(entityId))
+      return dict(row) if isinstance(row, dict) else row
+    wrapper.uncached = fn
+    return wrapper
+  return decorator
+
+def cachedModelBatch(namespace: str) -> Callable:
+  """
+  Batch counterpart of cachedModel: wraps `fn(missingIds) -> {id: row}`
+  (one IN query) into `lookup(ids) -> {id: row}`. Rows already in
+  MODEL_CACHE are served from there and fetched rows are stored per id, so
+  the single-row and batch lookups share entries. Unknown ids are absent.
+  """
+  def decorator(fn: Callable) -> Callable:
+    @wraps(fn)
+    def wrapper(entityIds: Iterable[int]) -> Dict[int, Any]:
+      found: Dict[int, Any] = {}
+      missing: List[int] = []
+      for entityId in dict.fromkeys(int(i) for i in entityIds):
+        row = MODEL_CACHE.get((namespace, entityId), _MISSING)
+        if row is _MISSING:
+          missing.append(entityId)
+        else:
+          found[entityId] = dict(row) if isinstance(row, dict) else row
+      if missing:
+        for entityId, row in fn(missing).items():
+          MODEL_CACHE.set((namespace, int(entityId)), row)
+          found[int(entityId)] = dict(row) if isinstance(row, dict) else row
+      return found
+    wrapper.uncached = fn
+    return wrapper
+  return decorator
+
+def _appVersion() -> str:
+  return current_app.config.get("APP_VERSION", "") if has_app_context() else ""
+
+def _payloadKey(namespace: str, entityId: int, part: str = "") -> str:
+  # Data and app versions are part of the key, so a reseed or a deploy
+  # (renderer / JSON shape changes) simply stops hitting old entries on
+  # every worker; they age out via the TTL.
+  from db import getDataVersion
+  return f"pok:{getDataVersion()}:{_appVersion()}:{namespace}:{int(entityId)}:{part}"
+
+def cachedJSON(key: Tuple, producer: Callable[[], Any]) -> bytes:
+  """
+  Serialized JSON bytes for `key` = (namespace, id[, part]), so hits skip
+  both the query and json.dumps.
+  """
+  storeKey = _payloadKey(*key)
+  payload = PAYLOAD_CACHE.get(storeKey)
+  if payload is None:
+    payload = json.dumps(producer()).encode("utf-8")
+    PAYLOAD_CACHE.set(storeKey, payload, CACHE_TTL_SECS)
+  return payload
+
+def cachedJSONMany(namespace: str, entityIds: Iterable[int], producer: Callable[[List[int]], Dict[int, Any]]) -> Dict[int, bytes]:
+  """
+  Per-id JSON payloads for a batch: hits come from the payload store (the
+  same entries cachedJSON uses), misses are produced in one call to
+  `producer(missingIds)`. Ids the producer does not return are absent.
+  """
+  out: Dict[int, bytes] = {}
+  missing: List[int] = []
+  for entityId in dict.fromkeys(int(i) for i in entityIds):
+    payload = PAYLOAD_CACHE.get(_payloadKey(namespace, entityId))
+    if payload is None:
+      missing.append(entityId)
+    else:
+      out[entityId] = payload
+  if missing:
+    for entityId, obj in producer(missing).items():
+      payload = json.dumps(obj).encode("utf-8")
+      PAYLOAD_CACHE.set(_payloadKey(namespace, entityId), payload, CACHE_TTL_SECS)
+      out[int(entityId)] = payload
+  return out
+
+def invalidateEntity(namespace: str, entityId: int):
+  """Drop the cached row and any cached payloads for one entity."""
+  MODEL_CACHE.invalidate((namespace, int(entityId)))
+  for part in PAYLOAD_PARTS:
+    PAYLOAD_CACHE.delete(_payloadKey(namespace, entityId, part))
+
+def getCacheStats() -> dict:
+  return {
+    "generation": _generation,
+    "sharedGeneration": PAYLOAD_CACHE.generation(),
+    "models": MODEL_CACHE.stats(),
+    "payloads": PAYLOAD_CACHE.stats(),
+  }
@@ -0,0 +1,176 @@
+import csv
+import datetime
+import io
+import json
+import zlib
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, List, Sequence, Tuple
+from flask import Response, stream_with_context
+from web.utils import PoKJSONEncoder
+from applogging import get_logger
+logger = get_logger(__name__)
+
+try:
+  import pyarrow as pa
+except ImportError:   # optional: columnar exports fall back to column-major NDJSON
+  pa = None
+
+# Flush compressed output at least this often so the client sees progress
+GZIP_FLUSH_BYTES = 64 * 1024
+
+def _dumps(obj: Any, indent: int | None = None) -> str:
+  return json.dumps(obj, cls=PoKJSONEncoder, indent=indent)
+
+def _indented(text: str, pad: str) -> str:
+  return text.replace("\n", "\n" + pad)
+
+def jsonArrayStream(rows: Iterable[Any], indent: int | None = None, depth: int = 0) -> Iterator[str]:
+  """A JSON array written one element at a time (same layout as json.dumps with `indent`)."""
+  pad = " " * (indent or 0)
+  outer = pad * depth
+  inner = pad * (depth + 1)
+  sep = ", " if indent is None else ",\n" + inner
+  first = True
+  for row in rows:
+    if first:
+      yield "[" if indent is None else "[\n" + inner
+      first = False
+    else:
+      yield sep
+    yield _indented(_dumps(row, indent), inner) if indent else _dumps(row)
+  if first:
+    yield "[]"
+  else:
+    yield "]" if indent is None else "\n" + outer + "]"
+
+def jsonObjectStream(pairs: Iterable[Tuple[str, Iterable[Any]]], indent: int | None = None) -> Iterator[str]:
+  """
+  {"key": [...], ...} where each value is an iterable of rows, so only one
+  row needs to be in memory at a time.
+  """
+  pad = " " * (indent or 0)
+  first = True
+  for key, rows in pairs:
+    if first:
+      yield "{" if indent is None else "{\n" + pad
+      first = False
+    else:
+      yield ", " if indent is None else ",\n" + pad
+    yield _dumps(str(key)) + ": "
+    yield from jsonArrayStream(rows, indent, depth=1)
+  if first:
+    yield "{}"
+  else:
+    yield "}" if indent is None else "\n}"
+
+def ndjsonStream(records: Iterable[Any]) -> Iterator[str]:
+  """One compact JSON document per line."""
+  for rec in records:
+    yield _dumps(rec) + "\n"
+
+# (columns, rows) batches: columns = [(name, kind)], kind in int|float|str;
+# rows = list of tuples (see api.models.exports.iter_table_batches)
+Batch = Tuple[Sequence[Tuple[str, str]], List[tuple]]
+
+def _plain(value: Any) -> Any:
+  """Scalar a CSV/Arrow writer can take as-is."""
+  if isinstance(value, Decimal):
+    return float(value)
+  if isinstance(value, (datetime.date, datetime.datetime, datetime.time, datetime.timedelta)):
+    return str(value)
+  if isinstance(value, (bytes, bytearray)):
+    return bytes(value).decode("utf-8", "replace")
+  return value
+
+def ndjsonBatchStream(batches: Iterable[Batch]) -> Iterator[str]:
+  """Row-per-line NDJSON from (columns, rows) batches; one string per batch."""
+  for columns, rows in batches:
+    names = [name for name, _ in columns]
+    if rows:
+      yield "".join(_dumps(dict(zip(names, row))) + "\n" for row in rows)
+
+def csvStream(batches: Iterable[Batch]) -> Iterator[str]:
+  """CSV with a header row; one string per batch."""
+  buf = io.StringIO()
+  writer = csv.writer(buf, lineterminator="\n")
+  header = False
+  for columns, rows in batches:
+    if not header:
+      writer.writerow([name for name, _ in columns])
+      header = True
+    writer.writerows([_plain(v) for v in row] for row in rows)
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+
+_ARROW_TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+def arrowStream(batches: Iterable[Batch]) -> Iterator[bytes]:
+  """Arrow IPC stream: one record batch per input batch (requires pyarrow)."""
+  buf = io.BytesIO()
+  writer = None
+  for columns, rows in batches:
+    if writer is None:
+      schema = pa.schema([(name, getattr(pa, _ARROW_TYPES[kind])()) for name, kind in columns])
+      writer = pa.ipc.new_stream(buf, schema)
+    if rows:
+      arrays = [
+        pa.array([_plain(row[i]) for row in rows], type=schema.field(i).type)
+        for i in range(len(columns))
+      ]
+      writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+    yield buf.getvalue()
+    buf.seek(0)
+    buf.truncate()
+  if writer is not None:
+    writer.close()
+    yield buf.getvalue()
+
+def columnarJsonStream(batches: Iterable[Batch]) -> Iterator[str]:
+  """
+  Column-major NDJSON (the fallback when pyarrow is missing): one line per
+  batch, {"columns": [...], "types": [...], "rows": n, "data": [[col0...], ...]}.
+  """
+  for columns, rows in batches:
+    yield _dumps({
+      "columns": [name for name, _ in columns],
+      "types": [kind for _, kind in columns],
+      "rows": len(rows),
+      "data": [[row[i] for row in rows] for i in range(len(columns))],
+    }) + "\n"
+
+def gzipStream(chunks: Iterable[str | bytes], level: int = 6) -> Iterator[bytes]:
+  """gzip-compress a chunk stream incrementally (wbits=31 -> gzip container)."""
+  comp = zlib.compressobj(level, zlib.DEFLATED, 31)
+  pending = 0
+  for chunk in chunks:
+    data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+    out = comp.compress(data)
+    pending += len(data)
+    if pending >= GZIP_FLUSH_BYTES:
+      out += comp.flush(zlib.Z_SYNC_FLUSH)
+      pending = 0
+    if out:
+      yield out
+  yield comp.flush()
+
+def streamResponse(
+  chunks: Iterable[str | bytes],
+  mimetype: str,
+  *,
+  gzip: bool = False,
+  filename: str | None = None,
+) -> Response:
+  """
+  Chunked response over `chunks`, run inside the request context so
+  generators may hold a pooled DB connection until they finish. With
+  gzip=True the body is compressed on the fly (Content-Encoding: gzip).
+  """
+  body = gzipStream(chunks) if gzip else chunks
+  resp = Response(stream_with_context(body), mimetype=mimetype)
+  if gzip:
+    resp.headers["Content-Encoding"] = "gzip"
+    resp.headers["Vary"] = "Accept-Encoding"
+  if filename:
+    resp.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+  return resp
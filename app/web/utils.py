@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import json
-from typing import Any, Dict
-from flask import render_template
+import os
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Dict
+from flask import render_template, request, current_app, make_response
 from decimal import Decimal
 import datetime
 from urllib.parse import urlencode
@@ -28,22 +31,47 @@ def renderPagination(
     totalPages: int,
     baseUrl: str,
     originalParams: dict[str, Any],
-    maxVisible: int = 7
+    maxVisible: int = 7,
+    prevCursor: str | None = None,
+    nextCursor: str | None = None
 ) -> str:
-    if totalPages <= 1:
-        return ""
-
-    def buildUrl(pageNum: int) -> str:
+    """
+    Numbered page links, or Prev/Next cursor links when prevCursor/nextCursor
+    are given (keyset pagination; totalPages may then be an estimate).
+    """
+    def buildUrl(pageNum: int, **cursor: str) -> str:
         # Copy params so we don't mutate the original dict
         params: dict[str, Any] = {}
         for k, v in originalParams.items():
             params[k] = list(v) if isinstance(v, list) else v
 
         params['page'] = pageNum
-        params.pop('offset', None)
+        for key in ('offset', 'after', 'before'):
+            params.pop(key, None)
+        params.update(cursor)
         qs = urlencode(params, doseq=True)
         return f"{baseUrl}?{qs}#results"
 
+    if prevCursor is not None or nextCursor is not None:
+        links: list[str] = ['<nav class="pagination">']
+        if currentPage > 1:
+            links.append(f'<a href="{buildUrl(1)}">First</a>')
+        if prevCursor is not None:
+            links.append(f'<a href="{buildUrl(max(1, currentPage - 1), before=prevCursor)}">Prev</a>')
+        else:
+            links.append('<span class="disabled">Prev</span>')
+        label = f"{currentPage} of {totalPages}" if totalPages >= currentPage else str(currentPage)
+        links.append(f'<span class="active">{label}</span>')
+        if nextCursor is not None:
+            links.append(f'<a href="{buildUrl(currentPage + 1, after=nextCursor)}">Next</a>')
+        else:
+            links.append('<span class="disabled">Next</span>')
+        links.append('</nav>')
+        return " ".join(links)
+
+    if totalPages <= 1:
+        return ""
+
     links: list[str] = ['<nav class="pagination">']
 
     # Prev link
@@ -80,6 +108,57 @@ def renderPagination(
     links.append('</nav>')
     return " ".join(links)
 
+# Default freshness for data-versioned responses; revalidation is cheap (ETag)
+HTTP_CACHE_MAX_AGE = int(os.environ.get("POK_HTTP_MAX_AGE", "300"))
+
+def dataVersionETag() -> str:
+    """
+    Strong ETag for the current request: data version + app version + full
+    path (query string included), so any reseed or deploy changes it.
+    """
+    from db import getDataVersion
+    appVersion = current_app.config.get("APP_VERSION", "")
+    raw = f"{getDataVersion()}|{appVersion}|{request.full_path}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+def httpCached(maxAge: int | None = None) -> Callable:
+    """
+    Route decorator adding ETag / Last-Modified / Cache-Control driven by the
+    DB data version. Conditional requests that still match get a 304 before
+    the view runs, so no DB work is done. Responses that already carry a
+    Cache-Control header (e.g. error fragments marked no-store) or are not
+    200 are passed through untouched.
+    """
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args: Any, **kwargs: Any):
+            from db import getDataLastModified
+            etag = dataVersionETag()
+            lastModified = getDataLastModified()
+            age = HTTP_CACHE_MAX_AGE if maxAge is None else maxAge
+
+            def stamp(resp):
+                resp.set_etag(etag)
+                if lastModified is not None:
+                    resp.last_modified = lastModified
+                resp.headers["Cache-Control"] = f"public, max-age={age}"
+                return resp
+
+            notModified = (
+                request.if_none_match.contains(etag) if request.if_none_match
+                else (lastModified is not None and request.if_modified_since is not None
+                      and lastModified.replace(microsecond=0) <= request.if_modified_since)
+            )
+            if notModified:
+                return stamp(current_app.response_class(status=304))
+
+            resp = make_response(view(*args, **kwargs))
+            if resp.status_code != 200 or "Cache-Control" in resp.headers:
+                return resp
+            return stamp(resp)
+        return wrapper
+    return decorator
+
 class PoKJSONEncoder(json.JSONEncoder):
     def default(self, obj: Any) -> Any:
         if isinstance(obj, (datetime.datetime, datetime.date)):